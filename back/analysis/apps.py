@@ -7,3 +7,12 @@ class AnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analysis'
 
+    def ready(self):
+        # candle-closed events -> incremental feature materialization
+        from . import signals  # noqa: F401
+
+        # model + scaler loaded and warmed once per server process (before fork with --preload servers)
+        from .model_server import preload, should_preload
+        if should_preload():
+            preload()
+
@@ -0,0 +1,185 @@
+"""
+Point-in-time (as-of) join used to align sentiment rows to candles.
+
+Each left row (a candle, keyed by close_time) gets the last right row (a
+DailySentimentData bucket, keyed by timestamp) whose time is at or before
+it, found for all rows at once with one `np.searchsorted` per key group.
+A right row is never attached to a left row earlier than it, so there is no
+lookahead; `delay` additionally pushes each right row's availability later
+(e.g. a bucket that is only complete at its end), and `tolerance` drops
+matches older than that.
+
+Same result as `pd.merge_asof(direction='backward')`, but the inputs do not
+have to be pre-sorted by the join key, the left row order is kept and
+`how='inner'` drops unmatched rows. Parity with merge_asof is tested in
+analysis/tests.py; `python -m analysis.asof` times it against merge_asof and
+the old per-candle `tail(1)` lookup.
+"""
+from datetime import timedelta
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+NO_MATCH = -1
+
+
+def as_epoch_ns(values) -> np.ndarray:
+    """int64 epoch-ns of datetimes (naive = UTC) as a plain array."""
+    times = pd.Series(values)
+    if times.dtype.kind != 'M':  # objects (e.g. datetimes from values_list) / strings
+        times = pd.to_datetime(times, utc=True)
+    # tz-aware -> datetime64 converts to UTC
+    return times.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def _ns(delta: Optional[Union[timedelta, pd.Timedelta]]) -> int:
+    return 0 if delta is None else int(pd.Timedelta(delta).value)
+
+
+def asof_indices(left: np.ndarray, right: np.ndarray, tolerance: Optional[int] = None,
+                 allow_exact_matches: bool = True) -> np.ndarray:
+    """
+    For every value of `left` (any order), the index of the last value of the
+    ascending `right` that is <= it (< when not `allow_exact_matches`);
+    NO_MATCH when there is none or it is more than `tolerance` older.
+    """
+    idx = np.searchsorted(right, left, side='right' if allow_exact_matches else 'left') - 1
+    if tolerance is not None and len(right):
+        stale = (idx >= 0) & (left - right[np.maximum(idx, 0)] > tolerance)
+        idx[stale] = NO_MATCH
+    return idx
+
+
+def asof_positions(left_times, right_times, left_by=None, right_by=None,
+                   delay=None, tolerance=None, allow_exact_matches: bool = True) -> np.ndarray:
+    """
+    Row position in `right` matched to each left row (NO_MATCH if none).
+    `left_by`/`right_by` restrict matches to rows with an equal key (e.g. the
+    coin, for multi-symbol backtests).
+    """
+    lt = as_epoch_ns(left_times)
+    rt = as_epoch_ns(right_times) + _ns(delay)
+    tol = None if tolerance is None else _ns(tolerance)
+    positions = np.full(len(lt), NO_MATCH, dtype=np.int64)
+    if not len(lt) or not len(rt):
+        return positions
+
+    if left_by is None:
+        order = np.argsort(rt, kind='stable')
+        idx = asof_indices(lt, rt[order], tol, allow_exact_matches)
+        matched = idx >= 0
+        positions[matched] = order[idx[matched]]
+        return positions
+
+    codes, uniques = pd.factorize(pd.concat([pd.Series(right_by), pd.Series(left_by)], ignore_index=True))
+    right_codes, left_codes = codes[:len(rt)], codes[len(rt):]
+    # right rows grouped by key, ascending time inside each group
+    order = np.lexsort((rt, right_codes))
+    sorted_codes = right_codes[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(uniques) + 1))
+    for code in np.unique(left_codes[left_codes >= 0]):
+        start, end = bounds[code], bounds[code + 1]
+        if start == end:
+            continue
+        rows = np.flatnonzero(left_codes == code)
+        idx = asof_indices(lt[rows], rt[order[start:end]], tol, allow_exact_matches)
+        matched = idx >= 0
+        positions[rows[matched]] = order[start + idx[matched]]
+    return positions
+
+
+def asof_join(left: pd.DataFrame, right: pd.DataFrame, left_on: str, right_on: str,
+              by: Optional[Union[str, Sequence[str]]] = None, delay=None, tolerance=None,
+              allow_exact_matches: bool = True, how: str = 'left', suffix: str = '_right') -> pd.DataFrame:
+    """
+    `left` (row order kept) with the columns of its as-of matched `right` row.
+    how='left' keeps unmatched rows with missing values, how='inner' drops
+    them. `by` columns must exist in both frames and are not repeated.
+    """
+    if how not in ('left', 'inner'):
+        raise ValueError(f"Unknown how={how!r}; expected 'left' or 'inner'")
+    by_cols = [by] if isinstance(by, str) else list(by or [])
+
+    def key(frame):
+        if not by_cols:
+            return None
+        if len(by_cols) == 1:
+            return frame[by_cols[0]].to_numpy()
+        return pd.Series(list(zip(*(frame[c] for c in by_cols))))
+
+    positions = asof_positions(
+        left[left_on], right[right_on], key(left), key(right),
+        delay=delay, tolerance=tolerance, allow_exact_matches=allow_exact_matches,
+    )
+    matched = positions >= 0
+
+    right_cols = right.drop(columns=by_cols)
+    right_cols = right_cols.rename(columns={c: f"{c}{suffix}" for c in right_cols.columns if c in left.columns})
+    if how == 'inner':
+        out = left[matched].reset_index(drop=True)
+        taken = right_cols.iloc[positions[matched]].reset_index(drop=True)
+    elif right_cols.empty:
+        # nothing to take from: every right column is missing (NaN / NaT)
+        out = left.reset_index(drop=True)
+        taken = right_cols.reindex(range(len(out)))
+    else:
+        out = left.reset_index(drop=True)
+        taken = right_cols.iloc[np.maximum(positions, 0)].reset_index(drop=True)
+        if not matched.all():
+            taken = taken.astype({c: 'float64' for c in taken.columns if taken[c].dtype.kind in 'biu'})
+            taken[~matched] = None
+    return pd.concat([out, taken], axis=1)
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+
+def _sample(n_left: int, n_right: int, n_keys: int, seed: int):
+    rng = np.random.default_rng(seed)
+    base = pd.Timestamp('2024-01-01', tz='UTC')
+    left = pd.DataFrame({
+        'coin': rng.integers(0, n_keys, n_left),
+        'close_time': base + pd.to_timedelta(rng.integers(0, 365 * 86400, n_left), unit='s'),
+    })
+    right = pd.DataFrame({
+        'coin': rng.integers(0, n_keys, n_right),
+        # whole minutes so exact matches happen
+        'timestamp': base + pd.to_timedelta(rng.integers(0, 365 * 1440, n_right) * 60, unit='s'),
+        'score': rng.normal(size=n_right),
+    })
+    left.loc[::7, 'close_time'] = right['timestamp'].iloc[:len(left.loc[::7])].to_numpy()
+    return left, right
+
+
+def _per_row_tail(left: pd.DataFrame, right: pd.DataFrame) -> list:
+    """The old alignment: for each candle, filter the history up to it and take tail(1)."""
+    return [right[right['timestamp'] <= t].tail(1)['score'].tolist() for t in left['close_time']]
+
+
+def benchmark(n_left: int = 2000, n_right: int = 1000, repeat: int = 5) -> Dict[str, float]:
+    """Seconds per alignment of n_left candles: searchsorted join vs merge_asof vs per-candle tail(1)."""
+    import time
+
+    left, right = _sample(n_left, n_right, 1, seed=1)
+    right = right.sort_values('timestamp')
+    timings = {}
+    cases = (
+        ('asof_join', lambda: asof_join(left, right, 'close_time', 'timestamp'), repeat),
+        ('merge_asof', lambda: pd.merge_asof(left.sort_values('close_time'), right, left_on='close_time',
+                                             right_on='timestamp', direction='backward'), repeat),
+        ('per_row_tail', lambda: _per_row_tail(left, right), 1),
+    )
+    for label, fn, runs in cases:
+        started = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        timings[label] = (time.perf_counter() - started) / runs
+    return timings
+
+
+if __name__ == '__main__':
+    t = benchmark()
+    print(f"2000 candles x 1000 sentiment rows: asof_join {t['asof_join'] * 1e3:.1f}ms, "
+          f"merge_asof {t['merge_asof'] * 1e3:.1f}ms, per-candle tail(1) {t['per_row_tail'] * 1e3:.0f}ms")
@@ -0,0 +1,232 @@
+"""
+Bulk materialization of TechnicalFeatures / SentimentFeatures.
+
+Instead of one `update_all_*_features_for_symbol(symbol, market_data_id)`
+call per candle (each re-reading history and doing one update_or_create),
+a coin's whole MarketData history is loaded once, every feature row is
+computed in one `analysis.features` pass, and the rows are written with a
+single bulk upsert on the (symbol, timestamp) unique key.
+
+Sentiment features are computed on the DailySentimentData series and
+aligned to candles with the as-of join of analysis/asof.py (latest sentiment
+row at or before the candle's close_time, never a later one).
+
+`since`/`until` limit the rows to candles closing in that range; only the
+lookback rows before it are read in addition, so a single candle (live
+inference) or any backtest range costs one bounded read per store. That is how the candle-closed
+event (analysis/signals.py) materializes just the new candles. Each write
+advances the coin's freshness watermark in Redis (FeatureWatermarkCache).
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from analytics.models import Coin, DailySentimentData, MarketData
+from .asof import asof_positions
+from .features import (
+    MODEL_FEATURES, SENTIMENT, SENTIMENT_FEATURES, SENTIMENT_LOOKBACK_ROWS, TECHNICAL, TECHNICAL_FEATURES,
+    TECHNICAL_LOOKBACK_ROWS, compute_features, source_columns,
+)
+from .models import SentimentFeatures, TechnicalFeatures
+from redis_cache.cache_utils.features import FeatureWatermarkCache
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 2000
+
+SENTIMENT_COUNT_COLUMNS = ['bearish', 'bullish', 'extremely_bearish', 'extremely_bullish', 'neutral']
+
+
+def _history_start(qs, time_field: str, since: Optional[datetime], lookback: int) -> Optional[datetime]:
+    """Earliest `time_field` to read so rows at/after `since` have their full lookback."""
+    if since is None:
+        return None
+    earlier = list(
+        qs.filter(**{f'{time_field}__lt': since}).order_by(f'-{time_field}')
+        .values_list(time_field, flat=True)[lookback - 1:lookback]
+    )
+    return earlier[0] if earlier else None
+
+
+def _float_column(values: List) -> np.ndarray:
+    """Decimal/None values from values_list -> float64 with NaN."""
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _upsert(model, rows: List, update_fields: List[str]) -> int:
+    with transaction.atomic():
+        model.objects.bulk_create(
+            rows,
+            batch_size=UPSERT_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['symbol', 'timestamp'],
+            update_fields=update_fields,
+        )
+    return len(rows)
+
+
+def _feature_kwargs(specs, values: np.ndarray) -> List[Dict[str, Optional[float]]]:
+    fields = [s.field_name for s in specs]
+    cleaned = np.where(np.isfinite(values), values, np.nan).tolist()
+    return [
+        {f: (None if v != v else v) for f, v in zip(fields, row)}  # NaN -> NULL
+        for row in cleaned
+    ]
+
+
+def technical_feature_frame(coin: Coin, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None) -> pd.DataFrame:
+    """[market_data_id, close_time, <feature names>] for the coin's candles (closing in [since, until])."""
+    columns = source_columns(TECHNICAL_FEATURES)
+    qs = MarketData.objects.filter(symbol=coin)
+    if until is not None:
+        qs = qs.filter(close_time__lte=until)
+    start = _history_start(qs, 'close_time', since, TECHNICAL_LOOKBACK_ROWS)
+    if start is not None:
+        qs = qs.filter(close_time__gte=start)
+    records = list(qs.order_by('close_time').values_list('id', 'close_time', *columns))
+    if not records:
+        return pd.DataFrame(columns=['market_data_id', 'close_time'] + [s.name for s in TECHNICAL_FEATURES])
+
+    ids, close_times, *sources = zip(*records)
+    values = np.column_stack([_float_column(col) for col in sources])
+    features = compute_features(values, columns, TECHNICAL_FEATURES)
+
+    df = pd.DataFrame(features, columns=[s.name for s in TECHNICAL_FEATURES])
+    df.insert(0, 'close_time', pd.to_datetime(list(close_times), utc=True))
+    df.insert(0, 'market_data_id', np.asarray(ids, dtype=np.int64))
+    if since is not None:
+        df = df[df['close_time'] >= pd.Timestamp(since)].reset_index(drop=True)
+    return df
+
+
+def sentiment_feature_frame(coin: Coin, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    [market_data_id, close_time, <feature names>]: sentiment features of the
+    latest DailySentimentData row at/before each candle's close_time. Candles
+    with no sentiment before them are left out.
+    """
+    feature_names = [s.name for s in SENTIMENT_FEATURES]
+    empty = pd.DataFrame(columns=['market_data_id', 'close_time'] + feature_names)
+
+    candles = MarketData.objects.filter(symbol=coin)
+    if since is not None:
+        candles = candles.filter(close_time__gte=since)
+    if until is not None:
+        candles = candles.filter(close_time__lte=until)
+    candle_rows = list(candles.order_by('close_time').values_list('id', 'close_time'))
+    if not candle_rows:
+        return empty
+
+    sentiment = DailySentimentData.objects.filter(symbol=coin, timestamp__lte=candle_rows[-1][1])
+    start = _history_start(sentiment, 'timestamp', candle_rows[0][1], SENTIMENT_LOOKBACK_ROWS + 1)
+    if start is not None:
+        sentiment = sentiment.filter(timestamp__gte=start)
+    sent_rows = list(
+        sentiment.order_by('timestamp', 'id').values_list('timestamp', 'sentiment_score', *SENTIMENT_COUNT_COLUMNS)
+    )
+    if not sent_rows:
+        return empty
+
+    # Same base columns as compute_sentiment_features
+    timestamps, scores, *counts = zip(*sent_rows)
+    score = _float_column(scores)
+    base = {name: _float_column(col) for name, col in zip(SENTIMENT_COUNT_COLUMNS, counts)}
+    base['extremely_positive'] = (score > 0.8).astype(np.float64)
+    base['extremely_negative'] = (score < -0.8).astype(np.float64)
+    base['avg_sentiment'] = score
+    base['num_articles'] = np.nansum(np.column_stack([base[c] for c in SENTIMENT_COUNT_COLUMNS]), axis=1)
+
+    columns = source_columns(SENTIMENT_FEATURES)
+    features = compute_features(np.column_stack([base[c] for c in columns]), columns, SENTIMENT_FEATURES)
+
+    ids, close_times = zip(*candle_rows)
+    positions = asof_positions(list(close_times), list(timestamps))
+    matched = positions >= 0
+    df = pd.DataFrame(features[positions[matched]], columns=feature_names)
+    df.insert(0, 'close_time', pd.to_datetime([t for t, m in zip(close_times, matched) if m], utc=True))
+    df.insert(0, 'market_data_id', np.asarray(ids, dtype=np.int64)[matched])
+    return df
+
+
+def sentiment_input_version(coin: Coin, close_time: datetime) -> str:
+    """
+    Digest of the DailySentimentData rows the sentiment features of the candle
+    closing at `close_time` are computed from (the latest one at/before it and
+    its lookback); changes when such a bucket is added or rewritten.
+    """
+    rows = (
+        DailySentimentData.objects.filter(symbol=coin, timestamp__lte=close_time)
+        .order_by('-timestamp', '-id')
+        .values_list('timestamp', 'sentiment_score', *SENTIMENT_COUNT_COLUMNS)[:SENTIMENT_LOOKBACK_ROWS + 1]
+    )
+    return hashlib.sha256(repr(list(rows)).encode()).hexdigest()[:16]
+
+
+def model_feature_frame(coin: Coin, since: Optional[datetime] = None,
+                        until: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    [market_data_id, close_time, <MODEL_FEATURES in model order>] for candles
+    closing in [since, until] that have both technical and sentiment features;
+    the same rows the stores hold, computed straight from the source tables.
+    """
+    technical = technical_feature_frame(coin, since, until)
+    sentiment = sentiment_feature_frame(coin, since, until)
+    # both ordered by close_time; sentiment covers a subset of the same candles
+    technical = technical[np.isin(technical['market_data_id'].to_numpy(), sentiment['market_data_id'].to_numpy())]
+    df = pd.concat(
+        [technical.reset_index(drop=True), sentiment.drop(columns=['market_data_id', 'close_time'])], axis=1,
+    )
+    return df[['market_data_id', 'close_time'] + MODEL_FEATURES]
+
+
+def _write(model, coin: Coin, df: pd.DataFrame, specs, store: str) -> int:
+    if df.empty:
+        return 0
+    kwargs = _feature_kwargs(specs, df[[s.name for s in specs]].to_numpy(dtype=float))
+    close_times = list(df['close_time'].dt.to_pydatetime())
+    rows = [
+        model(symbol_id=coin.id, timestamp_id=int(md_id), record_timestamp=close_time, **fields)
+        for md_id, close_time, fields in zip(df['market_data_id'], close_times, kwargs)
+    ]
+    written = _upsert(model, rows, ['record_timestamp'] + [s.field_name for s in specs])
+    # freshness watermark: the newest candle this store now has a row for
+    FeatureWatermarkCache.advance(coin.symbol, store, close_times[-1], df['market_data_id'].iloc[-1])
+    return written
+
+
+def materialize_technical_features(coin: Coin, since: Optional[datetime] = None,
+                                   until: Optional[datetime] = None) -> int:
+    """Compute and upsert TechnicalFeatures for every candle of `coin` (closing in [since, until]); returns rows written."""
+    return _write(TechnicalFeatures, coin, technical_feature_frame(coin, since, until), TECHNICAL_FEATURES, TECHNICAL)
+
+
+def materialize_sentiment_features(coin: Coin, since: Optional[datetime] = None,
+                                   until: Optional[datetime] = None) -> int:
+    """Compute and upsert SentimentFeatures for every candle of `coin` that has sentiment before it."""
+    return _write(SentimentFeatures, coin, sentiment_feature_frame(coin, since, until), SENTIMENT_FEATURES, SENTIMENT)
+
+
+def materialize_features(symbol: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                         technical: bool = True, sentiment: bool = True) -> Dict[str, object]:
+    """Both feature stores for one coin; returns row counts and seconds."""
+    coin = Coin.objects.get(symbol=symbol.upper())
+    started = time.monotonic()
+    result = {'symbol': coin.symbol, 'technical': 0, 'sentiment': 0}
+    if technical:
+        result['technical'] = materialize_technical_features(coin, since, until)
+    if sentiment:
+        result['sentiment'] = materialize_sentiment_features(coin, since, until)
+    result['seconds'] = round(time.monotonic() - started, 3)
+    logger.info(
+        f"[{coin.symbol}] materialized {result['technical']} technical / {result['sentiment']} sentiment "
+        f"feature rows in {result['seconds']}s"
+    )
+    return result
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:48
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def drop_duplicate_feature_rows(apps, schema_editor):
+    """Keep the newest row per (symbol, timestamp) before the unique constraint is added."""
+    for model_name in ('TechnicalFeatures', 'SentimentFeatures'):
+        model = apps.get_model('analysis', model_name)
+        keep_ids = (
+            model.objects.values('symbol_id', 'timestamp_id')
+            .annotate(keep_id=Max('id'))
+            .values('keep_id')
+        )
+        model.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0005_sentimentfeatures_prev_extremely_negative_count_std1_9_ma'),
+        ('analytics', '0013_dailysentimentdata_bearish_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_feature_rows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='sentimentfeatures',
+            unique_together={('symbol', 'timestamp')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='technicalfeatures',
+            unique_together={('symbol', 'timestamp')},
+        ),
+        # the unique constraint's index covers (symbol, timestamp) lookups
+        migrations.RemoveIndex(
+            model_name='sentimentfeatures',
+            name='analysis_se_symbol__fefba0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='technicalfeatures',
+            name='analysis_te_symbol__3e4d3d_idx',
+        ),
+    ]
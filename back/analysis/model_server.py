@@ -0,0 +1,287 @@
+"""
+Process-wide holder of the prediction model and scaler.
+
+`model_server.load()` unpickles both artifacts once, validates them against
+the feature registry (the scaler's feature_names_in_ must be MODEL_FEATURES
+in order, the model must take the same number of columns), pins inference
+settings (CPU, one thread, a tree_method the installed xgboost accepts) and runs a
+warm-up prediction, so the first request does not pay for the cold load.
+
+AnalysisConfig.ready() calls `preload()` in server processes. Servers that
+import the application before forking workers (gunicorn --preload, uwsgi
+without lazy-apps) therefore load it once in the master and the workers share
+the pages copy-on-write; `gc.freeze()` keeps the collector from touching (and
+so copying) them. `status()` backs the readiness endpoint.
+
+The booster is also compiled into NumPy node arrays (analysis/tree_engine.py)
+and, once it matches the booster on sample rows, scores batches of up to
+COMPILED_MAX_ROWS rows (the request path) without DMatrix / wrapper
+overhead; larger batches, or a model the engine can't express, go through
+xgboost. ML_COMPILED_TREES=False turns it off.
+
+Replacing the artifact files deploys a new model: the next `ensure_loaded()`
+notices the changed files, loads and warms the new pair, swaps it in and
+drops cached predictions of the old one (PredictionCache, keyed by the
+artifacts' hash).
+"""
+import gc
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from .features import MODEL_FEATURES
+from .tree_engine import check_parity, compile_model
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ML_model')
+MODEL_PATH = os.path.join(MODEL_DIR, 'final_xgb_model.pkl')
+SCALER_PATH = os.path.join(MODEL_DIR, 'scaler_xgb_model.pkl')
+
+# argv markers of processes that serve HTTP (celery / manage.py commands don't preload)
+SERVER_COMMANDS = ('runserver', 'daphne', 'gunicorn', 'uvicorn', 'uwsgi')
+
+# tree methods removed from newer xgboost; prediction does not depend on them
+_LEGACY_TREE_METHODS = {'gpu_hist': 'hist', 'gpu_exact': 'exact'}
+
+# the compiled trees beat xgboost's C++ predictor below ~100 rows (python -m analysis.tree_engine)
+COMPILED_MAX_ROWS = 64
+PARITY_ROWS = 512
+
+
+class ModelServer:
+    """Loads, validates and warms the model + scaler once per process."""
+
+    def __init__(self, model_path: str = MODEL_PATH, scaler_path: str = SCALER_PATH):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.model = None
+        self.scaler = None
+        self.class_idx_1 = 1
+        self.engine = None
+        self._loaded: Optional[Tuple] = None  # (model, scaler, class_idx_1, engine), swapped as one
+        self._signature: Tuple = ()
+        self._lock = threading.Lock()
+        self._status: Dict[str, object] = {'ready': False, 'error': None}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._status['ready'])
+
+    def status(self) -> Dict[str, object]:
+        return dict(self._status, pid=os.getpid())
+
+    @staticmethod
+    def _artifact_hash(*paths: str) -> str:
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    def _validate(self, model, scaler) -> None:
+        scaler_features = [str(x) for x in getattr(scaler, 'feature_names_in_', [])]
+        if scaler_features and scaler_features != MODEL_FEATURES:
+            missing = sorted(set(MODEL_FEATURES) - set(scaler_features))
+            extra = sorted(set(scaler_features) - set(MODEL_FEATURES))
+            raise ValueError(
+                f"Scaler features do not match the registry (missing={missing}, extra={extra}, "
+                f"same set in another order={not missing and not extra})"
+            )
+        n_features = getattr(model, 'n_features_in_', None)
+        if n_features is not None and int(n_features) != len(MODEL_FEATURES):
+            raise ValueError(f"Model expects {n_features} features, registry has {len(MODEL_FEATURES)}")
+        if not hasattr(model, 'predict_proba'):
+            raise ValueError(f"Model {type(model).__name__} has no predict_proba")
+
+    @staticmethod
+    def _compile(model):
+        """CompiledEnsemble for the model if it reproduces the booster on sample rows, else None."""
+        if not getattr(settings, 'ML_COMPILED_TREES', True):
+            return None
+        try:
+            engine = compile_model(model)
+            rng = np.random.default_rng(0)
+            X = rng.normal(size=(PARITY_ROWS, len(MODEL_FEATURES))) * 2
+            X[rng.random(X.shape) < 0.02] = np.nan
+            X[0] = 0.0  # the scaler's mean row
+            parity = check_parity(model, engine, X)
+            logger.info(f"Compiled {engine.n_trees} trees (max depth {engine.max_depth}); parity {parity}")
+            return engine
+        except Exception as e:
+            logger.warning(f"Compiled trees not used, predicting with xgboost: {type(e).__name__}: {e}")
+            return None
+
+    @staticmethod
+    def _scale(scaler, X: pd.DataFrame) -> np.ndarray:
+        """scaler.transform(X); a StandardScaler is applied with the same float64 ops, minus sklearn's input checks."""
+        if type(scaler).__name__ != 'StandardScaler':
+            return scaler.transform(X)
+        values = X.to_numpy(dtype=np.float64)
+        if scaler.with_mean:
+            values = values - scaler.mean_
+        if scaler.with_std:
+            values = values / scaler.scale_
+        return values
+
+    @staticmethod
+    def _pin_inference_params(model) -> None:
+        """
+        Once at load instead of set_params(device='cpu') on every request.
+        Requests score a handful of rows, so one thread is as fast and keeps an
+        OpenMP pool out of the pre-fork master (libgomp is not fork-safe).
+        """
+        if not hasattr(model, 'set_params'):
+            return
+        params = {'device': 'cpu', 'n_jobs': 1}
+        tree_method = model.get_params().get('tree_method')
+        if tree_method in _LEGACY_TREE_METHODS:
+            params['tree_method'] = _LEGACY_TREE_METHODS[tree_method]
+        try:
+            model.set_params(**params)
+        except Exception as e:
+            logger.warning(f"Could not set inference params {params}: {e}")
+
+    def _artifact_signature(self) -> Tuple:
+        """Cheap change check (no file reads): (mtime_ns, size) of both artifacts."""
+        try:
+            return tuple((st.st_mtime_ns, st.st_size) for st in (os.stat(self.model_path), os.stat(self.scaler_path)))
+        except OSError:
+            return ()
+
+    @property
+    def artifact_hash(self) -> Optional[str]:
+        return self._status.get('artifact_hash')
+
+    def load(self, force: bool = False) -> Dict[str, object]:
+        """
+        Load + validate + warm up, then swap the new artifacts in; raises on
+        failure (also recorded in status()). A failed reload keeps serving the
+        model that was already loaded.
+        """
+        with self._lock:
+            if self.ready and not force:
+                return self.status()
+            started = time.perf_counter()
+            self._signature = self._artifact_signature()
+            try:
+                try:
+                    import xgboost  # noqa: F401  (the pickle needs it)
+                except ImportError as ie:
+                    logger.error(
+                        "Failed to import xgboost inside backend.\n"
+                        f"Python: {sys.executable}\n"
+                        f"MODEL_DIR contents: {os.listdir(MODEL_DIR) if os.path.isdir(MODEL_DIR) else 'missing'}\n"
+                        f"Error: {ie}"
+                    )
+                    raise
+
+                logger.info(f"Loading model from {self.model_path} and scaler from {self.scaler_path}")
+                model = joblib.load(self.model_path)
+                scaler = joblib.load(self.scaler_path)
+                self._validate(model, scaler)
+                self._pin_inference_params(model)
+                classes = getattr(model, 'classes_', None)
+                class_idx_1 = int(np.where(np.asarray(classes) == 1)[0][0]) if classes is not None else 1
+                engine = self._compile(model)
+                loaded = time.perf_counter()
+
+                warmup_row = pd.DataFrame([getattr(scaler, 'mean_', np.zeros(len(MODEL_FEATURES)))],
+                                          columns=MODEL_FEATURES)
+                self._predict((model, scaler, class_idx_1, engine), warmup_row)
+
+                # one assignment -> concurrent requests see either the old or the new artifacts
+                self._loaded = (model, scaler, class_idx_1, engine)
+                self.model, self.scaler, self.class_idx_1, self.engine = self._loaded
+                self._status = {
+                    'ready': True,
+                    'error': None,
+                    'artifact_hash': self._artifact_hash(self.model_path, self.scaler_path),
+                    'model': type(model).__name__,
+                    'xgboost_version': getattr(xgboost, '__version__', 'unknown'),
+                    'n_features': len(MODEL_FEATURES),
+                    'engine': 'compiled' if engine is not None else 'xgboost',
+                    'loaded_at': timezone.now().isoformat(),
+                    'load_seconds': round(loaded - started, 4),
+                    'warmup_seconds': round(time.perf_counter() - loaded, 4),
+                }
+                logger.info(f"Model ready: {self._status}")
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if self.ready:
+                    self._status = dict(self._status, reload_error=error)
+                else:
+                    self._status = {'ready': False, 'error': error}
+                logger.exception(f"Model/scaler load failed: {e}")
+                raise
+
+        # predictions cached for a previous model can never be hit again
+        from redis_cache.cache_utils.prediction import PredictionCache
+        PredictionCache.invalidate_other_models(self.artifact_hash)
+        return self.status()
+
+    def ensure_loaded(self) -> None:
+        """Load on first use; reload when the artifact files were replaced (a new model was deployed)."""
+        if not self.ready:
+            self.load()
+        elif self._artifact_signature() != self._signature:
+            logger.info("Model artifacts changed on disk - reloading")
+            try:
+                self.load(force=True)
+            except Exception:
+                pass  # still serving the previous model; status() has reload_error
+
+    @staticmethod
+    def _predict(loaded: Tuple, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        model, scaler, class_idx_1, engine = loaded
+        if engine is not None and len(X) <= COMPILED_MAX_ROWS:
+            probas = engine.predict_proba(ModelServer._scale(scaler, X))
+        else:
+            probas = model.predict_proba(scaler.transform(X))
+        classes = getattr(model, 'classes_', None)
+        top = np.argmax(probas, axis=1)
+        preds = (np.asarray(classes)[top] if classes is not None else top).astype(int)
+        return preds, probas[:, class_idx_1]
+
+    def predict(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (labels, P(class 1)) for model-ordered, already validated features:
+        one scaler pass and one predict_proba (compiled trees or xgboost) for
+        the whole batch; the labels are its argmax (what the classifier's
+        predict computes internally).
+        """
+        return self._predict(self._loaded, X)
+
+
+def should_preload(argv=None) -> bool:
+    """Preload only in processes that serve requests (runserver: the reloader's child)."""
+    if not getattr(settings, 'ML_MODEL_PRELOAD', True):
+        return False
+    argv = sys.argv if argv is None else argv
+    command = ' '.join(os.path.basename(a) for a in argv[:2])
+    if 'runserver' in argv:
+        return bool(os.environ.get('RUN_MAIN')) or '--noreload' in argv
+    return any(name in command for name in SERVER_COMMANDS)
+
+
+def preload() -> Optional[Dict[str, object]]:
+    """Load at process start; a failure is logged and reported as not ready, never raised."""
+    try:
+        status = model_server.load()
+    except Exception:
+        return None
+    gc.freeze()  # loaded objects stay out of GC passes -> their pages stay shared after fork
+    return status
+
+
+model_server = ModelServer()
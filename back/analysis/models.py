@@ -28,9 +28,7 @@ class TechnicalFeatures(models.Model):
     change_pct_lag8 = models.FloatField(null=True, db_column='2_periods_back_back_change_pct_lag8')
 
     class Meta:
-        indexes = [
-            models.Index(fields=["symbol", "timestamp"]),
-        ]
+        unique_together = ("symbol", "timestamp")  # one feature row per candle (bulk upsert key); also the lookup index
 
 
 class SentimentFeatures(models.Model):
@@ -53,9 +51,7 @@ class SentimentFeatures(models.Model):
     prev_extremely_negative_count_std1_9_ma = models.FloatField(null=True)
 
     class Meta:
-        indexes = [
-            models.Index(fields=["symbol", "timestamp"]),
-        ]
+        unique_together = ("symbol", "timestamp")  # one feature row per candle (bulk upsert key); also the lookup index
 
 
 
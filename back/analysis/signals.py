@@ -0,0 +1,35 @@
+import logging
+
+from django.dispatch import receiver
+
+from analytics.signals import candles_closed
+from redis_cache.cache_utils.prediction import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(candles_closed, dispatch_uid='analysis.materialize_on_candles_closed')
+def materialize_on_candles_closed(sender, symbol, first_close_time, last_close_time, **kwargs):
+    """
+    New candles were committed: materialize their TechnicalFeatures/SentimentFeatures
+    rows in the background (only the new candles + their lookback are read), so the
+    prediction path finds them precomputed.
+    """
+    from .tasks import materialize_features_for_symbol
+
+    try:
+        materialize_features_for_symbol.delay(symbol, since=first_close_time.isoformat())
+        logger.info(f"[{symbol}] queued feature materialization for candles {first_close_time} .. {last_close_time}")
+    except Exception as e:
+        # בלי broker - לא מפילים את השמירה; fix_missing/orchestrator ישלימו
+        logger.error(f"[{symbol}] could not queue feature materialization: {e}")
+
+
+@receiver(candles_closed, dispatch_uid='analysis.invalidate_predictions_on_candles_closed')
+def invalidate_predictions_on_candles_closed(sender, symbol, **kwargs):
+    """
+    New (or re-written) candles: a prediction is keyed by its candle, so the
+    new candle misses anyway, but a re-saved candle keeps its id - drop the
+    coin's cached predictions so none is served from the old values.
+    """
+    PredictionCache.invalidate_symbol(symbol)
@@ -1,3 +1,137 @@
-from django.test import TestCase
+import os
+import tempfile
+import warnings
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from .asof import _sample, asof_join
+from .features import (
+    FEATURES, PARITY_ATOL, PARITY_RTOL, SENTIMENT, TECHNICAL, _pandas_reference, feature_frame,
+    model_field_mismatches, source_columns,
+)
+from .model_server import MODEL_PATH, SCALER_PATH
+from .models import SentimentFeatures, TechnicalFeatures
+from .tree_engine import CompiledEnsemble, _sample_rows, compile_model
+
+
+class FeatureRegistryTests(SimpleTestCase):
+    """The feature stores declare exactly the registry's features, and the kernel matches pandas rolling."""
+
+    def test_models_match_registry(self):
+        self.assertEqual(model_field_mismatches(TechnicalFeatures, TECHNICAL), [])
+        self.assertEqual(model_field_mismatches(SentimentFeatures, SENTIMENT), [])
+
+    def test_matches_pandas_rolling(self):
+        rng = np.random.default_rng(0)
+        n_rows, columns = 2000, source_columns(FEATURES)
+        df = pd.DataFrame(rng.normal(0, 100, (n_rows, len(columns))), columns=columns)
+        df.iloc[:25, :4] = np.nan
+        df.iloc[rng.integers(0, n_rows, n_rows // 50), rng.integers(0, len(columns), n_rows // 50)] = np.nan
+        for col in ('extremely_positive', 'extremely_negative'):
+            df[col] = (rng.random(n_rows) < 0.2).astype(float)
+
+        ours, ref = feature_frame(df), _pandas_reference(df, FEATURES)
+        self.assertEqual(list(ours.columns), list(ref.columns))
+        np.testing.assert_allclose(ours.to_numpy(), ref.to_numpy(), rtol=PARITY_RTOL, atol=PARITY_ATOL)
+
+    def test_short_frames(self):
+        # fewer rows than the longest lookback, and no rows at all
+        columns = source_columns(FEATURES)
+        for n_rows in (0, 1, 5):
+            df = pd.DataFrame(np.arange(n_rows * len(columns), dtype=float).reshape(n_rows, len(columns)),
+                              columns=columns)
+            np.testing.assert_allclose(feature_frame(df).to_numpy(), _pandas_reference(df, FEATURES).to_numpy(),
+                                       rtol=PARITY_RTOL, atol=PARITY_ATOL, err_msg=f"n_rows={n_rows}")
+
+
+class AsofJoinTests(SimpleTestCase):
+    """asof_join against pd.merge_asof(direction='backward') on the same rows."""
+
+    def setUp(self):
+        self.left, self.right = _sample(5000, 2000, 3, seed=0)
+        self.ls, self.rs = self.left.sort_values('close_time'), self.right.sort_values('timestamp')
+
+    def test_matches_merge_asof(self):
+        checks = (
+            {},
+            {'by': 'coin'},
+            {'by': 'coin', 'tolerance': pd.Timedelta('1D')},
+            {'allow_exact_matches': False},
+        )
+        for kwargs in checks:
+            with self.subTest(**{k: str(v) for k, v in kwargs.items()}):
+                ours = asof_join(self.ls, self.rs, 'close_time', 'timestamp', **kwargs)
+                ref = pd.merge_asof(self.ls, self.rs, left_on='close_time', right_on='timestamp',
+                                    suffixes=('', '_right'), direction='backward', **kwargs)
+                pd.testing.assert_series_equal(ours['score'], ref['score'].reset_index(drop=True), check_names=False)
+
+    def test_empty_right(self):
+        # a coin without sentiment yet: left kept with missing right columns, or dropped for how='inner'
+        for how in ('left', 'inner'):
+            with self.subTest(how=how):
+                ours = asof_join(self.ls, self.rs.iloc[:0], 'close_time', 'timestamp', by='coin', how=how)
+                ref = pd.merge_asof(self.ls, self.rs.iloc[:0], left_on='close_time', right_on='timestamp', by='coin',
+                                    direction='backward')
+                if how == 'inner':
+                    ref = ref[ref['timestamp'].notna()]
+                pd.testing.assert_frame_equal(ours, ref.reset_index(drop=True), check_dtype=False)
+
+    def test_delay_keeps_left_order_without_lookahead(self):
+        delay = pd.Timedelta('12h')
+        ours = asof_join(self.left, self.right, 'close_time', 'timestamp', by='coin', delay=delay)
+        pd.testing.assert_series_equal(ours['close_time'], self.left['close_time'].reset_index(drop=True))
+
+        shifted = self.rs.assign(timestamp=self.rs['timestamp'] + delay)
+        ref = pd.merge_asof(self.ls, shifted, left_on='close_time', right_on='timestamp', by='coin',
+                            direction='backward')
+        pd.testing.assert_series_equal(ours.loc[self.ls.index, 'score'].reset_index(drop=True),
+                                       ref['score'].reset_index(drop=True), check_names=False)
+
+        matched = ours['timestamp'].notna()
+        self.assertTrue(matched.any())
+        self.assertTrue((ours.loc[matched, 'timestamp'] + delay <= ours.loc[matched, 'close_time']).all())
+
+
+class CompiledTreesTests(SimpleTestCase):
+    """The compiled node arrays against the XGBoost booster of final_xgb_model.pkl."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import xgboost
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)  # xgboost's "serialized by an older version"
+            cls.model, scaler = joblib.load(MODEL_PATH), joblib.load(SCALER_PATH)
+        cls.engine = compile_model(cls.model)
+
+        X = _sample_rows(scaler, 5000)
+        n_features = X.shape[1]
+        X[0] = np.nan                                   # every split takes its default branch
+        X[1:1 + n_features] = 0.0                       # the scaler's mean row ...
+        X[np.arange(1, 1 + n_features), np.arange(n_features)] = np.nan  # ... with one feature missing
+        cls.X = X
+        cls.margin = cls.model.get_booster().predict(xgboost.DMatrix(X), output_margin=True)
+
+    def test_margins_are_identical(self):
+        np.testing.assert_array_equal(self.engine.predict_margin(self.X), self.margin)
+
+    def test_labels_and_probabilities_match(self):
+        expected, actual = self.model.predict_proba(self.X), self.engine.predict_proba(self.X)
+        np.testing.assert_array_equal(np.argmax(actual, axis=1), self.model.predict(self.X))
+        # the float32 sigmoid may round the other way by one ulp
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-7)
+
+    def test_rows_with_missing_values(self):
+        rows = np.isnan(self.X).any(axis=1)
+        self.assertGreater(rows.sum(), len(self.X) // 4)
+        np.testing.assert_array_equal(self.engine.predict_margin(self.X[rows]), self.margin[rows])
+
+    def test_save_and_load(self):
+        path = os.path.join(tempfile.mkdtemp(), 'trees.npz')
+        self.engine.save(path)
+        np.testing.assert_array_equal(CompiledEnsemble.load(path).predict_proba(self.X),
+                                      self.engine.predict_proba(self.X))
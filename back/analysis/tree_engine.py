@@ -0,0 +1,268 @@
+"""
+Array-compiled evaluator for the XGBoost prediction model.
+
+`compile_model(model)` exports the booster's trees (from its JSON dump) into
+flat NumPy node arrays - split feature, threshold, children, default
+direction for missing values, leaf value - with global node ids, so all trees
+of the ensemble are one set of arrays. Nodes are renumbered breadth-first so
+a node's right child always follows its left child, and a step down a tree
+is `left[node] + went_right`. `CompiledEnsemble.predict_proba(X)` walks every
+tree for every row at once: one gather/compare step per tree level (max depth
+iterations), no DMatrix, no sklearn-wrapper input checks.
+
+It reproduces XGBoost's CPU prediction: float32 features, `x < threshold`
+goes left, NaN takes the default branch, leaf values are added to the base
+margin tree by tree in float32 (margins are bit-identical to the booster's)
+and the sum goes through the logistic function in float32 (the same value,
+except for rare inputs where the C library's expf rounds the other way: one
+float32 ulp, ~6e-8). Only what this project's model uses is supported (gbtree,
+binary:logistic, numeric splits); anything else raises ValueError and
+ModelServer keeps using xgboost.
+
+Parity with the booster of final_xgb_model.pkl is tested in
+analysis/tests.py. `python -m analysis.tree_engine` times predict_from_df
+with and without it; `--export PATH` writes the arrays to an .npz file
+(`CompiledEnsemble.load` reads it back).
+"""
+import json
+from typing import Dict
+
+import numpy as np
+
+# node arrays saved by CompiledEnsemble.save / read by .load
+_ARRAYS = ('roots', 'feature', 'threshold', 'left', 'default_left', 'value')
+
+
+class CompiledEnsemble:
+    """All trees of a binary:logistic gbtree model as flat node arrays."""
+
+    def __init__(self, roots, feature, threshold, left, default_left, value,
+                 base_margin: float, max_depth: int, n_features: int):
+        self.roots = np.asarray(roots, dtype=np.intp)             # root node id of each tree
+        self.feature = np.asarray(feature, dtype=np.intp)         # split feature (0 on leaves)
+        self.threshold = np.asarray(threshold, dtype=np.float32)  # x < threshold -> left (-inf on leaves)
+        self.left = np.asarray(left, dtype=np.intp)               # right child = left + 1; leaves: node - 1
+        self.default_left = np.asarray(default_left, dtype=bool)  # branch for a missing (NaN) value
+        self.value = np.asarray(value, dtype=np.float32)          # leaf value (0 on splits)
+        self.base_margin = np.float32(base_margin)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def leaf_values(self, X) -> np.ndarray:
+        """(n_rows, n_trees) float32 value of the leaf each row reaches in each tree."""
+        X = np.asarray(X, dtype=np.float32)  # DMatrix stores features as float32 too
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected a 2-D array with {self.n_features} features, got shape {X.shape}")
+        flat = X.ravel()
+        row_start = (np.arange(len(X)) * self.n_features)[:, None]
+        missing = bool(np.isnan(flat).any())
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        # a leaf always goes "right" to itself, so every tree can take max_depth steps
+        for _ in range(self.max_depth):
+            x = flat[row_start + self.feature[node]]
+            go_left = x < self.threshold[node]  # False for NaN
+            if missing:
+                go_left |= np.isnan(x) & self.default_left[node]
+            node = self.left[node] + ~go_left
+        return self.value[node]
+
+    def predict_margin(self, X) -> np.ndarray:
+        leaves = self.leaf_values(X)
+        margin = np.empty((len(leaves), self.n_trees + 1), dtype=np.float32)
+        margin[:, 0] = self.base_margin
+        margin[:, 1:] = leaves
+        # cumsum adds tree by tree, in float32, like the booster (a plain sum would pair values up)
+        return np.cumsum(margin, axis=1, dtype=np.float32)[:, -1]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """(n_rows, 2) float32 [P(class 0), P(class 1)], like XGBClassifier.predict_proba."""
+        # booster: 1.0f / (expf(min(-x, 88.7f)) + 1.0f); exp rounded from float64 matches C expf
+        # far more often than numpy's float32 exp
+        e = np.exp(np.minimum(-self.predict_margin(X), np.float32(88.7)).astype(np.float64)).astype(np.float32)
+        p = np.float32(1) / (e + np.float32(1))
+        return np.column_stack([np.float32(1) - p, p])
+
+    def save(self, path: str) -> None:
+        np.savez(path, base_margin=self.base_margin, max_depth=self.max_depth, n_features=self.n_features,
+                 **{name: getattr(self, name) for name in _ARRAYS})
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledEnsemble':
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in _ARRAYS}, base_margin=float(data['base_margin']),
+                       max_depth=int(data['max_depth']), n_features=int(data['n_features']))
+
+
+def _tree_depth(left, right) -> int:
+    depth, level = 0, [0]
+    while level:
+        level = [c for n in level for c in (left[n], right[n]) if c != -1]
+        depth += bool(level)
+    return depth
+
+
+def compile_model(model) -> CompiledEnsemble:
+    """Export an XGBClassifier (or Booster) into a CompiledEnsemble; ValueError if it uses unsupported features."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json').decode())['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported objective {objective!r} (only binary:logistic)")
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Unsupported booster {gbm['name']!r} (only gbtree)")
+    params = learner['learner_model_param']
+    if int(params.get('num_class', 0)) > 1 or int(params.get('num_target', 1)) != 1:
+        raise ValueError("Multi-class / multi-target models are not supported")
+
+    trees = gbm['model']['trees']
+    try:  # predict_proba stops at best_iteration when early stopping was used
+        trees = trees[:gbm['model']['iteration_indptr'][model.best_iteration + 1]]
+    except (AttributeError, KeyError, IndexError):
+        pass
+
+    roots, feature, threshold, left, default_left, value = [], [], [], [], [], []
+    max_depth, offset = 0, 0
+    for tree in trees:
+        if any(int(t) != 0 for t in tree['split_type']) or tree.get('categories_nodes'):
+            raise ValueError("Categorical splits are not supported")
+        lc, rc = tree['left_children'], tree['right_children']
+        # breadth-first order: siblings are adjacent, left first
+        order = [0]
+        for n in order:
+            if lc[n] != -1:
+                order += [lc[n], rc[n]]
+        order = np.asarray(order)
+        new_id = np.empty(len(lc), dtype=np.intp)
+        new_id[order] = offset + np.arange(len(order))
+
+        is_leaf = np.asarray(lc)[order] == -1
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)[order]
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, np.asarray(tree['split_indices'])[order]))
+        threshold.append(np.where(is_leaf, -np.inf, conditions).astype(np.float32))
+        left.append(np.where(is_leaf, new_id[order] - 1, new_id[np.maximum(np.asarray(lc)[order], 0)]))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool)[order] & ~is_leaf)
+        value.append(np.where(is_leaf, conditions, 0))  # a leaf's split_condition holds its value
+        max_depth = max(max_depth, _tree_depth(lc, rc))
+        offset += len(order)
+
+    # base_score is a probability ("[5.1E-1]" in xgboost >= 3); the margin starts at its logit
+    base_score = np.float32(str(params['base_score']).strip('[]'))
+    base_margin = -np.log(np.float32(1) / base_score - np.float32(1))
+    return CompiledEnsemble(
+        np.asarray(roots), np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+        np.concatenate(default_left), np.concatenate(value),
+        base_margin=float(base_margin), max_depth=max_depth, n_features=int(params['num_feature']),
+    )
+
+
+def check_parity(model, engine: CompiledEnsemble, X) -> Dict[str, float]:
+    """
+    Booster vs engine on X: rows with a different margin / P(class 1) and the
+    largest P(class 1) difference. Raises if a margin or a label differs.
+    """
+    import xgboost
+
+    margin = model.get_booster().predict(xgboost.DMatrix(X), output_margin=True)
+    margin_diff = int(np.sum(margin != engine.predict_margin(X)))
+    expected, actual = model.predict_proba(X), engine.predict_proba(X)
+    if margin_diff or not np.array_equal(np.argmax(expected, axis=1), np.argmax(actual, axis=1)):
+        raise AssertionError(f"Compiled ensemble differs from the booster ({margin_diff} margins)")
+    return {
+        'rows': len(X),
+        'proba_diff_rows': int(np.sum(expected[:, 1] != actual[:, 1])),
+        'max_proba_diff': float(np.max(np.abs(expected[:, 1] - actual[:, 1]))) if len(X) else 0.0,
+    }
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+
+def _sample_rows(scaler, n: int, seed: int = 0) -> np.ndarray:
+    """Scaled rows around the training distribution, with some NaNs for the default branches."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(scaler.mean_))) * 1.5
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def benchmark(repeat: int = 200) -> Dict[str, float]:
+    """
+    Seconds per TriggerPredictionView.predict_from_df call with the loaded
+    model_server scoring through xgboost vs the compiled trees (1 row and a
+    64-row batch), plus the compiled evaluator alone; raises if the two paths
+    disagree on a label.
+    """
+    import time
+
+    import pandas as pd
+
+    from .features import MODEL_FEATURES
+    from .model_server import model_server
+    from .views import TriggerPredictionView
+
+    model_server.ensure_loaded()
+    if model_server.engine is None:
+        raise RuntimeError(f"model_server is not using compiled trees: {model_server.status()}")
+    view = TriggerPredictionView()
+    compiled = model_server._loaded
+    xgboost_only = compiled[:3] + (None,)
+
+    def run(fn, runs):
+        fn()
+        started = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        return (time.perf_counter() - started) / runs
+
+    timings = {}
+    try:
+        for n in (1, 64):
+            scaled = np.nan_to_num(_sample_rows(model_server.scaler, n, seed=n))
+            df = pd.DataFrame(model_server.scaler.inverse_transform(scaled), columns=MODEL_FEATURES)
+            outputs = {}
+            for label, loaded in (('xgboost', xgboost_only), ('compiled', compiled)):
+                model_server._loaded = loaded
+                outputs[label] = view.predict_from_df(df)
+                timings[f'{label}_{n}'] = run(lambda: view.predict_from_df(df), repeat)
+            if not outputs['xgboost']['prediction'].equals(outputs['compiled']['prediction']):
+                raise AssertionError("predict_from_df labels differ between xgboost and the compiled trees")
+            timings[f'engine_{n}'] = run(lambda: model_server.engine.predict_proba(scaled), repeat)
+    finally:
+        model_server._loaded = compiled
+    return timings
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import warnings
+
+    import django
+
+    warnings.filterwarnings('ignore', category=UserWarning)  # xgboost's "serialized by an older version"
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+    from .model_server import model_server
+
+    parser = argparse.ArgumentParser(description="Compile the prediction model into NumPy node arrays")
+    parser.add_argument('--export', metavar='PATH', help="write the node arrays to this .npz file")
+    args = parser.parse_args()
+
+    model_server.load()
+    engine = compile_model(model_server.model)
+    print(f"{engine.n_trees} trees, {len(engine.feature)} nodes, max depth {engine.max_depth}")
+    if args.export:
+        engine.save(args.export)
+        print(f"exported to {args.export}")
+    t = benchmark()
+    for n in (1, 64):
+        print(f"predict_from_df, {n} row(s): xgboost {t[f'xgboost_{n}'] * 1e3:.3f}ms, "
+              f"compiled {t[f'compiled_{n}'] * 1e3:.3f}ms (trees alone {t[f'engine_{n}'] * 1e3:.3f}ms)")
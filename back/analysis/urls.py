@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import N8NWebhookReceiver, GetAnalysisResult, TriggerPredictionView
+from .views import N8NWebhookReceiver, GetAnalysisResult, TriggerPredictionView, FeatureFreshnessView, ModelStatusView, BatchPredictionView
 
 urlpatterns = [
     path('n8n-webhook/', N8NWebhookReceiver.as_view(), name='n8n-webhook'),
     path('n8n-prediction-webhook/', TriggerPredictionView.as_view(), name='n8n-prediction-webhook'),
+    path('n8n-prediction-webhook/batch/', BatchPredictionView.as_view(), name='n8n-prediction-webhook-batch'),
     path('get-analysis-result/<str:symbol>/', GetAnalysisResult.as_view(), name='get-analysis-result'),
+    path('feature-freshness/', FeatureFreshnessView.as_view(), name='feature-freshness'),
+    path('model-status/', ModelStatusView.as_view(), name='model-status'),
 ]
  
\ No newline at end of file
@@ -1,9 +1,6 @@
 # back/analysis/views.py
 import os
-import sys
-import joblib
 import pandas as pd
-import numpy as np
 import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -11,81 +8,22 @@ from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import logging
-from time import sleep
 
 # Import models and cache utility
 from redis_cache.cache_utils.analysis import AnalysisDataCache
-from .models import TechnicalFeatures, SentimentFeatures
-from analytics.models import Coin, MarketData, DailySentimentData
-from .tasks import update_all_technical_features_for_symbol, update_all_sentiment_features_for_symbol
-from celery import group
+from redis_cache.cache_utils.features import FeatureWatermarkCache
+from redis_cache.cache_utils.prediction import PredictionCache
+from .features import MODEL_FEATURES, TECHNICAL_FEATURE_NAMES, SENTIMENT_FEATURE_NAMES, MODEL_TO_DB_FIELD_MAP
+from analytics.models import Coin, MarketData
+from .tasks import materialize_features_for_symbol
+from .materialize import model_feature_frame, sentiment_input_version
+from .model_server import model_server
 from django.core.exceptions import ObjectDoesNotExist
-# --- ML Model Loading ---
-MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ML_model')
-MODEL_PATH = os.path.join(MODEL_DIR, 'final_xgb_model.pkl')
-SCALER_PATH = os.path.join(MODEL_DIR, 'scaler_xgb_model.pkl')
+# --- ML Model Loading (analysis/model_server.py: preloaded at process start, see AnalysisConfig.ready) ---
 STRATEGY_WORKFLOW_URL = os.environ.get('N8N_STRATEGY_WORKFLOW_URL')
 
-# Lazy load to avoid crashing server startup if files missing; no mock fallback
-model = None
-scaler = None
 logger = logging.getLogger(__name__)
 
-def _ensure_model_loaded():
-    global model, scaler
-    if model is None or scaler is None:
-        try:
-            # Sanity: verify xgboost import before unpickle
-            try:
-                import xgboost  # noqa: F401
-                logger.info(f"xgboost import OK (version={getattr(xgboost, '__version__', 'unknown')}).")
-            except ImportError as ie:
-                logger.error(
-                    "Failed to import xgboost inside backend.\n"
-                    f"Python: {sys.executable}\n"
-                    f"sys.path (first 3): {sys.path[:3]} ...\n"
-                    f"MODEL_DIR contents: {os.listdir(MODEL_DIR) if os.path.isdir(MODEL_DIR) else 'missing'}\n"
-                    f"Error: {ie}"
-                )
-                raise
-
-            logger.info(f"Loading model from {MODEL_PATH} and scaler from {SCALER_PATH}")
-            model = joblib.load(MODEL_PATH)
-            scaler = joblib.load(SCALER_PATH)
-            logger.info("Model and scaler loaded successfully.")
-
-            # Log model/scaler expected feature names if available
-            try:
-                model_feature_names = None
-                if hasattr(model, 'feature_names_in_'):
-                    model_feature_names = [str(x) for x in getattr(model, 'feature_names_in_')]
-                elif hasattr(model, 'get_booster'):
-                    try:
-                        booster = model.get_booster()
-                        model_feature_names = getattr(booster, 'feature_names', None)
-                    except Exception:
-                        model_feature_names = None
-                elif hasattr(model, 'n_features_in_'):
-                    model_feature_names = [f'f{i}' for i in range(int(getattr(model, 'n_features_in_', 0)))]
-
-                logger.info(
-                    "Model feature names (%s): %s",
-                    len(model_feature_names) if model_feature_names is not None else 'unknown',
-                    model_feature_names,
-                )
-
-                scaler_feature_names = getattr(scaler, 'feature_names_in_', None)
-                logger.info(
-                    "Scaler feature names (%s): %s",
-                    len(scaler_feature_names) if scaler_feature_names is not None else 'unknown',
-                    scaler_feature_names,
-                )
-            except Exception as e_info:
-                logger.warning("Could not introspect model/scaler features: %s", e_info)
-        except Exception as e:
-            logger.exception(f"Model/scaler load failed: {e}")
-            raise
-
 
 @method_decorator(csrf_exempt, name='dispatch')
 class N8NWebhookReceiver(APIView):
@@ -137,58 +75,65 @@ class GetAnalysisResult(APIView):
 
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class FeatureFreshnessView(APIView):
+    """
+    How far feature materialization has progressed per coin (optionally ?symbol=):
+    the latest stored candle, the watermark of each feature store, and how many
+    candles each store is behind.
+    """
+    permission_classes = []
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        coins = Coin.objects.all()
+        symbol = request.query_params.get('symbol')
+        if symbol:
+            coins = coins.filter(symbol=symbol.upper())
+
+        data = []
+        for coin in coins:
+            latest = MarketData.objects.filter(symbol=coin).order_by('-close_time').values('id', 'close_time').first()
+            if not latest:
+                continue
+            watermark = FeatureWatermarkCache.get_watermark(coin.symbol) or {}
+            entry = {
+                'symbol': coin.symbol,
+                'latest_candle': {'market_data_id': latest['id'], 'close_time': latest['close_time'].isoformat()},
+            }
+            for store in ('technical', 'sentiment'):
+                mark = watermark.get(store)
+                behind = MarketData.objects.filter(symbol=coin)
+                if mark:
+                    behind = behind.filter(close_time__gt=pd.Timestamp(mark['close_time']).to_pydatetime())
+                entry[store] = mark
+                entry[f'{store}_behind'] = behind.count()
+            data.append(entry)
+        return Response({'status': 'success', 'data': data}, status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ModelStatusView(APIView):
+    """Readiness of the prediction model in this process: 200 when loaded and warmed up, 503 otherwise."""
+    permission_classes = []
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        data = model_server.status()
+        code = status.HTTP_200_OK if data['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response({'status': 'success' if data['ready'] else 'error', 'data': data}, status=code)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class TriggerPredictionView(APIView):
     permission_classes = []
     authentication_classes = []
 
-    # === פיצ'רים טכניים (כולל 4 ה-change_pct שעברו לטכני) ===
-    TECH_FEATURES = [
-        'prev_atr_lag9', 'prev_macd_signal_lag4', 'prev_rsi_ma5', 'prev_bb_lower_lag10',
-        'prev_quote_volume_ma8', 'prev_macd_hist_std8_ma', 'prev_williams_r_ma7',
-        'volume_prev_ma10', 'prev_quote_volume_ma7', 'prev_close_ma5',
-        'prev_macd_hist_std7_ma', 'prev_taker_buy_base_volume_std7_ma',
-        'prev_rsi_std2_ma', 'prev_taker_buy_quote_volume_lag10',
-        '2_periods_back_back_change_pct', '2_periods_back_back_change_pct_lag1',
-        '2_periods_back_back_change_pct_lag4', '2_periods_back_back_change_pct_lag8',
-    ]
-
-    # === פיצ'רי סנטימנט (ללא ה-change_pct) ===
-    SENT_FEATURES = [
-        'prev_num_articles_ma1_10', 'prev_extremely_positive_count_ma1_5',
-        'prev_avg_sentiment_std1_6_ma', 'prev_extremely_positive_count_ma1_4',
-        'prev_extremely_negative_count_lag5', 'avg_sentiment_news_prev_std5_ma',
-        'prev_avg_sentiment_lag4', 'prev_min_sentiment_lag10', 'prev_std_sentiment_lag1',
-        'prev_min_sentiment_lag1', 'prev_std_sentiment_lag3', 'prev_median_sentiment_lag8',
-        'prev_extremely_negative_count_std1_9_ma',
-    ]
-
-    # === סדר הפיצ'רים המדויק שה-SCALER מצפה לו ===
-    EXPECTED_FEATURES = [
-        'prev_extremely_negative_count_std1_9_ma', 'prev_num_articles_ma1_10',
-        'prev_extremely_positive_count_ma1_5', 'prev_atr_lag9',
-        'prev_macd_signal_lag4', 'prev_rsi_ma5', 'prev_bb_lower_lag10',
-        'prev_quote_volume_ma8', 'prev_macd_hist_std8_ma', 'prev_williams_r_ma7',
-        'volume_prev_ma10', 'prev_quote_volume_ma7', 'prev_close_ma5',
-        'prev_avg_sentiment_std1_6_ma', 'prev_macd_hist_std7_ma',
-        'prev_extremely_positive_count_ma1_4',
-        'prev_extremely_negative_count_lag5', 'prev_taker_buy_base_volume_std7_ma',
-        'avg_sentiment_news_prev_std5_ma', '2_periods_back_back_change_pct',
-        '2_periods_back_back_change_pct_lag1',
-        '2_periods_back_back_change_pct_lag4', 'prev_avg_sentiment_lag4',
-        'prev_min_sentiment_lag10', '2_periods_back_back_change_pct_lag8',
-        'prev_std_sentiment_lag1', 'prev_min_sentiment_lag1',
-        'prev_std_sentiment_lag3', 'prev_rsi_std2_ma',
-        'prev_taker_buy_quote_volume_lag10', 'prev_median_sentiment_lag8'
-    ]
-
-    # === מיפוי משמות שהמודל מצפה להם לשמות שדות ב-DB ===
-    MODEL_TO_DB_FIELD_MAP = {
-        '2_periods_back_back_change_pct': 'change_pct',
-        '2_periods_back_back_change_pct_lag1': 'change_pct_lag1',
-        '2_periods_back_back_change_pct_lag4': 'change_pct_lag4',
-        '2_periods_back_back_change_pct_lag8': 'change_pct_lag8',
-    }
+    # === רשימות הפיצ'רים, הסדר שה-SCALER מצפה לו והמיפוי לשדות ה-DB - מה-registry (analysis/features.py) ===
+    TECH_FEATURES = TECHNICAL_FEATURE_NAMES
+    SENT_FEATURES = SENTIMENT_FEATURE_NAMES
+    EXPECTED_FEATURES = MODEL_FEATURES
+    MODEL_TO_DB_FIELD_MAP = MODEL_TO_DB_FIELD_MAP
     
     EXTRA_COLS_TO_DROP = {'timestamp_id', 'record_timestamp', 'symbol_id', 'id'}
 
@@ -203,6 +148,55 @@ class TriggerPredictionView(APIView):
         )
         return sym.strip().upper() if isinstance(sym, str) and sym.strip() else None
 
+    @staticmethod
+    def _target_candle(coin, market_data_id=None):
+        """
+        {'id', 'close_time', 'sentiment_version'} of the requested candle of the
+        coin, or of its latest one; the version is part of the prediction cache key.
+        """
+        market_qs = MarketData.objects.filter(symbol=coin)
+        if market_data_id is not None:
+            target = market_qs.filter(id=market_data_id).values('id', 'close_time').first()
+        else:
+            target = market_qs.order_by('-close_time').values('id', 'close_time').first()
+        if target:
+            target['sentiment_version'] = sentiment_input_version(coin, target['close_time'])
+        return target
+
+    @staticmethod
+    def _cached_prediction(symbol: str, target) -> dict | None:
+        """Stored result for this candle and sentiment input from the currently loaded model (None on a miss)."""
+        model_server.ensure_loaded()  # reloads a replaced model first -> its hash is the one looked up
+        return PredictionCache.get_prediction(symbol, target['id'], target['sentiment_version'],
+                                              model_server.artifact_hash)
+
+    @staticmethod
+    def _cache_prediction(symbol: str, target, pred: int, proba_0: float, proba_1: float) -> dict:
+        result = {
+            'prediction': pred,
+            'probabilities': {'class_0': proba_0, 'class_1': proba_1},
+            'timestamp_id': target['id'],
+            'close_time': target['close_time'].isoformat(),
+        }
+        PredictionCache.set_prediction(symbol, target['id'], target['sentiment_version'],
+                                       model_server.artifact_hash, result)
+        return result
+
+    def _materialize_async(self, symbol: str, close_time) -> None:
+        """Queue the TechnicalFeatures/SentimentFeatures rows of this candle unless both stores already have it."""
+        watermark = FeatureWatermarkCache.get_watermark(symbol) or {}
+        close_time_ms = int(close_time.timestamp() * 1000)
+        if all((watermark.get(store) or {}).get('close_time_ms', -1) >= close_time_ms for store in ('technical', 'sentiment')):
+            return
+        try:
+            # retry=False: broker לא זמין -> נכשל מיד במקום לחסום את התגובה בניסיונות חוזרים
+            materialize_features_for_symbol.apply_async(
+                args=(symbol,), kwargs={'since': close_time.isoformat(), 'until': close_time.isoformat()}, retry=False,
+            )
+        except Exception as e:
+            # בלי broker - החיזוי לא נכשל; האירוע candles_closed / orchestrator ישלימו
+            logger.error(f"[{symbol}] could not queue feature materialization: {e}")
+
     def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """ניקוי/ולידציה והעמדה לפי הסדר שהמודל מצפה אליו."""
         # הסרת עמודות מיותרות
@@ -222,9 +216,10 @@ class TriggerPredictionView(APIView):
         # סידור עמודות
         df = df[self.EXPECTED_FEATURES].copy()
 
-        # המרה למספרים + בדיקת NaN
+        # המרה למספרים (רק עמודות שאינן מספריות כבר) + בדיקת NaN
         for col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors="coerce")
         if df.isna().any().any():
             bad_cols = df.columns[df.isna().any()].tolist()
             raise ValueError(f"NaN found in columns after numeric coercion: {bad_cols}")
@@ -232,37 +227,15 @@ class TriggerPredictionView(APIView):
         return df
 
     def predict_from_df(self, df_raw: pd.DataFrame) -> pd.DataFrame:
-        _ensure_model_loaded() # Ensure model and scaler are loaded
+        model_server.ensure_loaded()  # no-op once preloaded
         X = self.prepare_features(df_raw)
 
         # שמירה על DataFrame (sklearn ColumnTransformer/Scaler)
-        X_scaled = scaler.transform(X)
-
-        # אם המודל תומך בקביעה מפורשת של device, ננסה CPU
-        if hasattr(model, "set_params"):
-            try:
-                model.set_params(device='cpu')
-            except Exception:
-                pass
-
-        preds = model.predict(X_scaled).astype(int)
-
-        if hasattr(model, "predict_proba"):
-            probas = model.predict_proba(X_scaled)
-            # איתור אינדקס של class=1 (למקרה שסדר הכיתות לא [0,1])
-            if hasattr(model, "classes_"):
-                class_idx_1 = int(np.where(model.classes_ == 1)[0][0])
-            else:
-                class_idx_1 = 1
-            proba_class_1 = probas[:, class_idx_1]
-            proba_class_0 = 1.0 - proba_class_1
-        else:
-            proba_class_1 = np.full(len(preds), np.nan)
-            proba_class_0 = np.full(len(preds), np.nan)
+        preds, proba_class_1 = model_server.predict(X)
 
         out = df_raw.copy()
         out["prediction"] = preds
-        out["proba_class_0"] = proba_class_0
+        out["proba_class_0"] = 1.0 - proba_class_1
         out["proba_class_1"] = proba_class_1
         return out
 
@@ -283,94 +256,65 @@ class TriggerPredictionView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # 2) נקודת ייחוס – אחרון בזמן
-            latest_market = (
-                MarketData.objects.filter(symbol=coin)
-                .order_by('-close_time')
-                .first()
-            )
-            if not latest_market:
-                return Response(
-                    {'status': 'error', 'message': f'No market data for {symbol}.'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            market_data_id = latest_market.id
-
-            try:
-                update_all_technical_features_for_symbol(symbol, market_data_id),
-                update_all_sentiment_features_for_symbol(symbol, market_data_id),
-            except Exception as e:
-                return Response(
-                    {'status': 'error', 'message': f'Feature update tasks did not complete: {e}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-
-            # 4) פול קצר – שליפת שתי הרשומות באותו timestamp_id
-            tech_vals = sent_vals = None
-            for _ in range(20):  # ~10 שניות
-                # בונה את רשימת השדות לשליפה מה-DB תוך שימוש במילון המיפוי
-                tech_fields_to_fetch = [
-                    self.MODEL_TO_DB_FIELD_MAP.get(f, f) for f in self.TECH_FEATURES
-                ]
-                
-                tech_vals_raw = (
-                    TechnicalFeatures.objects
-                    .filter(symbol=coin)
-                    .values(*tech_fields_to_fetch)
-                    .first()
-                )
-                
-                # מתרגם את המפתחות חזרה לשמות שהמודל מצפה להם
-                if tech_vals_raw:
-                    tech_vals = {
-                        model_field: tech_vals_raw[db_field]
-                        for model_field, db_field in self.MODEL_TO_DB_FIELD_MAP.items()
-                        if db_field in tech_vals_raw
-                    }
-                    # מוסיף את שאר הפיצ'רים שלא צריכים תרגום
-                    other_tech_fields = [f for f in self.TECH_FEATURES if f not in self.MODEL_TO_DB_FIELD_MAP]
-                    tech_vals.update({f: tech_vals_raw[f] for f in other_tech_fields if f in tech_vals_raw})
-                else:
-                    tech_vals = None
-
-                sent_vals = (
-                    SentimentFeatures.objects
-                    .filter(symbol=coin)
-                    .values(*self.SENT_FEATURES)
-                    .first()
-                )
-                if tech_vals and sent_vals:
-                    break
-                sleep(0.5)
-
-            if not tech_vals or not sent_vals:
+            # 2) נקודת ייחוס – market_data_id מה-payload, אחרת הנר האחרון בזמן
+            requested_id = request.data.get('market_data_id')
+            if requested_id is not None:
+                try:
+                    if isinstance(requested_id, bool):
+                        raise ValueError(requested_id)
+                    requested_id = int(str(requested_id).strip())
+                except (TypeError, ValueError):
+                    return Response(
+                        {'status': 'error', 'message': f"'market_data_id' must be an integer id, got {requested_id!r}."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            target = self._target_candle(coin, requested_id)
+            if not target:
                 return Response(
-                    {
-                        'status': 'error',
-                        'message': 'Features missing after computation.',
-                        'details': {'expected_timestamp_id': market_data_id}
-                    },
+                    {'status': 'error', 'message': f'No market data for {symbol}'
+                                                   + (f' with id {requested_id}.' if requested_id is not None else '.')},
                     status=status.HTTP_404_NOT_FOUND
                 )
-
-            # 5) הרצת מודל
-            row = {**tech_vals, **sent_vals}
-            logger.info(f"Raw features for prediction: {row}") # Add logging here
-            df = pd.DataFrame([row])
-            out_df = self.predict_from_df(df)
-
-            pred = int(out_df["prediction"].iloc[0])
-            proba_0 = float(out_df["proba_class_0"].iloc[0])
-            proba_1 = float(out_df["proba_class_1"].iloc[0])
+            market_data_id = target['id']
+
+            # 3) אותו נר + אותו מודל כבר חושבו -> התוצאה מה-cache, בלי פיצ'רים ובלי מודל
+            cached = self._cached_prediction(symbol, target)
+            if cached is None:
+                # 4) פיצ'רים לנר המבוקש בדיוק - מחושבים כאן (קריאה חסומה ל-lookback) ועוברים ישר למודל
+                features = model_feature_frame(coin, since=target['close_time'], until=target['close_time'])
+                if features.empty:
+                    return Response(
+                        {
+                            'status': 'error',
+                            'message': 'No technical/sentiment features for this candle (missing history or sentiment).',
+                            'details': {'expected_timestamp_id': market_data_id}
+                        },
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+
+                # 5) הרצת מודל
+                df = features[self.EXPECTED_FEATURES]
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Raw features for prediction: %s", df.iloc[0].to_dict())
+                out_df = self.predict_from_df(df)
+                result = self._cache_prediction(symbol, target, int(out_df["prediction"].iloc[0]),
+                                                float(out_df["proba_class_0"].iloc[0]),
+                                                float(out_df["proba_class_1"].iloc[0]))
+
+                # שמירת שורות הפיצ'רים ברקע, אחרי שהחיזוי כבר ב-cache, רק אם ה-watermark עוד לא מכסה את הנר
+                self._materialize_async(symbol, target['close_time'])
+            else:
+                result = cached
 
             # 6) העשרת ה-payload והפניית סטרטגיה (אם יש URL)
             enriched = request.data.copy()
             enriched['prediction_results'] = {
-                'prediction': pred,
-                'probabilities': {'class_0': proba_0, 'class_1': proba_1},
+                'prediction': result['prediction'],
+                'probabilities': result['probabilities'],
                 'status': 'success',
                 'mode': 'live',
-                'timestamp_id': market_data_id
+                'timestamp_id': market_data_id,
+                'cached': cached is not None,
             }
 
             forwarding_info = {
@@ -398,4 +342,102 @@ class TriggerPredictionView(APIView):
         except Exception as e:
             logger.exception("TriggerPredictionView failed")
             return Response({'status': 'error', 'message': str(e)},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchPredictionView(TriggerPredictionView):
+    """
+    Predictions for several coins in one call: {"symbols": ["BTC", "ETH"]}, or
+    "all" / no symbols for every active coin. The latest candle's features of
+    each coin go into one matrix -> one scaler pass + one predict_proba. Coins
+    without a candle or features are reported per symbol and do not fail the
+    batch. Coins whose latest candle was already predicted by the loaded model
+    are answered from PredictionCache. Nothing is forwarded to the strategy
+    workflow.
+    """
+
+    def post(self, request, *args, **kwargs):
+        try:
+            requested = request.data.get('symbols', 'all')
+            coins = Coin.objects.all()
+            if requested in (None, 'all', []):
+                coins = coins.filter(is_active=True)
+            elif isinstance(requested, list) and all(isinstance(s, str) for s in requested):
+                wanted = [s.strip().upper() for s in requested if s.strip()]
+                coins = coins.filter(symbol__in=wanted)
+            else:
+                return Response(
+                    {'status': 'error', 'message': "'symbols' must be a list of symbols or 'all'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            results, rows, hits, to_materialize = {}, [], 0, []
+            if isinstance(requested, list):
+                results = {s.strip().upper(): {'status': 'error', 'message': 'Symbol not found.'}
+                           for s in requested if s.strip()}
+            for coin in coins.order_by('symbol'):
+                target = self._target_candle(coin)
+                if not target:
+                    results[coin.symbol] = {'status': 'error', 'message': 'No market data.'}
+                    continue
+                cached = self._cached_prediction(coin.symbol, target)
+                if cached is not None:
+                    results[coin.symbol] = self._batch_result(cached, cached=True)
+                    hits += 1
+                    continue
+                features = model_feature_frame(coin, since=target['close_time'], until=target['close_time'])
+                if features.empty:
+                    results[coin.symbol] = {
+                        'status': 'error', 'message': 'No technical/sentiment features for this candle.',
+                        'timestamp_id': target['id'],
+                    }
+                    continue
+                to_materialize.append((coin.symbol, target['close_time']))
+                incomplete = features[self.EXPECTED_FEATURES].columns[features[self.EXPECTED_FEATURES].isna().any()]
+                if len(incomplete):
+                    results[coin.symbol] = {
+                        'status': 'error', 'message': f'NaN features: {incomplete.tolist()}',
+                        'timestamp_id': target['id'],
+                    }
+                    continue
+                rows.append((coin.symbol, target, features))
+
+            if rows:
+                # מטריצה אחת לכל המטבעות -> קריאת מודל אחת
+                out_df = self.predict_from_df(pd.concat([f[self.EXPECTED_FEATURES] for _, _, f in rows],
+                                                        ignore_index=True))
+                for (symbol, target, _), pred, proba_0, proba_1 in zip(
+                        rows, out_df['prediction'], out_df['proba_class_0'], out_df['proba_class_1']):
+                    result = self._cache_prediction(symbol, target, int(pred), float(proba_0), float(proba_1))
+                    results[symbol] = self._batch_result(result, cached=False)
+
+            # שמירת הפיצ'רים ברקע רק אחרי שכל החיזויים חושבו ונשמרו ב-cache
+            for symbol, close_time in to_materialize:
+                self._materialize_async(symbol, close_time)
+
+            return Response(
+                {'status': 'success', 'count': len(rows) + hits, 'cached': hits,
+                 'data': dict(sorted(results.items()))},
+                status=status.HTTP_200_OK
+            )
+
+        except ValueError as ve:
+            return Response({'status': 'error', 'message': f'Feature preparation error: {ve}'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except Exception as e:
+            logger.exception("BatchPredictionView failed")
+            return Response({'status': 'error', 'message': str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def _batch_result(result: dict, cached: bool) -> dict:
+        return {
+            'prediction': result['prediction'],
+            'probabilities': result['probabilities'],
+            'status': 'success',
+            'mode': 'live',
+            'timestamp_id': result['timestamp_id'],
+            'close_time': result['close_time'],
+            'cached': cached,
+        }
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Binance reports the weight consumed in the current 1-minute window on every response
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+KLINES_PATH = '/api/v3/klines'
+KLINES_WEIGHT = 2
+
+
+class WeightRateLimiter:
+    """
+    Thread-safe token bucket over Binance request weight.
+
+    The bucket refills continuously at `limit / 60` tokens per second and is
+    re-synced from the used-weight header after every response, so several
+    workers sharing one limiter stay below the exchange limit together.
+    """
+
+    def __init__(self, limit_per_minute: int, safety_ratio: float = 0.9):
+        self.capacity = max(1.0, limit_per_minute * safety_ratio)
+        self.refill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def acquire(self, weight: int = 1) -> None:
+        """Block until `weight` tokens are available (or a ban/back-off has expired)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = max(self.blocked_until - now, (weight - self.tokens) / self.refill_rate)
+            time.sleep(max(wait, 0.01))
+
+    def update_from_headers(self, headers) -> None:
+        """Trust the server's view of used weight when it is stricter than ours."""
+        used = headers.get(USED_WEIGHT_HEADER)
+        if used is None:
+            return
+        try:
+            used = int(used)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, self.capacity - used)
+
+    def block_for(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (Retry-After on 429/418)."""
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated_at = now
+
+
+class BinanceRestClient:
+    """
+    Shared Binance REST client: keep-alive connection pool + weight-aware limiter.
+    Retries 429/418 after Retry-After and 5xx/network errors with exponential back-off.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        weight_limit: Optional[int] = None,
+        pool_size: int = 16,
+        max_retries: int = 5,
+        timeout: int = 10,
+    ):
+        self.base_url = (base_url or getattr(settings, 'BINANCE_REST_BASE_URL', 'https://api.binance.com')).rstrip('/')
+        self.limiter = WeightRateLimiter(
+            weight_limit or getattr(settings, 'BINANCE_REQUEST_WEIGHT_LIMIT', 6000)
+        )
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, weight: int = 1) -> Any:
+        """GET `path` and return decoded JSON; raises requests exceptions when retries are exhausted."""
+        url = f"{self.base_url}{path}"
+        backoff = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            self.limiter.acquire(weight)
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Binance request error ({attempt}/{self.max_retries}) for {path}: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+
+            self.limiter.update_from_headers(response.headers)
+
+            if response.status_code in (429, 418):
+                retry_after = self._retry_after(response, default=backoff * 60 if response.status_code == 418 else backoff)
+                self.limiter.block_for(retry_after)
+                log = logger.error if response.status_code == 418 else logger.warning
+                log(f"Binance rate limit {response.status_code} for {path}; backing off {retry_after:.0f}s "
+                    f"({attempt}/{self.max_retries})")
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                backoff = min(backoff * 2, 30)
+                continue
+
+            if response.status_code >= 500 and attempt < self.max_retries:
+                logger.warning(f"Binance {response.status_code} for {path} ({attempt}/{self.max_retries})")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    @staticmethod
+    def _retry_after(response, default: float) -> float:
+        try:
+            return float(response.headers.get('Retry-After', default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_klines(self, params: Dict[str, Any]) -> list:
+        """One /api/v3/klines page (raw Binance rows)."""
+        return self.get(KLINES_PATH, params=params, weight=KLINES_WEIGHT)
+
+
+# Create a singleton instance shared by all ingestion paths in the process
+binance_client = BinanceRestClient()
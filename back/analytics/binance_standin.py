@@ -0,0 +1,349 @@
+"""
+Local Binance stand-in for offline benchmarking and regression runs.
+
+Serves the two endpoints our ingestion uses, with deterministic synthetic data:
+
+  GET /api/v3/klines          same params/response shape as Binance (startTime,
+                              endTime, limit, interval, timeZone), weight
+                              accounting, X-MBX-USED-WEIGHT-1M and 429 +
+                              Retry-After once the per-minute weight is spent
+  WS  /stream?streams=...     combined `<pair>@ticker` stream in the
+                              {"stream": ..., "data": {...}} format the
+                              BinanceWebSocketConsumer parses
+
+Prices are a pure function of (symbol, timestamp), so any window of any
+interval returns the same candles on every run and consecutive candles chain
+(close == next open). Latency, jitter, weight limit, injected 5xx errors and
+the ticker message rate are configurable, which makes it possible to load
+the pipeline 10-100x harder than production on one machine.
+
+Run:   python -m analytics.binance_standin --port 9100 --latency-ms 20 --ws-rate 50
+Use:   BINANCE_STANDIN_URL=http://localhost:9100 (repoints REST + WebSocket, see settings)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+from .resample import bucket_origin_ms
+
+logger = logging.getLogger(__name__)
+
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+KLINES_WEIGHT = 2  # flat weight of /api/v3/klines
+
+_MINUTE_MS = 60_000
+_HOUR_MS = 3_600_000
+_DAY_MS = 24 * _HOUR_MS
+
+INTERVAL_MS = {
+    '1m': _MINUTE_MS, '3m': 3 * _MINUTE_MS, '5m': 5 * _MINUTE_MS, '15m': 15 * _MINUTE_MS,
+    '30m': 30 * _MINUTE_MS, '1h': _HOUR_MS, '2h': 2 * _HOUR_MS, '4h': 4 * _HOUR_MS,
+    '6h': 6 * _HOUR_MS, '8h': 8 * _HOUR_MS, '12h': 12 * _HOUR_MS, '1d': _DAY_MS,
+    '3d': 3 * _DAY_MS, '1w': 7 * _DAY_MS,
+}
+
+# Rough price levels so the synthetic series look like the coins we track
+BASE_PRICES = {'BTC': 60_000.0, 'ETH': 3_000.0, 'SOL': 150.0, 'XRP': 0.6, 'LTC': 80.0}
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+@dataclass
+class StandinConfig:
+    latency_ms: float = 0.0        # added to every REST response
+    jitter_ms: float = 0.0         # uniform extra latency in [0, jitter_ms]
+    weight_limit: int = 6000       # request weight per minute and client IP (0 = unlimited)
+    error_rate: float = 0.0        # share of REST requests answered with 503
+    ws_rate: float = 1.0           # ticker messages per second per stream
+    seed: int = 0                  # changes every generated series
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """Counter-based hash: uint64 -> well mixed uint64 (vectorized)."""
+    with np.errstate(over='ignore'):
+        z = (x + np.uint64(0x9E3779B97F4A7C15)) & _MASK64
+        z = ((z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)) & _MASK64
+        z = ((z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)) & _MASK64
+        return z ^ (z >> np.uint64(31))
+
+
+def _uniform(keys: np.ndarray, salt: int) -> np.ndarray:
+    """Deterministic U[0, 1) per key."""
+    mixed = _splitmix64(keys.astype(np.uint64) ^ np.uint64(salt & 0xFFFFFFFFFFFFFFFF))
+    return (mixed >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _symbol_salt(symbol: str, seed: int) -> int:
+    salt = seed * 1_000_003
+    for ch in symbol.upper():
+        salt = (salt * 131 + ord(ch)) & 0xFFFFFFFFFFFF
+    return salt
+
+
+def synthetic_price(symbol: str, t_ms: np.ndarray, seed: int = 0) -> np.ndarray:
+    """
+    Price of `symbol` at epoch-ms `t_ms`: a few slow cycles plus per-minute
+    hashed noise around the coin's base level. Pure function of its inputs.
+    """
+    base_symbol = symbol.upper()
+    if base_symbol.endswith('USDT'):
+        base_symbol = base_symbol[:-4]
+    salt = _symbol_salt(base_symbol, seed)
+    base = BASE_PRICES.get(base_symbol, 1.0 + salt % 997)
+    t = np.asarray(t_ms, dtype=np.int64)
+    days = t / _DAY_MS
+    phase = (salt % 360) / 57.29577951308232
+    log_move = (
+        0.25 * np.sin(2 * np.pi * days / 97.0 + phase)
+        + 0.08 * np.sin(2 * np.pi * days / 13.0 + 2 * phase)
+        + 0.02 * np.sin(2 * np.pi * days / 1.7 + 3 * phase)
+        + 0.004 * (_uniform(t // _MINUTE_MS, salt) - 0.5)
+    )
+    return base * np.exp(log_move)
+
+
+def synthetic_klines(symbol: str, interval_ms: int, open_times: np.ndarray, seed: int = 0) -> List[list]:
+    """Binance-format kline rows (decimal strings) for the given open times."""
+    if not len(open_times):
+        return []
+    salt = _symbol_salt(symbol, seed)
+    open_times = np.asarray(open_times, dtype=np.int64)
+    close_times = open_times + interval_ms - 1
+    open_p = synthetic_price(symbol, open_times, seed)
+    close_p = synthetic_price(symbol, open_times + interval_ms, seed)  # == next candle's open
+    spread = 0.002 + 0.01 * np.sqrt(interval_ms / _DAY_MS)
+    high = np.maximum(open_p, close_p) * (1 + spread * _uniform(open_times, salt + 1))
+    low = np.minimum(open_p, close_p) * (1 - spread * _uniform(open_times, salt + 2))
+    volume = (50 + 950 * _uniform(open_times, salt + 3)) * (interval_ms / _HOUR_MS)
+    quote_volume = volume * (open_p + close_p) / 2
+    trades = (volume * 40).astype(np.int64)
+    taker_share = 0.4 + 0.2 * _uniform(open_times, salt + 4)
+
+    return [
+        [int(ot), f"{o:.8f}", f"{h:.8f}", f"{lo:.8f}", f"{c:.8f}", f"{v:.8f}", int(ct),
+         f"{qv:.8f}", int(n), f"{v * s:.8f}", f"{qv * s:.8f}", "0"]
+        for ot, o, h, lo, c, v, ct, qv, n, s in zip(
+            open_times, open_p, high, low, close_p, volume, close_times, quote_volume, trades, taker_share
+        )
+    ]
+
+
+def synthetic_ticker(symbol: str, now_ms: int, seed: int = 0) -> Dict[str, object]:
+    """24hr ticker payload (the fields our consumer reads plus the usual extras)."""
+    window = now_ms - _DAY_MS + np.arange(0, _DAY_MS + 1, 15 * _MINUTE_MS, dtype=np.int64)
+    prices = synthetic_price(symbol, window, seed)
+    last, first = float(prices[-1]), float(prices[0])
+    volume = float(synthetic_klines(symbol, _DAY_MS, np.array([now_ms - _DAY_MS]), seed)[0][5])
+    return {
+        'e': '24hrTicker', 'E': now_ms, 's': symbol.upper(),
+        'p': f"{last - first:.8f}", 'P': f"{(last - first) / first * 100:.3f}",
+        'w': f"{float(prices.mean()):.8f}", 'c': f"{last:.8f}", 'o': f"{first:.8f}",
+        'h': f"{float(prices.max()):.8f}", 'l': f"{float(prices.min()):.8f}",
+        'v': f"{volume:.8f}", 'q': f"{volume * float(prices.mean()):.8f}",
+        'O': now_ms - _DAY_MS, 'C': now_ms,
+    }
+
+
+def kline_open_times(interval: str, start_ms: Optional[int], end_ms: Optional[int], limit: int,
+                     tz_offset_hours: int, now_ms: int) -> np.ndarray:
+    """Open times Binance would return: in [startTime, endTime], not in the future, at most `limit`."""
+    interval_ms = INTERVAL_MS[interval]
+    # timeZone shifts bucket boundaries for hour-or-longer intervals only
+    origin = bucket_origin_ms(interval_ms, tz_offset_hours if interval_ms >= _HOUR_MS else 0)
+    last_open = (now_ms - origin) // interval_ms * interval_ms + origin  # the still-forming candle
+    if end_ms is not None:
+        last_open = min(last_open, (end_ms - origin) // interval_ms * interval_ms + origin)
+
+    if start_ms is not None:
+        first_open = -((origin - start_ms) // interval_ms) * interval_ms + origin  # ceil to a boundary
+        stop = min(last_open, first_open + (limit - 1) * interval_ms)
+    else:
+        stop = last_open
+        first_open = stop - (limit - 1) * interval_ms
+    if stop < first_open:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(first_open, stop + 1, interval_ms, dtype=np.int64)
+
+
+class _WeightWindow:
+    """Per-client used weight in fixed 1-minute windows, like Binance's IP limits."""
+
+    def __init__(self):
+        self.windows: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, client: str, weight: int, now_ms: int) -> Tuple[int, float]:
+        """Count `weight` for `client`; returns (used weight, seconds until the window resets)."""
+        minute = now_ms // _MINUTE_MS
+        window, used = self.windows.get(client, (minute, 0))
+        if window != minute:
+            used = 0
+        used += weight
+        self.windows[client] = (minute, used)
+        return used, ((minute + 1) * _MINUTE_MS - now_ms) / 1000
+
+
+def _error(status: int, code: int, msg: str, headers=None) -> web.Response:
+    return web.json_response({'code': code, 'msg': msg}, status=status, headers=headers)
+
+
+def _int_param(query, name: str) -> Optional[int]:
+    value = query.get(name)
+    return int(value) if value not in (None, '') else None
+
+
+def create_app(config: Optional[StandinConfig] = None) -> web.Application:
+    config = config or StandinConfig()
+    app = web.Application()
+    app['config'] = config
+    app['weights'] = _WeightWindow()
+    app['rng'] = random.Random(config.seed)
+    app['stats'] = {'requests': 0, 'klines': 0, 'rate_limited': 0, 'errors': 0,
+                    'ws_clients': 0, 'ws_messages': 0}
+
+    async def _simulate_latency():
+        delay = config.latency_ms + (app['rng'].uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    async def klines(request: web.Request) -> web.Response:
+        stats = app['stats']
+        stats['requests'] += 1
+        await _simulate_latency()
+
+        query = request.query
+        try:
+            limit = min(max(_int_param(query, 'limit') or 500, 1), 1000)
+            start_ms = _int_param(query, 'startTime')
+            end_ms = _int_param(query, 'endTime')
+            tz_offset = int(float(query.get('timeZone') or 0))
+        except ValueError:
+            return _error(400, -1100, 'Illegal characters found in a parameter.')
+
+        now_ms = int(time.time() * 1000)
+        headers = {}
+        if config.weight_limit:
+            used, reset_in = app['weights'].add(request.remote or 'local', KLINES_WEIGHT, now_ms)
+            headers[USED_WEIGHT_HEADER] = str(used)
+            if used > config.weight_limit:
+                stats['rate_limited'] += 1
+                headers['Retry-After'] = str(max(1, int(reset_in + 0.999)))
+                return _error(429, -1003, 'Too much request weight used; current limit is '
+                                          f'{config.weight_limit} request weight per 1 MINUTE.', headers)
+
+        if config.error_rate and app['rng'].random() < config.error_rate:
+            stats['errors'] += 1
+            return _error(503, -1001, 'Internal error; unable to process your request. Please try again.', headers)
+
+        symbol = query.get('symbol', '').upper()
+        interval = query.get('interval', '')
+        if not symbol.endswith('USDT') or len(symbol) <= 4:
+            return _error(400, -1121, 'Invalid symbol.', headers)
+        if interval not in INTERVAL_MS:
+            return _error(400, -1120, 'Invalid interval.', headers)
+
+        open_times = kline_open_times(interval, start_ms, end_ms, limit, tz_offset, now_ms)
+        rows = synthetic_klines(symbol, INTERVAL_MS[interval], open_times, config.seed)
+        stats['klines'] += len(rows)
+        return web.json_response(rows, headers=headers)
+
+    async def ping(request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def server_time(request: web.Request) -> web.Response:
+        return web.json_response({'serverTime': int(time.time() * 1000)})
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(app['stats'])
+
+    async def stream(request: web.Request) -> web.WebSocketResponse:
+        streams = [s for s in request.query.get('streams', '').split('/') if s.endswith('@ticker')]
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        app['stats']['ws_clients'] += 1
+        interval = 1 / config.ws_rate if config.ws_rate > 0 else 1.0
+
+        async def drain():
+            # answer pings / notice the client leaving; subscriptions are fixed by the URL
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+
+        reader = asyncio.ensure_future(drain())
+        try:
+            next_tick = time.monotonic()
+            while not ws.closed and not reader.done():
+                now_ms = int(time.time() * 1000)
+                for name in streams:
+                    payload = {'stream': name, 'data': synthetic_ticker(name.split('@')[0], now_ms, config.seed)}
+                    await ws.send_str(json.dumps(payload))
+                    app['stats']['ws_messages'] += 1
+                next_tick += interval
+                await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+        except (ConnectionResetError, RuntimeError):
+            pass
+        finally:
+            reader.cancel()
+            app['stats']['ws_clients'] -= 1
+        return ws
+
+    app.router.add_get('/api/v3/klines', klines)
+    app.router.add_get('/api/v3/ping', ping)
+    app.router.add_get('/api/v3/time', server_time)
+    app.router.add_get('/stream', stream)
+    app.router.add_get('/standin/stats', stats)
+    return app
+
+
+def serve_in_thread(config: Optional[StandinConfig] = None, host: str = '127.0.0.1',
+                    port: int = 9100) -> threading.Thread:
+    """Start the stand-in on a daemon thread (for benchmark scripts); returns once it is listening."""
+    ready = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(create_app(config))
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, name='binance-standin', daemon=True)
+    thread.start()
+    ready.wait(10)
+    return thread
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Local Binance REST/WebSocket stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed latency added to REST responses')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform extra latency (0..jitter)')
+    parser.add_argument('--weight-limit', type=int, default=6000,
+                        help='Request weight per minute before answering 429 (0 = unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of REST requests answered with 503')
+    parser.add_argument('--ws-rate', type=float, default=1.0, help='Ticker messages per second per stream')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic series')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    config = StandinConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, weight_limit=args.weight_limit,
+        error_rate=args.error_rate, ws_rate=args.ws_rate, seed=args.seed,
+    )
+    logger.info(f"Binance stand-in on http://{args.host}:{args.port} ({config})")
+    web.run_app(create_app(config), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+COPY-based bulk loader for MarketData.
+
+The frame is packed column-wise into PostgreSQL's binary COPY format (one
+NumPy structured array, no per-row ORM objects or text formatting), streamed
+into a temporary staging table with `COPY ... FROM STDIN`, and merged into
+analytics_marketdata by a single `INSERT ... SELECT ... ON CONFLICT
+(symbol_id, close_time)`. Inserted/updated counts come from `RETURNING
+(xmax = 0)` of that statement, so no follow-up COUNT query is needed.
+
+Conflict modes:
+  ignore      keep stored rows untouched (append-only ingest)
+  update      upsert prices/volumes; indicator columns are overwritten only
+              where the frame has a value, so NaNs never erase stored values.
+              Non-NaN warm-up values (MACD seeded from the first close, ATR 0)
+              do overwrite - the frame must continue the stored history
+              (run_backfill_pipeline seeds its state from it)
+  indicators  in-place repair: UPDATE ... FROM staging of the indicator
+              columns only (key + indicators staged, no inserts)
+"""
+import io
+import logging
+import uuid
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+
+from .models import MarketData
+
+logger = logging.getLogger(__name__)
+
+# Rows per COPY chunk: bounds the staging buffer while keeping round trips few
+COPY_CHUNK_ROWS = 250_000
+
+# (MarketData field, frame column, kind)
+MARKET_DATA_COLUMNS = [
+    ('open_time', 'open_time', 'time'),
+    ('close_time', 'close_time', 'time'),
+    ('open_price', 'open_price', 'float'),
+    ('high_price', 'high_price', 'float'),
+    ('low_price', 'low_price', 'float'),
+    ('close_price', 'close_price', 'float'),
+    ('volume', 'volume', 'float'),
+    ('quote_volume', 'quote_volume', 'float'),
+    ('num_trades', 'num_trades', 'int'),
+    ('taker_buy_base_volume', 'taker_buy_base', 'float'),
+    ('taker_buy_quote_volume', 'taker_buy_quote', 'float'),
+    ('price_change_percent_24h', 'price_change_percent_24h', 'float'),
+    ('rsi', 'RSI', 'float'),
+    ('macd', 'MACD', 'float'),
+    ('macd_signal', 'MACD_Signal', 'float'),
+    ('macd_hist', 'MACD_Hist', 'float'),
+    ('bb_upper', 'BB_Upper', 'float'),
+    ('bb_middle', 'BB_Middle', 'float'),
+    ('bb_lower', 'BB_Lower', 'float'),
+    ('atr', 'ATR', 'float'),
+    ('williams_r', 'Williams_R', 'float'),
+]
+
+# Columns derived from prices; the only ones the 'indicators' mode touches
+INDICATOR_FIELDS = [
+    'price_change_percent_24h', 'rsi', 'macd', 'macd_signal', 'macd_hist',
+    'bb_upper', 'bb_middle', 'bb_lower', 'atr', 'williams_r',
+]
+
+CONFLICT_MODES = ('ignore', 'update', 'indicators')
+
+_STAGE_TYPES = {'id': ('int8', '>i8'), 'time': ('timestamptz', '>i8'), 'int': ('int8', '>i8'), 'float': ('float8', '>f8')}
+
+# Binary COPY framing; timestamptz travels as int64 microseconds since 2000-01-01 UTC
+_COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00'
+_COPY_TRAILER = b'\xff\xff'
+_PG_EPOCH_US = 946_684_800_000_000
+
+
+def _db_column(field_name: str) -> str:
+    return MarketData._meta.get_field(field_name).column
+
+
+def _stage_columns(conflict: str = 'ignore'):
+    """[(column, kind, frame column)] in staging/COPY order."""
+    fields = MARKET_DATA_COLUMNS
+    if conflict == 'indicators':
+        fields = [c for c in MARKET_DATA_COLUMNS if c[0] == 'close_time' or c[0] in INDICATOR_FIELDS]
+    return [('symbol_id', 'id', None)] + [(_db_column(f), kind, col) for f, col, kind in fields]
+
+
+def _record_dtype(stage_columns) -> np.dtype:
+    fields = [('nfields', '>i2')]
+    for name, kind, _ in stage_columns:
+        fields += [(f'{name}__len', '>i4'), (name, _STAGE_TYPES[kind][1])]
+    return np.dtype(fields)
+
+
+def _epoch_us(col: pd.Series) -> np.ndarray:
+    """Postgres-epoch microseconds from naive-UTC or tz-aware datetimes."""
+    values = pd.to_datetime(col, utc=True).dt.tz_localize(None).to_numpy(dtype='datetime64[us]')
+    return values.astype(np.int64) - _PG_EPOCH_US
+
+
+def frame_to_copy_records(coin_id: int, df: pd.DataFrame, stage_columns=None) -> np.ndarray:
+    """
+    Fixed-width binary COPY tuples for the frame. Floats keep NaN (inf -> NaN)
+    and become NULL in the merge; missing num_trades -> 0 like the ORM path,
+    missing indicator columns -> NULL.
+    """
+    stage_columns = stage_columns or _stage_columns()
+    records = np.empty(len(df), dtype=_record_dtype(stage_columns))
+    records['nfields'] = len(stage_columns)
+    for name, kind, frame_col in stage_columns:
+        records[f'{name}__len'] = 8
+        if kind == 'id':
+            records[name] = coin_id
+        elif frame_col not in df.columns:
+            records[name] = 0 if kind == 'int' else np.nan
+        elif kind == 'time':
+            records[name] = _epoch_us(df[frame_col])
+        elif kind == 'int':
+            records[name] = pd.to_numeric(df[frame_col], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        else:
+            values = pd.to_numeric(df[frame_col], errors='coerce').to_numpy(dtype=float, copy=True)
+            values[~np.isfinite(values)] = np.nan
+            records[name] = values
+    return records
+
+
+def _value_sql(name: str, kind: str, prefix: str = '') -> str:
+    return f"NULLIF({prefix}{name}, 'NaN')" if kind == 'float' else f"{prefix}{name}"
+
+
+def _merge_sql(table: str, stage: str, stage_columns, conflict: str) -> str:
+    key_columns = ('symbol_id', _db_column('close_time'))
+    if conflict == 'indicators':
+        assignments = ', '.join(
+            f"{name} = {_value_sql(name, kind, 's.')}" for name, kind, _ in stage_columns if name not in key_columns
+        )
+        return f"""
+            WITH merged AS (
+                UPDATE {table} AS t SET {assignments}
+                FROM {stage} AS s
+                WHERE t.symbol_id = s.symbol_id AND t.{key_columns[1]} = s.{key_columns[1]}
+                RETURNING 1
+            )
+            SELECT 0, COUNT(*) FROM merged
+        """
+
+    columns = [name for name, _, _ in stage_columns]
+    select = ', '.join(_value_sql(name, kind) for name, kind, _ in stage_columns)
+    if conflict == 'ignore':
+        on_conflict = 'DO NOTHING'
+    else:
+        indicator_columns = {_db_column(f) for f in INDICATOR_FIELDS}
+        updates = ', '.join(
+            f"{c} = COALESCE(EXCLUDED.{c}, {table}.{c})" if c in indicator_columns else f"{c} = EXCLUDED.{c}"
+            for c in columns if c not in key_columns
+        )
+        on_conflict = f"DO UPDATE SET {updates}"
+    return f"""
+        WITH merged AS (
+            INSERT INTO {table} ({', '.join(columns)})
+            SELECT {select} FROM {stage}
+            ON CONFLICT ({', '.join(key_columns)}) {on_conflict}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+    """
+
+
+def copy_market_data(coin_id: int, df: pd.DataFrame, conflict: str = 'ignore') -> Dict[str, int]:
+    """
+    Persist a candle/indicator frame for one coin via COPY + one merge statement.
+
+    conflict: 'ignore' | 'update' | 'indicators' (see module docstring).
+    Returns {'staged', 'inserted', 'updated', 'skipped'}; in 'indicators' mode
+    'skipped' counts frame rows with no stored candle.
+    """
+    if conflict not in CONFLICT_MODES:
+        raise ValueError(f"Unknown conflict mode {conflict!r}; expected one of {CONFLICT_MODES}")
+    if df is None or df.empty:
+        return {'staged': 0, 'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+    df = df.drop_duplicates(subset='close_time', keep='last')
+    stage_columns = _stage_columns(conflict)
+    records = frame_to_copy_records(coin_id, df, stage_columns)
+    table = MarketData._meta.db_table
+    # ON COMMIT DROP only fires at the outermost commit: calls nested in one outer
+    # transaction (ATOMIC_REQUESTS, tests, batched symbols) each need their own table
+    stage = f"{table}_stage_{uuid.uuid4().hex[:12]}"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {stage} ("
+            + ', '.join(f"{name} {_STAGE_TYPES[kind][0]}" for name, kind, _ in stage_columns)
+            + ") ON COMMIT DROP"
+        )
+        copy_sql = f"COPY {stage} FROM STDIN WITH (FORMAT binary)"
+        for start in range(0, len(records), COPY_CHUNK_ROWS):
+            chunk = records[start:start + COPY_CHUNK_ROWS]
+            cursor.copy_expert(copy_sql, io.BytesIO(_COPY_HEADER + chunk.tobytes() + _COPY_TRAILER))
+        cursor.execute(_merge_sql(table, stage, stage_columns, conflict))
+        inserted, updated = cursor.fetchone()
+        cursor.execute(f"DROP TABLE {stage}")
+
+    return {
+        'staged': len(records),
+        'inserted': inserted,
+        'updated': updated,
+        'skipped': len(records) - inserted - updated,
+    }
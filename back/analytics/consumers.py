@@ -4,6 +4,7 @@ import websockets
 import logging
 from threading import Thread
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from datetime import datetime
 from redis_cache.cache_utils.market import MarketDataCache
 
@@ -31,7 +32,8 @@ class BinanceWebSocketConsumer(AsyncWebsocketConsumer):
         """Connect to Binance WebSocket and process messages."""
         # Create streams for all trading pairs
         streams = [f"{pair}@ticker" for pair in self.TRADING_PAIRS]
-        streams_url = f"{self.BINANCE_WS_URL}?streams={'/'.join(streams)}"
+        ws_url = getattr(settings, 'BINANCE_WS_URL', self.BINANCE_WS_URL)
+        streams_url = f"{ws_url}?streams={'/'.join(streams)}"
         
         logger.info(f"Connecting to Binance: {streams_url}")
         
@@ -0,0 +1,138 @@
+"""
+Incremental (O(1) per candle) technical indicator state.
+
+`IndicatorState.update` applies one closed candle to persistent accumulators
+(MACD EMAs, Wilder RSI/ATR averages, rolling Bollinger/Williams buffers) and
+returns the same columns `calculate_technical_indicators` produces, using the
+same recurrences as `ta`/pandas. Live candles therefore get the values a full
+backfill would give them, without reloading and recomputing a history window.
+"""
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2
+ATR_WINDOW = 14
+WILLIAMS_WINDOW = 14
+CHANGE_PERIODS = 2  # 24h on 12h candles
+
+NAN = float('nan')
+
+
+def _ewm_step(prev: Optional[float], x: float, alpha: float) -> float:
+    """One pandas `ewm(adjust=False)` step, with pandas' exact arithmetic."""
+    if prev is None:
+        return x
+    old_wt = 1.0 - alpha
+    return (old_wt * prev + alpha * x) / (old_wt + alpha)
+
+
+@dataclass
+class IndicatorState:
+    count: int = 0
+    last_close_time: Optional[int] = None  # epoch ms of the last applied candle
+    prev_close: Optional[float] = None
+    ema_fast: Optional[float] = None
+    ema_slow: Optional[float] = None
+    macd_signal: Optional[float] = None
+    rsi_up: Optional[float] = None
+    rsi_down: Optional[float] = None
+    atr: Optional[float] = None
+    atr_seed: List[float] = field(default_factory=list)
+    closes: Deque[float] = field(default_factory=lambda: deque(maxlen=BB_WINDOW))
+    highs: Deque[float] = field(default_factory=lambda: deque(maxlen=WILLIAMS_WINDOW))
+    lows: Deque[float] = field(default_factory=lambda: deque(maxlen=WILLIAMS_WINDOW))
+    change_base: Deque[float] = field(default_factory=lambda: deque(maxlen=CHANGE_PERIODS))
+
+    def update(self, high: float, low: float, close: float, close_time: Optional[int] = None) -> Dict[str, float]:
+        """Apply one candle and return its indicator values (NaN during warm-up)."""
+        high, low, close = float(high), float(low), float(close)
+        prev_close = self.prev_close
+
+        # MACD (EWMA, adjust=False, seeded with the first close)
+        self.ema_fast = _ewm_step(self.ema_fast, close, 2.0 / (MACD_FAST + 1))
+        self.ema_slow = _ewm_step(self.ema_slow, close, 2.0 / (MACD_SLOW + 1))
+        macd = self.ema_fast - self.ema_slow
+        self.macd_signal = _ewm_step(self.macd_signal, macd, 2.0 / (MACD_SIGNAL + 1))
+
+        # RSI (Wilder smoothing; the first diff counts as 0 like ta does)
+        diff = 0.0 if prev_close is None else close - prev_close
+        self.rsi_up = _ewm_step(self.rsi_up, diff if diff > 0 else 0.0, 1.0 / RSI_WINDOW)
+        self.rsi_down = _ewm_step(self.rsi_down, -diff if diff < 0 else 0.0, 1.0 / RSI_WINDOW)
+
+        # ATR (SMA seed over the first window, then Wilder; 0 before that like ta)
+        tr = high - low if prev_close is None else max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if self.atr is None:
+            self.atr_seed.append(tr)
+            if len(self.atr_seed) == ATR_WINDOW:
+                self.atr = sum(self.atr_seed) / ATR_WINDOW
+                self.atr_seed = []
+        else:
+            self.atr = (self.atr * (ATR_WINDOW - 1) + tr) / float(ATR_WINDOW)
+
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        change_ref = self.change_base[0] if len(self.change_base) == CHANGE_PERIODS else None
+        self.change_base.append(close)
+        self.count += 1
+        self.prev_close = close
+        if close_time is not None:
+            self.last_close_time = int(close_time)
+
+        out = {
+            'MACD': macd,
+            'MACD_Signal': self.macd_signal,
+            'MACD_Hist': macd - self.macd_signal,
+            'RSI': NAN, 'BB_Upper': NAN, 'BB_Middle': NAN, 'BB_Lower': NAN,
+            'ATR': self.atr if self.atr is not None else 0.0,
+            'Williams_R': NAN, 'price_change_percent_24h': NAN,
+        }
+        if self.count >= RSI_WINDOW:
+            out['RSI'] = 100.0 if self.rsi_down == 0 else 100.0 - 100.0 / (1.0 + self.rsi_up / self.rsi_down)
+        if len(self.closes) == BB_WINDOW:
+            mean = sum(self.closes) / BB_WINDOW
+            std = math.sqrt(sum((c - mean) ** 2 for c in self.closes) / BB_WINDOW)
+            out.update(BB_Upper=mean + BB_DEV * std, BB_Middle=mean, BB_Lower=mean - BB_DEV * std)
+        if len(self.highs) == WILLIAMS_WINDOW:
+            hh, ll = max(self.highs), min(self.lows)
+            if hh != ll:
+                out['Williams_R'] = -100.0 * (hh - close) / (hh - ll)
+        if change_ref:
+            out['price_change_percent_24h'] = (close - change_ref) / change_ref * 100.0
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot (for Redis)."""
+        return {
+            'count': self.count, 'last_close_time': self.last_close_time, 'prev_close': self.prev_close,
+            'ema_fast': self.ema_fast, 'ema_slow': self.ema_slow, 'macd_signal': self.macd_signal,
+            'rsi_up': self.rsi_up, 'rsi_down': self.rsi_down, 'atr': self.atr, 'atr_seed': list(self.atr_seed),
+            'closes': list(self.closes), 'highs': list(self.highs), 'lows': list(self.lows),
+            'change_base': list(self.change_base),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IndicatorState':
+        state = cls(
+            count=data['count'], last_close_time=data.get('last_close_time'), prev_close=data.get('prev_close'),
+            ema_fast=data.get('ema_fast'), ema_slow=data.get('ema_slow'), macd_signal=data.get('macd_signal'),
+            rsi_up=data.get('rsi_up'), rsi_down=data.get('rsi_down'), atr=data.get('atr'),
+            atr_seed=list(data.get('atr_seed', [])),
+        )
+        state.closes.extend(data.get('closes', []))
+        state.highs.extend(data.get('highs', []))
+        state.lows.extend(data.get('lows', []))
+        state.change_base.extend(data.get('change_base', []))
+        return state
+
+    @classmethod
+    def from_history(cls, rows) -> 'IndicatorState':
+        """Replay (high, low, close, close_time_ms) rows, oldest first."""
+        state = cls()
+        for high, low, close, close_time in rows:
+            state.update(high, low, close, close_time)
+        return state
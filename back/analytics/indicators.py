@@ -0,0 +1,320 @@
+"""
+Vectorized NumPy indicator kernel (RSI, MACD, Bollinger Bands, ATR, Williams %R).
+
+Inputs are float arrays shaped (T,) for one symbol or (T, N) for N symbols; a
+shorter series is NaN-padded at the top and its indicators start from its
+first valid row, exactly as if it had been computed alone. Recursive averages
+run through `scipy.signal.lfilter` along the time axis, rolling windows
+through `sliding_window_view`, so there is no Python loop over candles or
+symbols.
+
+Values reproduce the `ta` library (and pandas EWMA for MACD) within
+PARITY_RTOL/PARITY_ATOL (checked in analytics/tests.py); `python -m
+analytics.indicators` times the kernel against `ta`.
+"""
+import logging
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+from .indicator_state import (
+    IndicatorState, RSI_WINDOW, MACD_FAST, MACD_SLOW, MACD_SIGNAL, BB_WINDOW, BB_DEV,
+    ATR_WINDOW, WILLIAMS_WINDOW, CHANGE_PERIODS,
+)
+
+logger = logging.getLogger(__name__)
+
+PARITY_RTOL = 1e-9
+PARITY_ATOL = 1e-8
+
+INDICATOR_COLUMNS = [
+    'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_Upper', 'BB_Middle', 'BB_Lower',
+    'ATR', 'Williams_R', 'price_change_percent_24h',
+]
+
+
+def _first_valid(x: np.ndarray) -> np.ndarray:
+    """Index of the first non-NaN row per column (len(x) when the column is empty)."""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+
+def _ewm(x: np.ndarray, alpha: float, start: np.ndarray, prev: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    `ewm(alpha, adjust=False)` per column, seeded with the value at `start`.
+    Rows before `start` are back-filled with the seed so the filter holds it
+    constant until the column's own history begins. `prev` continues an average
+    from an earlier chunk instead (y0 = (1 - alpha) * prev + alpha * x0).
+    """
+    rows = np.arange(len(x))[:, None]
+    seed = x[np.minimum(start, len(x) - 1), np.arange(x.shape[1])]
+    x = np.where(rows < start, seed, x)
+    x = np.nan_to_num(x, nan=0.0)
+    zi = ((1.0 - alpha) * (x[0] if prev is None else prev))[None, :]
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0, zi=zi)
+    return np.where(rows < start, np.nan, y)
+
+
+def _rolling(x: np.ndarray, window: int, reducer) -> np.ndarray:
+    """Trailing window reduction with min_periods=window (NaN until full / if any NaN)."""
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = reducer(sliding_window_view(x, window, axis=0), axis=-1)
+    return out
+
+
+def compute_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+    """Indicator arrays (same shape as the inputs) keyed like `calculate_technical_indicators` columns."""
+    one_d = np.ndim(close) == 1
+    high, low, close = (np.asarray(a, dtype=float).reshape(len(close), -1) for a in (high, low, close))
+    T = len(close)
+    rows = np.arange(T)[:, None]
+    start = _first_valid(close)
+    before = rows < start
+
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+
+    # MACD: EWMA(12) - EWMA(26), signal EWMA(9), seeded with the first close
+    macd = _ewm(close, 2.0 / (MACD_FAST + 1), start) - _ewm(close, 2.0 / (MACD_SLOW + 1), start)
+    macd_signal = _ewm(macd, 2.0 / (MACD_SIGNAL + 1), start)
+
+    # RSI: Wilder averages of gains/losses; the first diff counts as 0 (ta semantics)
+    diff = np.where(rows <= start, 0.0, close - prev_close)
+    alpha = 1.0 / RSI_WINDOW
+    avg_up = _ewm(np.clip(diff, 0.0, None), alpha, start)
+    avg_down = _ewm(np.clip(-diff, 0.0, None), alpha, start)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    rsi[rows < start + RSI_WINDOW - 1] = np.nan
+
+    # ATR: SMA seed over the first window, Wilder afterwards, 0 during warm-up (ta semantics)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr = np.where(rows == start, high - low, tr)
+    seed_row = start + ATR_WINDOW - 1
+    csum = np.vstack([np.zeros((1, tr.shape[1])), np.nancumsum(np.where(before, 0.0, tr), axis=0)])
+    has_seed = seed_row < T
+    seed_idx = np.minimum(seed_row, T - 1)
+    seed = (csum[seed_idx + 1, np.arange(tr.shape[1])] - csum[start.clip(max=T), np.arange(tr.shape[1])]) / ATR_WINDOW
+    tr_seeded = np.where(rows <= seed_row, seed, tr)
+    atr = _ewm(tr_seeded, 1.0 / ATR_WINDOW, np.where(has_seed, seed_row, T))
+    atr = np.where((rows < seed_row) & ~before, 0.0, atr)
+    atr[before] = np.nan
+
+    # Bollinger Bands (population std, like ta)
+    bb_mid = _rolling(close, BB_WINDOW, np.mean)
+    bb_std = _rolling(close, BB_WINDOW, np.std)
+
+    # Williams %R
+    hh = _rolling(high, WILLIAMS_WINDOW, np.max)
+    ll = _rolling(low, WILLIAMS_WINDOW, np.min)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        williams = -100.0 * (hh - close) / (hh - ll)
+    williams[~np.isfinite(williams)] = np.nan
+
+    # 24h change on 12h candles
+    ref = np.vstack([np.full((CHANGE_PERIODS, close.shape[1]), np.nan), close[:-CHANGE_PERIODS]])[:T]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (close - ref) / ref * 100.0
+    change[~np.isfinite(change)] = np.nan
+
+    out = {
+        'RSI': rsi,
+        'MACD': macd,
+        'MACD_Signal': macd_signal,
+        'MACD_Hist': macd - macd_signal,
+        'BB_Upper': bb_mid + BB_DEV * bb_std,
+        'BB_Middle': bb_mid,
+        'BB_Lower': bb_mid - BB_DEV * bb_std,
+        'ATR': atr,
+        'Williams_R': williams,
+        'price_change_percent_24h': change,
+    }
+    if one_d:
+        out = {k: v[:, 0] for k, v in out.items()}
+    return out
+
+
+def _ewm_resume(x: np.ndarray, alpha: float, prev: Optional[float]) -> np.ndarray:
+    """1-D `_ewm` that continues from `prev` (None = start a new average at x[0])."""
+    x = x[:, None]
+    return _ewm(x, alpha, np.zeros(1, dtype=int), None if prev is None else np.array([prev]))[:, 0]
+
+
+def compute_indicators_chunk(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                             state: IndicatorState, close_times: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized continuation of `state` over one chunk of consecutive candles
+    (1-D, oldest first). Returns the same columns as `compute_indicators` and
+    advances `state` in place, so a long history can be processed chunk by
+    chunk (bounded memory) with values identical to one pass over everything.
+    """
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    n = len(close)
+    if n == 0:
+        return {col: np.empty(0) for col in INDICATOR_COLUMNS}
+    seen = state.count
+    prev_close = state.prev_close
+
+    # MACD
+    ema_fast = _ewm_resume(close, 2.0 / (MACD_FAST + 1), state.ema_fast)
+    ema_slow = _ewm_resume(close, 2.0 / (MACD_SLOW + 1), state.ema_slow)
+    macd = ema_fast - ema_slow
+    macd_signal = _ewm_resume(macd, 2.0 / (MACD_SIGNAL + 1), state.macd_signal)
+
+    # RSI (first diff of the whole history counts as 0)
+    prev = np.r_[close[0] if prev_close is None else prev_close, close[:-1]]
+    diff = close - prev
+    avg_up = _ewm_resume(np.clip(diff, 0.0, None), 1.0 / RSI_WINDOW, state.rsi_up)
+    avg_down = _ewm_resume(np.clip(-diff, 0.0, None), 1.0 / RSI_WINDOW, state.rsi_down)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    rsi[seen + np.arange(n) < RSI_WINDOW - 1] = np.nan
+
+    # ATR: finish the SMA seed if still warming up, Wilder afterwards
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    if prev_close is None:
+        tr[0] = high[0] - low[0]
+    atr = np.zeros(n)
+    atr_prev, atr_seed = state.atr, list(state.atr_seed)
+    if atr_prev is not None:
+        atr = _ewm_resume(tr, 1.0 / ATR_WINDOW, atr_prev)
+    else:
+        need = ATR_WINDOW - len(atr_seed)
+        if n >= need:
+            atr_prev = (sum(atr_seed) + float(tr[:need].sum())) / ATR_WINDOW
+            atr[need - 1] = atr_prev
+            if n > need:
+                atr[need:] = _ewm_resume(tr[need:], 1.0 / ATR_WINDOW, atr_prev)
+            atr_seed = []
+        else:
+            atr_seed.extend(tr.tolist())
+
+    # Rolling windows continue over the state's tail buffers
+    closes_ext = np.r_[np.asarray(state.closes, dtype=float), close]
+    highs_ext = np.r_[np.asarray(state.highs, dtype=float), high]
+    lows_ext = np.r_[np.asarray(state.lows, dtype=float), low]
+    bb_mid = _rolling(closes_ext[:, None], BB_WINDOW, np.mean)[-n:, 0]
+    bb_std = _rolling(closes_ext[:, None], BB_WINDOW, np.std)[-n:, 0]
+    hh = _rolling(highs_ext[:, None], WILLIAMS_WINDOW, np.max)[-n:, 0]
+    ll = _rolling(lows_ext[:, None], WILLIAMS_WINDOW, np.min)[-n:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        williams = -100.0 * (hh - close) / (hh - ll)
+    williams[~np.isfinite(williams)] = np.nan
+
+    base_ext = np.r_[np.full(CHANGE_PERIODS - len(state.change_base), np.nan),
+                     np.asarray(state.change_base, dtype=float), close]
+    ref = base_ext[:n]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (close - ref) / ref * 100.0
+    change[~np.isfinite(change) | (ref == 0)] = np.nan
+
+    # Advance the state to the last candle of the chunk
+    state.count = seen + n
+    state.prev_close = float(close[-1])
+    state.ema_fast, state.ema_slow = float(ema_fast[-1]), float(ema_slow[-1])
+    state.macd_signal = float(macd_signal[-1])
+    state.rsi_up, state.rsi_down = float(avg_up[-1]), float(avg_down[-1])
+    state.atr = None if atr_prev is None else float(atr[-1])
+    state.atr_seed = atr_seed
+    state.closes.extend(close[-BB_WINDOW:].tolist())
+    state.highs.extend(high[-WILLIAMS_WINDOW:].tolist())
+    state.lows.extend(low[-WILLIAMS_WINDOW:].tolist())
+    state.change_base.extend(close[-CHANGE_PERIODS:].tolist())
+    if close_times is not None:
+        state.last_close_time = int(close_times[-1])
+
+    return {
+        'RSI': rsi,
+        'MACD': macd,
+        'MACD_Signal': macd_signal,
+        'MACD_Hist': macd - macd_signal,
+        'BB_Upper': bb_mid + BB_DEV * bb_std,
+        'BB_Middle': bb_mid,
+        'BB_Lower': bb_mid - BB_DEV * bb_std,
+        'ATR': atr,
+        'Williams_R': williams,
+        'price_change_percent_24h': change,
+    }
+
+
+def compute_indicators_for_frames(frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Indicators for many symbols in one kernel call. Each frame (sorted by
+    close_time) becomes one column, aligned on its last row and NaN-padded at
+    the top, so every symbol gets exactly the values it would get on its own
+    (indicators are row sequences; holes in one symbol never leak into another).
+    """
+    frames = {s: df.sort_values('close_time').reset_index(drop=True) for s, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return {}
+    T = max(len(df) for df in frames.values())
+    wide = {}
+    for col in ('high_price', 'low_price', 'close_price'):
+        arr = np.full((T, len(frames)), np.nan)
+        for j, df in enumerate(frames.values()):
+            arr[T - len(df):, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+        wide[col] = arr
+    result = compute_indicators(wide['high_price'], wide['low_price'], wide['close_price'])
+
+    out = {}
+    for j, (s, df) in enumerate(frames.items()):
+        df = df.copy()
+        for col in INDICATOR_COLUMNS:
+            df[col] = result[col][T - len(df):, j]
+        out[s] = df
+    return out
+
+
+def _ta_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """Indicators via the `ta` library / pandas EWMA (the previous engine): the parity and benchmark reference."""
+    import ta
+
+    high, low, close = df['high_price'], df['low_price'], df['close_price']
+    ema_fast = close.ewm(span=MACD_FAST, adjust=False, min_periods=1).mean()
+    ema_slow = close.ewm(span=MACD_SLOW, adjust=False, min_periods=1).mean()
+    macd = ema_fast - ema_slow
+    signal = macd.ewm(span=MACD_SIGNAL, adjust=False, min_periods=1).mean()
+    bb = ta.volatility.BollingerBands(close=close, window=BB_WINDOW, window_dev=BB_DEV)
+    prev = close.shift(CHANGE_PERIODS)
+    return pd.DataFrame({
+        'RSI': ta.momentum.RSIIndicator(close=close, window=RSI_WINDOW).rsi(),
+        'MACD': macd, 'MACD_Signal': signal, 'MACD_Hist': macd - signal,
+        'BB_Upper': bb.bollinger_hband(), 'BB_Middle': bb.bollinger_mavg(), 'BB_Lower': bb.bollinger_lband(),
+        'ATR': ta.volatility.AverageTrueRange(high=high, low=low, close=close, window=ATR_WINDOW).average_true_range(),
+        'Williams_R': ta.momentum.WilliamsRIndicator(high=high, low=low, close=close, lbp=WILLIAMS_WINDOW).williams_r(),
+        'price_change_percent_24h': ((close - prev) / prev * 100.0).replace([np.inf, -np.inf], np.nan),
+    })
+
+
+def benchmark(n_symbols: int = 50, n_rows: int = 5_000, repeat: int = 3, seed: Optional[int] = 7) -> Dict[str, float]:
+    """Best-of-`repeat` seconds: `ta` symbol by symbol vs one 2-D kernel call."""
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0, 1, (n_rows, n_symbols)), axis=0)
+    high = close + rng.uniform(0, 1, close.shape)
+    low = close - rng.uniform(0, 1, close.shape)
+    frames = [pd.DataFrame({'high_price': high[:, j], 'low_price': low[:, j], 'close_price': close[:, j]})
+              for j in range(n_symbols)]
+
+    def best(fn):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    t_ta = best(lambda: [_ta_reference(f) for f in frames])
+    t_kernel = best(lambda: compute_indicators(high, low, close))
+    result = {'ta_seconds': t_ta, 'kernel_seconds': t_kernel, 'speedup': t_ta / t_kernel}
+    logger.info(f"{n_symbols} symbols x {n_rows} rows: ta={t_ta:.3f}s kernel={t_kernel:.3f}s speedup={t_ta / t_kernel:.1f}x")
+    return result
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    for shape in ((1, 1_000), (5, 1_000), (50, 5_000), (200, 10_000)):
+        benchmark(*shape)
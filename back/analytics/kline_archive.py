@@ -0,0 +1,182 @@
+"""
+Local on-disk archive of closed Binance candles.
+
+One `.npy` file (KLINE_DTYPE, sorted by open_time) per interval/symbol, read
+memory-mapped. Closed candles never change, so `fetch_binance_candles` serves
+them from here and only asks Binance for ranges the archive does not hold
+(plus the still-open tail). The same files double as an offline replay source
+for scripts and benchmarks.
+
+Ranges Binance was asked for and returned no closed candles for (before the
+listing, delisted periods, exchange outages) are recorded in a sidecar
+`<SYMBOL>.empty.npy` ([start_ms, end_ms, recorded_at_ms] rows), so
+`missing_ranges` does not send them to Binance again on every call. A record
+expires after EMPTY_RANGE_TTL_MS (like UnfillableGapCache), so a transient
+empty or short response cannot hide real candles for good.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .kline_decoder import KLINE_DTYPE, concat_klines, klines_to_frame
+
+logger = logging.getLogger(__name__)
+
+# How long a range recorded as empty is trusted before Binance is asked again
+EMPTY_RANGE_TTL_MS = 30 * 24 * 3600 * 1000
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class KlineArchive:
+    """Per symbol/interval memory-mapped store of closed candles."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.KLINE_ARCHIVE_DIR)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol: str, interval: str) -> Path:
+        return self.root / interval / f"{symbol.upper()}.npy"
+
+    def empty_path(self, symbol: str, interval: str) -> Path:
+        return self.root / interval / f"{symbol.upper()}.empty.npy"
+
+    def _lock(self, path: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def load(self, symbol: str, interval: str) -> np.ndarray:
+        """Whole archive for symbol/interval (memory-mapped, read-only); empty if none."""
+        path = self.path(symbol, interval)
+        if not path.exists():
+            return np.empty(0, dtype=KLINE_DTYPE)
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable kline archive {path}: {e}")
+            return np.empty(0, dtype=KLINE_DTYPE)
+
+    def read(self, symbol: str, interval: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> np.ndarray:
+        """Archived candles with start_ms <= open_time <= end_ms."""
+        buf = self.load(symbol, interval)
+        open_times = buf['open_time']
+        lo = 0 if start_ms is None else int(np.searchsorted(open_times, start_ms, side='left'))
+        hi = len(buf) if end_ms is None else int(np.searchsorted(open_times, end_ms, side='right'))
+        return buf[lo:hi]
+
+    @staticmethod
+    def uncovered(buf: np.ndarray, start_ms: int, end_ms: int, interval_ms: int) -> List[Tuple[int, int]]:
+        """[start, end] ms ranges inside [start_ms, end_ms] that the sorted candles of `buf` do not cover."""
+        if end_ms < start_ms:
+            return []
+        if not len(buf):
+            return [(start_ms, end_ms)]
+        ranges = []
+        open_times = buf['open_time']
+        close_times = buf['close_time']
+        if open_times[0] - start_ms >= interval_ms:
+            ranges.append((start_ms, int(open_times[0]) - 1))
+        holes = np.flatnonzero(np.diff(open_times) > interval_ms)
+        ranges.extend((int(close_times[i]) + 1, int(open_times[i + 1]) - 1) for i in holes)
+        if close_times[-1] < end_ms:
+            ranges.append((int(close_times[-1]) + 1, end_ms))
+        return ranges
+
+    def _load_empty_records(self, symbol: str, interval: str, now_ms: int) -> np.ndarray:
+        """(n, 3) int64 [start_ms, end_ms, recorded_at_ms] records that have not expired yet."""
+        path = self.empty_path(symbol, interval)
+        if not path.exists():
+            return np.empty((0, 3), dtype=np.int64)
+        try:
+            records = np.load(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable empty-range file {path}: {e}")
+            return np.empty((0, 3), dtype=np.int64)
+        if records.ndim != 2 or records.shape[1] != 3:  # no recorded-at time -> treat as expired
+            return np.empty((0, 3), dtype=np.int64)
+        return records[records[:, 2] > now_ms - EMPTY_RANGE_TTL_MS]
+
+    def load_empty(self, symbol: str, interval: str, now_ms: Optional[int] = None) -> np.ndarray:
+        """(n, 2) int64 [start_ms, end_ms] ranges recently found to hold no candles, sorted and disjoint."""
+        records = self._load_empty_records(symbol, interval, _now_ms() if now_ms is None else now_ms)
+        return records[:, :2]
+
+    def mark_empty(self, symbol: str, interval: str, ranges: List[Tuple[int, int]],
+                   now_ms: Optional[int] = None) -> int:
+        """Record ranges Binance returned no closed candles for; returns how many ranges are stored."""
+        ranges = [(int(a), int(b)) for a, b in ranges if b >= a]
+        if not ranges:
+            return 0
+        now_ms = _now_ms() if now_ms is None else now_ms
+        path = self.empty_path(symbol, interval)
+        with self._lock(path):
+            records = self._load_empty_records(symbol, interval, now_ms).tolist()
+            merged = []
+            for start, end, recorded_at in sorted(records + [[a, b, now_ms] for a, b in ranges]):
+                if merged and start <= merged[-1][1] + 1:
+                    # a merged range expires with its oldest part
+                    merged[-1][1] = max(merged[-1][1], end)
+                    merged[-1][2] = min(merged[-1][2], recorded_at)
+                else:
+                    merged.append([start, end, recorded_at])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, 'wb') as fh:
+                np.save(fh, np.asarray(merged, dtype=np.int64))
+            os.replace(tmp, path)
+        return len(merged)
+
+    def missing_ranges(self, symbol: str, interval: str, start_ms: int, end_ms: int,
+                       interval_ms: int, now_ms: Optional[int] = None) -> List[Tuple[int, int]]:
+        """[start, end] ms ranges inside the request that the archive cannot serve (known-empty ranges excluded)."""
+        ranges = self.uncovered(self.read(symbol, interval, start_ms, end_ms), start_ms, end_ms, interval_ms)
+        empty = self.load_empty(symbol, interval, now_ms)
+        if not len(empty) or not ranges:
+            return ranges
+        remaining = []
+        for start, end in ranges:
+            for e_start, e_end in empty[(empty[:, 1] >= start) & (empty[:, 0] <= end)].tolist():
+                if e_start > start:
+                    remaining.append((start, e_start - 1))
+                start = max(start, e_end + 1)
+            if start <= end:
+                remaining.append((start, end))
+        return remaining
+
+    def write(self, symbol: str, interval: str, buf: np.ndarray, now_ms: int) -> int:
+        """Merge the closed candles of `buf` into the archive; returns how many were new."""
+        closed = buf[buf['close_time'] < now_ms]
+        if not len(closed):
+            return 0
+        path = self.path(symbol, interval)
+        with self._lock(path):
+            existing = self.load(symbol, interval)
+            merged = concat_klines([np.asarray(existing), closed])
+            added = len(merged) - len(existing)
+            if added:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp, 'wb') as fh:
+                    np.save(fh, merged)
+                os.replace(tmp, path)  # atomic swap; readers keep their old mapping
+        return added
+
+    def replay(self, symbol: str, interval: str, start_ms: Optional[int] = None,
+               end_ms: Optional[int] = None) -> pd.DataFrame:
+        """Offline source: archived candles in the `fetch_binance_candles` frame shape."""
+        return klines_to_frame(np.asarray(self.read(symbol, interval, start_ms, end_ms)))
+
+
+# Create a singleton instance
+kline_archive = KlineArchive()
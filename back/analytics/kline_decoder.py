@@ -0,0 +1,138 @@
+"""
+Typed decoder for raw Binance kline payloads.
+
+Binance returns every kline as a 12-item JSON list mixing ints and decimal
+strings. `decode_klines` turns a page (or many concatenated pages) into a
+single NumPy structured array in one pass, so the indicator and persistence
+stages can work on int64/float64 columns without an object-dtype DataFrame.
+"""
+import logging
+import time
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+KLINE_DTYPE = np.dtype([
+    ('open_time', 'i8'),        # epoch ms
+    ('open_price', 'f8'),
+    ('high_price', 'f8'),
+    ('low_price', 'f8'),
+    ('close_price', 'f8'),
+    ('volume', 'f8'),
+    ('close_time', 'i8'),       # epoch ms
+    ('quote_volume', 'f8'),
+    ('num_trades', 'i4'),
+    ('taker_buy_base', 'f8'),
+    ('taker_buy_quote', 'f8'),
+])
+
+# Binance rows carry a trailing 'ignore' item that we never store
+_N_FIELDS = len(KLINE_DTYPE.names)
+
+
+def decode_klines(rows: Sequence[Sequence]) -> np.ndarray:
+    """Decode raw Binance kline rows into a KLINE_DTYPE structured array."""
+    return np.fromiter(
+        (tuple(r[:_N_FIELDS]) for r in rows), dtype=KLINE_DTYPE, count=len(rows)
+    )
+
+
+def concat_klines(buffers: Iterable[np.ndarray]) -> np.ndarray:
+    """Concatenate decoded pages, sort by open_time and drop duplicate candles."""
+    buffers = [b for b in buffers if len(b)]
+    if not buffers:
+        return np.empty(0, dtype=KLINE_DTYPE)
+    buf = np.concatenate(buffers)
+    _, first = np.unique(buf['open_time'], return_index=True)
+    return buf[first]
+
+
+def as_columns(buf: np.ndarray) -> Dict[str, np.ndarray]:
+    """Contiguous per-column arrays (what the indicator kernel and bulk loader consume)."""
+    return {name: np.ascontiguousarray(buf[name]) for name in KLINE_DTYPE.names}
+
+
+def klines_to_frame(buf: np.ndarray) -> pd.DataFrame:
+    """
+    DataFrame in the shape `fetch_binance_candles` has always returned
+    (naive UTC datetimes, numeric columns), built from typed columns only.
+    """
+    cols = as_columns(buf)
+    cols['open_time'] = cols['open_time'].astype('datetime64[ms]')
+    cols['close_time'] = cols['close_time'].astype('datetime64[ms]')
+    return pd.DataFrame(cols)
+
+
+def frame_to_klines(df: pd.DataFrame) -> np.ndarray:
+    """Inverse of `klines_to_frame` (datetime or epoch-ms time columns accepted)."""
+    buf = np.empty(len(df), dtype=KLINE_DTYPE)
+    for name in KLINE_DTYPE.names:
+        col = df[name]
+        if name in ('open_time', 'close_time') and pd.api.types.is_datetime64_any_dtype(col):
+            if getattr(col.dt, 'tz', None) is not None:
+                col = col.dt.tz_convert('UTC').dt.tz_localize(None)
+            col = col.astype('datetime64[ms]').astype('i8')
+        buf[name] = np.asarray(col, dtype=KLINE_DTYPE[name])
+    return buf
+
+
+def _legacy_decode(rows: Sequence[Sequence]) -> pd.DataFrame:
+    """The previous string-DataFrame path, kept for benchmarking only."""
+    df = pd.DataFrame(rows, columns=[
+        'open_time', 'open_price', 'high_price', 'low_price', 'close_price',
+        'volume', 'close_time', 'quote_volume', 'num_trades',
+        'taker_buy_base', 'taker_buy_quote', 'ignore'
+    ])
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    numeric_columns = [
+        'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+        'quote_volume', 'num_trades', 'taker_buy_base', 'taker_buy_quote'
+    ]
+    df[numeric_columns] = df[numeric_columns].astype(float)
+    return df.drop('ignore', axis=1)
+
+
+def synthetic_payload(n: int, start_ms: int = 1_600_000_000_000, interval_ms: int = 60_000) -> list:
+    """Deterministic Binance-shaped kline rows (strings for decimals, like the API)."""
+    rng = np.random.default_rng(42)
+    close = 100.0 + np.cumsum(rng.normal(0, 0.5, n))
+    rows = []
+    for i in range(n):
+        open_ms = start_ms + i * interval_ms
+        c = close[i]
+        rows.append([
+            open_ms, f"{c - 0.1:.8f}", f"{c + 0.5:.8f}", f"{c - 0.5:.8f}", f"{c:.8f}",
+            "12.50000000", open_ms + interval_ms - 1, f"{c * 12.5:.8f}", 100 + i % 50,
+            "6.25000000", f"{c * 6.25:.8f}", "0",
+        ])
+    return rows
+
+
+def benchmark(sizes: Sequence[int] = (1_000, 100_000, 1_000_000), repeat: int = 3) -> Dict[int, Dict[str, float]]:
+    """Best-of-`repeat` seconds for the legacy DataFrame path vs the typed decoder."""
+    results = {}
+    for n in sizes:
+        rows = synthetic_payload(n)
+        timings = {}
+        for name, fn in (('legacy_dataframe', _legacy_decode),
+                         ('decode_klines', decode_klines),
+                         ('decode_klines+frame', lambda r: klines_to_frame(decode_klines(r)))):
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fn(rows)
+                best = min(best, time.perf_counter() - started)
+            timings[name] = best
+        timings['speedup'] = timings['legacy_dataframe'] / timings['decode_klines']
+        results[n] = timings
+        logger.info(f"{n:>9} rows: " + ", ".join(f"{k}={v:.4f}" for k, v in timings.items()))
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    benchmark()
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0018_merge_20250810_2035'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(max_length=4)),
+                ('open_time', models.DateTimeField()),
+                ('close_time', models.DateTimeField()),
+                ('open_price', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('high_price', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('low_price', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('close_price', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('volume', models.DecimalField(decimal_places=8, max_digits=32)),
+                ('quote_volume', models.DecimalField(decimal_places=8, max_digits=32)),
+                ('num_trades', models.PositiveIntegerField()),
+                ('taker_buy_base_volume', models.DecimalField(decimal_places=8, default=0, max_digits=32, null=True)),
+                ('taker_buy_quote_volume', models.DecimalField(decimal_places=8, default=0, max_digits=32, null=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candles', to='analytics.coin')),
+            ],
+            options={
+                'ordering': ['-open_time'],
+                'unique_together': {('symbol', 'interval', 'open_time')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:05
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def drop_duplicate_daily_sentiment(apps, schema_editor):
+    """Keep the newest row per (symbol, timestamp) before the unique constraint is added."""
+    model = apps.get_model('analytics', 'DailySentimentData')
+    keep_ids = (
+        model.objects.values('symbol_id', 'timestamp')
+        .annotate(keep_id=Max('id'))
+        .values('keep_id')
+    )
+    model.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0019_candle'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_daily_sentiment, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='dailysentimentdata',
+            unique_together={('symbol', 'timestamp')},
+        ),
+    ]
@@ -64,6 +64,33 @@ class MarketData(models.Model):
     
 
 
+class Candle(models.Model):
+    """
+    Raw OHLCV candles keyed by interval (1h base stream plus locally resampled
+    4h/12h/1d/1w). MarketData stays the 12h table that carries indicators.
+    """
+    symbol = models.ForeignKey(Coin, related_name='candles', on_delete=models.CASCADE)
+    interval = models.CharField(max_length=4)
+    open_time = models.DateTimeField()
+    close_time = models.DateTimeField()
+    open_price = models.DecimalField(max_digits=20, decimal_places=8)
+    high_price = models.DecimalField(max_digits=20, decimal_places=8)
+    low_price = models.DecimalField(max_digits=20, decimal_places=8)
+    close_price = models.DecimalField(max_digits=20, decimal_places=8)
+    volume = models.DecimalField(max_digits=32, decimal_places=8)
+    quote_volume = models.DecimalField(max_digits=32, decimal_places=8)
+    num_trades = models.PositiveIntegerField()
+    taker_buy_base_volume = models.DecimalField(max_digits=32, decimal_places=8, null=True, default=0)
+    taker_buy_quote_volume = models.DecimalField(max_digits=32, decimal_places=8, null=True, default=0)
+
+    class Meta:
+        unique_together = ('symbol', 'interval', 'open_time')
+        ordering = ['-open_time']
+
+    def __str__(self):
+        return f"{self.symbol.symbol} {self.interval} - {self.open_time}"
+
+
 class NewsSentimentData(models.Model):
     article_id = models.CharField(max_length=100)
     symbol = models.ForeignKey("Coin", on_delete=models.CASCADE)
@@ -104,4 +131,6 @@ class DailySentimentData(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["symbol", "timestamp"]),
-        ]
\ No newline at end of file
+        ]
+        # one row per coin and 12h bucket (analytics/sentiment_aggregate.py upserts on it)
+        unique_together = ("symbol", "timestamp")
\ No newline at end of file
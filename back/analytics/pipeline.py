@@ -0,0 +1,267 @@
+"""
+Streaming backfill pipeline: fetch chunk -> decode -> indicators -> bulk persist.
+
+A long range is processed as a chain of generators over fixed-size time
+chunks, so peak memory is a few chunks no matter how long the range is:
+
+  fetch     `fetch_binance_candles` per chunk (archive, sharded requests, typed decode)
+  indicate  `compute_indicators_chunk` continuing an IndicatorState across chunk
+            boundaries, so warm-up happens once per run, not once per chunk
+  persist   `copy_market_data` (COPY + one merge statement per chunk)
+
+The fetch and indicator stages run in their own threads behind bounded
+queues, so the next chunk downloads while the previous one is written.
+
+`BackfillCheckpoint` records each committed chunk (last close_time, chunk
+index, indicator state) in Redis, so a restarted run resumes after the last
+committed chunk instead of starting over.
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from .bulk_loader import copy_market_data
+from .indicator_state import IndicatorState
+from .indicators import compute_indicators_chunk, INDICATOR_COLUMNS
+from .models import Coin
+from redis_cache.cache_utils.backfill import BackfillCheckpointCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_CANDLES = 5_000
+DEFAULT_PREFETCH = 2
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def prefetch(source: Iterable, maxsize: int = DEFAULT_PREFETCH, name: str = 'stage') -> Iterator:
+    """
+    Run `source` in a background thread and yield its items through a bounded
+    queue: the producer never gets more than `maxsize` items ahead, and its
+    exceptions are re-raised in the consumer.
+    """
+    q: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in source:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # handed over to the consumer
+            put(_StageError(e))
+        finally:
+            # propagate an early stop upstream (closes a chained prefetch stage too)
+            close = getattr(source, 'close', None)
+            if close:
+                close()
+
+    thread = threading.Thread(target=produce, name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        thread.join(timeout=5)
+
+
+def iter_candle_chunks(symbol: str, interval, start_time: datetime, end_time: datetime,
+                       chunk_candles: int = DEFAULT_CHUNK_CANDLES, fetch_workers: int = 1) -> Iterator[pd.DataFrame]:
+    """Fetch + decode stage: closed candles of [start_time, end_time], one frame per time chunk."""
+    from .tasks import fetch_binance_candles, INTERVAL_MS
+
+    step = timedelta(milliseconds=INTERVAL_MS[interval] * chunk_candles)
+    chunk_start = start_time
+    while chunk_start < end_time:
+        chunk_end = min(chunk_start + step - timedelta(milliseconds=1), end_time)
+        # a failed fetch must stop the run (resumable), not leave a silent hole
+        df = fetch_binance_candles(symbol, interval, chunk_start, chunk_end, limit=None,
+                                   workers=fetch_workers, raise_errors=True)
+        if df is None or df.empty:
+            logger.info(f"[{symbol}] no candles between {chunk_start} and {chunk_end}")
+        else:
+            # נר פתוח ישתנה עד סגירתו - לא נכנס למצב ולא נשמר
+            df = df[df['close_time'] < timezone.now().replace(tzinfo=None)]
+            if not df.empty:
+                yield df
+        chunk_start = chunk_end + timedelta(milliseconds=1)
+
+
+def with_indicators(chunks: Iterable[pd.DataFrame], state: IndicatorState) -> Iterator[Tuple[pd.DataFrame, IndicatorState]]:
+    """
+    Indicator stage: advance `state` over each chunk (rows it has already seen
+    are dropped) and yield the chunk with a snapshot of the state after it.
+    """
+    for df in chunks:
+        df = df.sort_values('close_time').reset_index(drop=True)
+        close_ms = df['close_time'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        if state.last_close_time is not None:
+            keep = close_ms > state.last_close_time
+            df, close_ms = df[keep].reset_index(drop=True), close_ms[keep]
+        if df.empty:
+            continue
+        values = compute_indicators_chunk(
+            df['high_price'].to_numpy(), df['low_price'].to_numpy(), df['close_price'].to_numpy(),
+            state, close_ms,
+        )
+        for col in INDICATOR_COLUMNS:
+            df[col] = values[col]
+        yield df, IndicatorState.from_dict(state.to_dict())
+
+
+class BackfillCheckpoint:
+    """
+    Resumable progress of one backfill job for one coin, stored in Redis.
+
+    On creation an unfinished checkpoint of the same job/interval is picked up:
+    `start_time` moves past its last committed candle and `state` continues its
+    indicator warm-up. Pass `on_chunk` to `run_backfill_pipeline`; a chunk is
+    recorded only after it is committed, and re-running one chunk after a
+    crash is harmless because persistence is an idempotent upsert.
+    """
+
+    def __init__(self, job: str, coin: Coin, interval, start_time: datetime, end_time: datetime,
+                 resume: bool = True):
+        self.job = job
+        self.symbol = coin.symbol
+        self.interval = getattr(interval, 'value', interval)
+        self.start_time = start_time
+        self.state: Optional[IndicatorState] = None
+        self.resumed = False
+        self._state_dict: Optional[Dict] = None  # state after the last committed chunk
+        self.data = {
+            'job': job, 'symbol': coin.symbol, 'interval': self.interval,
+            'range_start': start_time.isoformat(), 'range_end': end_time.isoformat(),
+            'last_close_time': None, 'chunk_index': 0, 'rows': 0,
+            'status': 'running', 'error': None, 'started_at': timezone.now().isoformat(),
+        }
+
+        previous = BackfillCheckpointCache.get_checkpoint(job, coin.symbol) if resume else None
+        if (previous and previous.get('status') != 'done' and previous.get('interval') == self.interval
+                and previous.get('last_close_time') and previous.get('state')):
+            last_close = datetime.fromtimestamp(previous['last_close_time'] / 1000, tz=dt_timezone.utc)
+            self.start_time = last_close + timedelta(milliseconds=1)
+            self.state = IndicatorState.from_dict(previous['state'])
+            self._state_dict = previous['state']
+            self.resumed = True
+            self.data.update(
+                range_start=previous['range_start'], last_close_time=previous['last_close_time'],
+                chunk_index=previous['chunk_index'], rows=previous['rows'], started_at=previous['started_at'],
+            )
+            logger.info(
+                f"[{coin.symbol}] resuming {job} after chunk {previous['chunk_index']} "
+                f"({previous['rows']} rows, last close {last_close})"
+            )
+        self._save()
+
+    def _save(self) -> None:
+        data = dict(self.data, updated_at=timezone.now().isoformat())
+        if self._state_dict is not None:
+            data['state'] = self._state_dict
+        BackfillCheckpointCache.set_checkpoint(self.job, self.symbol, data)
+
+    def on_chunk(self, df: pd.DataFrame, result: Dict[str, int], state: IndicatorState) -> None:
+        self.data['chunk_index'] += 1
+        self.data['rows'] += len(df)
+        self.data['last_close_time'] = state.last_close_time
+        self._state_dict = state.to_dict()
+        self._save()
+
+    def finish(self, status: str = 'done', error: Optional[str] = None) -> None:
+        """Mark the run finished ('done') or stopped ('failed'; resumed by the next run)."""
+        self.data.update(status=status, error=error)
+        self._save()
+
+
+def stored_history_state(coin: Coin, interval, start_time: datetime) -> IndicatorState:
+    """
+    Indicator state after the stored candles that open before start_time - the
+    ones a fetch from start_time does not return (a candle straddling it included).
+    """
+    from .tasks import load_indicator_state, INTERVAL_MS
+
+    return load_indicator_state(coin, before=start_time + timedelta(milliseconds=INTERVAL_MS[interval] - 1))
+
+
+def run_backfill_pipeline(
+    coin: Coin,
+    interval,
+    start_time: datetime,
+    end_time: datetime,
+    state: Optional[IndicatorState] = None,
+    conflict: str = 'update',
+    chunk_candles: int = DEFAULT_CHUNK_CANDLES,
+    fetch_workers: int = 1,
+    prefetch_chunks: int = DEFAULT_PREFETCH,
+    on_chunk: Optional[Callable[[pd.DataFrame, Dict[str, int], IndicatorState], None]] = None,
+) -> Dict[str, object]:
+    """
+    Stream [start_time, end_time] for one coin into MarketData.
+
+    `state` continues existing history (e.g. `load_indicator_state(coin)`);
+    without one the stored candles before start_time are replayed, so a
+    re-backfill ('update') writes full-history values instead of warm-up ones
+    over stored rows. `on_chunk(df, result, state)` runs after each chunk is
+    committed. Returns totals plus the final state, which is in sync with the
+    last persisted candle.
+    """
+    if state is None:
+        state = stored_history_state(coin, interval, start_time)
+    started = time.monotonic()
+    totals = {'chunks': 0, 'rows': 0, 'inserted': 0, 'updated': 0}
+
+    fetched = prefetch(
+        iter_candle_chunks(coin.symbol, interval, start_time, end_time, chunk_candles, fetch_workers),
+        prefetch_chunks, name=f"{coin.symbol}-fetch",
+    )
+    indicated = prefetch(with_indicators(fetched, state), prefetch_chunks, name=f"{coin.symbol}-indicators")
+    # The indicator thread runs ahead of persistence; only committed chunks advance this one
+    persisted_state = IndicatorState.from_dict(state.to_dict())
+
+    for df, chunk_state in indicated:
+        result = copy_market_data(coin.id, df, conflict=conflict)
+        persisted_state = chunk_state
+        totals['chunks'] += 1
+        totals['rows'] += len(df)
+        totals['inserted'] += result['inserted']
+        totals['updated'] += result['updated']
+        logger.info(
+            f"[{coin.symbol}] chunk {totals['chunks']}: {len(df)} candles up to {df['close_time'].iloc[-1]} "
+            f"({result['inserted']} inserted, {result['updated']} updated)"
+        )
+        if on_chunk:
+            on_chunk(df, result, persisted_state)
+
+    totals['seconds'] = time.monotonic() - started
+    totals['state'] = persisted_state
+    return totals
+
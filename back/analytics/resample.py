@@ -0,0 +1,62 @@
+"""
+Vectorized OHLCV resampling of decoded klines (KLINE_DTYPE buffers).
+
+Higher timeframes (4h, 12h, 1d, 1w, ...) are derived from stored 1h/1m
+candles with a handful of `ufunc.reduceat` calls, so one ingest stream feeds
+every timeframe without extra Binance requests.
+"""
+import numpy as np
+
+from .kline_decoder import KLINE_DTYPE
+
+# Our klines are requested with Binance 'timeZone': 3, which shifts bucket
+# boundaries by three hours; weekly candles additionally start on Monday
+# (the Unix epoch was a Thursday).
+KLINE_TZ_OFFSET_HOURS = 3
+_HOUR_MS = 3_600_000
+_WEEK_MS = 7 * 24 * _HOUR_MS
+_MONDAY_OFFSET_MS = 4 * 24 * _HOUR_MS
+
+
+def bucket_origin_ms(target_ms: int, tz_offset_hours: int = KLINE_TZ_OFFSET_HOURS) -> int:
+    """Epoch-ms origin that bucket boundaries of `target_ms` are aligned to."""
+    origin = -tz_offset_hours * _HOUR_MS
+    if target_ms % _WEEK_MS == 0:
+        origin += _MONDAY_OFFSET_MS
+    return origin
+
+
+def resample_klines(buf: np.ndarray, base_ms: int, target_ms: int,
+                    tz_offset_hours: int = KLINE_TZ_OFFSET_HOURS,
+                    include_partial: bool = False) -> np.ndarray:
+    """
+    Aggregate a sorted, de-duplicated base-interval buffer into `target_ms` candles.
+
+    open = first open, high = max, low = min, close = last close, volumes and
+    trades summed. Buckets missing base candles (the still-forming one, or holes
+    in the history) are dropped unless `include_partial` is set.
+    """
+    if target_ms % base_ms:
+        raise ValueError(f"Target interval {target_ms}ms is not a multiple of base {base_ms}ms")
+    if not len(buf):
+        return np.empty(0, dtype=KLINE_DTYPE)
+
+    origin = bucket_origin_ms(target_ms, tz_offset_hours)
+    bucket = (buf['open_time'] - origin) // target_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(buf)] - 1
+    counts = ends - starts + 1
+
+    out = np.empty(len(starts), dtype=KLINE_DTYPE)
+    out['open_time'] = bucket[starts] * target_ms + origin
+    out['close_time'] = out['open_time'] + target_ms - 1
+    out['open_price'] = buf['open_price'][starts]
+    out['close_price'] = buf['close_price'][ends]
+    out['high_price'] = np.maximum.reduceat(buf['high_price'], starts)
+    out['low_price'] = np.minimum.reduceat(buf['low_price'], starts)
+    for name in ('volume', 'quote_volume', 'num_trades', 'taker_buy_base', 'taker_buy_quote'):
+        out[name] = np.add.reduceat(buf[name], starts)
+
+    if not include_partial:
+        out = out[counts == target_ms // base_ms]
+    return out
@@ -0,0 +1,134 @@
+"""
+In-database aggregation of NewsSentimentData into DailySentimentData.
+
+Articles are bucketed into the same 12h windows as MarketData (klines are
+requested with timeZone +3, so buckets start at 21:00/09:00 UTC) with
+`date_bin`, aggregated per (coin, bucket) and merged into
+analytics_dailysentimentdata by one `INSERT ... SELECT ... GROUP BY ...
+ON CONFLICT (symbol_id, timestamp)` statement. A row's timestamp is its
+bucket start, i.e. the open_time of the candle whose window the news fell in.
+
+Per bucket, like the n8n "Daily Score Calc" node:
+  sentiment_score   confidence-weighted mean score (plain mean when no article
+                    carries a confidence), rounded to 4 places
+  confidence_score  mean confidence
+  sentiment_label   'extremely bearish' .. 'extremely bullish' from the score
+  label counts      articles per NewsSentimentData.sentiment_label
+
+Rewritten buckets change the sentiment features of existing candles, so the
+affected coins' cached predictions (PredictionCache) are dropped.
+"""
+import logging
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from django.db import connection, transaction
+
+from .models import Coin, DailySentimentData, NewsSentimentData
+from .resample import bucket_origin_ms
+from redis_cache.cache_utils.prediction import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+BUCKET_MS = 12 * 60 * 60 * 1000
+
+SENTIMENT_LABELS = ['extremely_bearish', 'bearish', 'neutral', 'bullish', 'extremely_bullish']
+
+# (upper bound, label) of the bucket's mean score; the n8n flow's thresholds
+SCORE_LABELS = [
+    (-0.75, 'extremely bearish'),
+    (-0.25, 'bearish'),
+    (0.25, 'neutral'),
+    (0.75, 'bullish'),
+]
+
+
+def _bucket_start_ms(moment: datetime) -> int:
+    if moment.tzinfo is None:  # naive = UTC, like the rest of the ingest code
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    ms = int(moment.timestamp() * 1000)
+    return ms - (ms - bucket_origin_ms(BUCKET_MS)) % BUCKET_MS
+
+
+def _label_sql(score: str) -> str:
+    cases = ' '.join(
+        f"WHEN {score} {'<' if label == 'neutral' else '<='} {bound} THEN '{label}'"
+        for bound, label in SCORE_LABELS
+    )
+    return f"CASE WHEN {score} IS NULL THEN 'unknown' {cases} ELSE 'extremely bullish' END"
+
+
+def _aggregate_sql(where: List[str]) -> str:
+    news = NewsSentimentData._meta.db_table
+    daily = DailySentimentData._meta.db_table
+    origin_ms = bucket_origin_ms(BUCKET_MS)
+    weighted = (
+        "CASE WHEN SUM(confidence_score) FILTER (WHERE sentiment_score IS NOT NULL) > 0 "
+        "THEN SUM(sentiment_score * confidence_score) / SUM(confidence_score) FILTER (WHERE sentiment_score IS NOT NULL) "
+        "ELSE AVG(sentiment_score) END"
+    )
+    counts = ', '.join(f"COUNT(*) FILTER (WHERE sentiment_label = '{label}') AS {label}" for label in SENTIMENT_LABELS)
+    columns = ['symbol_id', 'timestamp', 'sentiment_score', 'confidence_score', 'sentiment_label'] + SENTIMENT_LABELS
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns if c not in ('symbol_id', 'timestamp'))
+    return f"""
+        WITH buckets AS (
+            SELECT
+                symbol_id,
+                date_bin(INTERVAL '12 hours', timestamp, TIMESTAMPTZ 'epoch' + {origin_ms} * INTERVAL '1 millisecond') AS bucket,
+                ROUND(({weighted})::numeric, 4)::float8 AS score,
+                ROUND(AVG(confidence_score)::numeric, 4)::float8 AS confidence,
+                {counts}
+            FROM {news}
+            WHERE {' AND '.join(where)}
+            GROUP BY 1, 2
+        ),
+        merged AS (
+            INSERT INTO {daily} ({', '.join(columns)})
+            SELECT symbol_id, bucket, score, confidence, {_label_sql('score')}, {', '.join(SENTIMENT_LABELS)}
+            FROM buckets
+            ON CONFLICT (symbol_id, timestamp) DO UPDATE SET {updates}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+    """
+
+
+def aggregate_sentiment(symbols: Optional[List[str]] = None,
+                        start: Optional[datetime] = None,
+                        end: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Rebuild DailySentimentData from the stored articles of `symbols` (all coins
+    when None) published in [start, end). Buckets are always recomputed from
+    every article in them, so the range is widened to whole buckets.
+    Returns {'buckets', 'inserted', 'updated'}.
+    """
+    where, params = ['timestamp IS NOT NULL'], []
+    if symbols:
+        coin_ids = list(Coin.objects.filter(symbol__in=[s.upper() for s in symbols]).values_list('id', flat=True))
+        if not coin_ids:
+            return {'buckets': 0, 'inserted': 0, 'updated': 0}
+        where.append('symbol_id = ANY(%s)')
+        params.append(coin_ids)
+    if start is not None:
+        where.append("timestamp >= TIMESTAMPTZ 'epoch' + %s * INTERVAL '1 millisecond'")
+        params.append(_bucket_start_ms(start))
+    if end is not None:
+        # end of the bucket holding the last included instant
+        end_ms = _bucket_start_ms(end - timedelta(milliseconds=1)) + BUCKET_MS
+        where.append("timestamp < TIMESTAMPTZ 'epoch' + %s * INTERVAL '1 millisecond'")
+        params.append(end_ms)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(_aggregate_sql(where), params)
+        inserted, updated = cursor.fetchone()
+    result = {'buckets': inserted + updated, 'inserted': inserted, 'updated': updated}
+    logger.info(
+        f"Aggregated sentiment into {result['buckets']} 12h buckets "
+        f"({inserted} inserted, {updated} updated)"
+    )
+    if result['buckets']:
+        # sentiment features of these coins' candles changed -> their cached predictions are stale
+        for symbol in symbols or Coin.objects.values_list('symbol', flat=True):
+            PredictionCache.invalidate_symbol(symbol)
+    return result
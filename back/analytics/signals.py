@@ -0,0 +1,10 @@
+"""
+Ingest events other apps can subscribe to without analytics importing them.
+
+candles_closed: sent after newly closed candles of one coin are committed to
+MarketData. kwargs: symbol, first_close_time, last_close_time (tz-aware UTC),
+inserted, updated.
+"""
+from django.dispatch import Signal
+
+candles_closed = Signal()
@@ -1,20 +1,29 @@
 from celery import shared_task
-from .models import MarketData, Coin
-from redis_cache.cache_utils.market import MarketDataCache
+from .models import MarketData, Coin, Candle
+from .binance_client import binance_client
+from .kline_decoder import decode_klines, concat_klines, klines_to_frame, frame_to_klines
+from .resample import resample_klines
+from .indicator_state import IndicatorState
+from .indicators import compute_indicators, compute_indicators_for_frames, INDICATOR_COLUMNS
+from redis_cache.cache_utils.indicators import IndicatorStateCache
+from .kline_archive import kline_archive
+from .bulk_loader import copy_market_data
+from .pipeline import run_backfill_pipeline, BackfillCheckpoint
+from .signals import candles_closed
+from redis_cache.cache_utils.market import MarketDataCache, UnfillableGapCache
 import requests
 import logging
-from django.db import transaction
-import ta
-from typing import Optional, Dict, Any, Union
+from django.db import connection, transaction
+from typing import Optional, Dict, Any, List, Union
 from decimal import Decimal
 from django.conf import settings
-from datetime import time
 import pandas as pd
 import numpy as np
-import ta
 from django.utils import timezone
 from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -37,19 +46,134 @@ class BinanceInterval(str, Enum):
     MONTH_1 = '1M'
 
 
+# Fixed interval lengths (ms) used to precompute shard boundaries; '1M' is calendar based
+INTERVAL_MS = {
+    BinanceInterval.MINUTE_1: 60_000,
+    BinanceInterval.MINUTE_3: 3 * 60_000,
+    BinanceInterval.MINUTE_5: 5 * 60_000,
+    BinanceInterval.MINUTE_15: 15 * 60_000,
+    BinanceInterval.MINUTE_30: 30 * 60_000,
+    BinanceInterval.HOUR_1: 3_600_000,
+    BinanceInterval.HOUR_2: 2 * 3_600_000,
+    BinanceInterval.HOUR_4: 4 * 3_600_000,
+    BinanceInterval.HOUR_6: 6 * 3_600_000,
+    BinanceInterval.HOUR_8: 8 * 3_600_000,
+    BinanceInterval.HOUR_12: 12 * 3_600_000,
+    BinanceInterval.DAY_1: 86_400_000,
+    BinanceInterval.DAY_3: 3 * 86_400_000,
+    BinanceInterval.WEEK_1: 7 * 86_400_000,
+}
+
+
+def _fetch_kline_pages(params: Dict[str, Any], end_ms: Optional[int], limit: Optional[int]) -> list:
+    """Page sequentially from params['startTime'] until end_ms / limit; raw Binance rows."""
+    params = dict(params)
+    rows = []
+    while True:
+        data = binance_client.get_klines(params)
+
+        if not data:
+            break
+
+        rows.extend(data)
+
+        # Update start time to fetch next batch
+        last_close_time = data[-1][6]  # Close time from last candle
+        params['startTime'] = last_close_time + 1
+
+        # Stop if we've reached the end time or limit
+        if end_ms and params['startTime'] >= end_ms:
+            break
+        if limit and len(rows) >= limit:
+            rows = rows[:limit]
+            break
+    return rows
+
+
+def _fetch_kline_shards(params: Dict[str, Any], start_ms: int, end_ms: int,
+                        interval_ms: int, workers: int) -> np.ndarray:
+    """
+    Split [start_ms, end_ms] into independent 1000-candle windows, fetch and decode
+    them concurrently and reassemble in order (duplicates dropped by open_time).
+    """
+    step = interval_ms * 1000
+    windows = [(s, min(s + step - 1, end_ms)) for s in range(start_ms, end_ms + 1, step)]
+
+    def fetch_window(window):
+        w_start, w_end = window
+        rows = _fetch_kline_pages({**params, 'startTime': w_start, 'endTime': w_end, 'limit': 1000}, w_end, None)
+        return decode_klines(rows)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows)))) as pool:
+        buf = concat_klines(pool.map(fetch_window, windows))
+
+    gaps = int(np.count_nonzero(np.diff(buf['open_time']) != interval_ms))
+    if gaps:
+        logger.warning(f"{params['symbol']} {params['interval']}: {gaps} gaps in {len(buf)} sharded candles")
+    logger.debug(f"{params['symbol']} {params['interval']}: {len(windows)} shards -> {len(buf)} candles")
+    return buf
+
+
+def _fetch_kline_range(params: Dict[str, Any], start_ms: int, end_ms: int,
+                       interval_ms: int, workers: int) -> np.ndarray:
+    """Decoded candles for one [start_ms, end_ms] range (sharded when workers > 1)."""
+    if workers > 1:
+        return _fetch_kline_shards(params, start_ms, end_ms, interval_ms, workers)
+    return decode_klines(_fetch_kline_pages({**params, 'startTime': start_ms, 'endTime': end_ms}, end_ms, None))
+
+
+def _fetch_klines_via_archive(symbol: str, params: Dict[str, Any], start_ms: int, end_ms: int,
+                              interval: BinanceInterval, workers: int) -> np.ndarray:
+    """
+    Serve closed candles from the local archive; fetch only the ranges it lacks
+    (history holes and the still-open tail) and archive whatever closed in them.
+    Parts of a fetched range that came back without candles and have certainly
+    closed (one interval before now) are recorded as empty, so holes Binance
+    cannot fill are not fetched again until the record expires.
+    """
+    interval_ms = INTERVAL_MS[interval]
+    now_ms = int(timezone.now().timestamp() * 1000)
+    missing = kline_archive.missing_ranges(symbol, interval.value, start_ms, end_ms, interval_ms, now_ms)
+    chunks, empty = [], []
+    for r_start, r_end in missing:
+        chunk = _fetch_kline_range(params, r_start, r_end, interval_ms, workers)
+        chunks.append(chunk)
+        settled_end = min(r_end, now_ms - interval_ms)
+        empty.extend(kline_archive.uncovered(chunk[chunk['open_time'] <= settled_end], r_start, settled_end,
+                                             interval_ms))
+    fresh = concat_klines(chunks)
+    if empty:
+        kline_archive.mark_empty(symbol, interval.value, empty, now_ms)
+        logger.debug(f"{symbol} {interval.value}: {len(empty)} fetched ranges had no candles, recorded as empty")
+    if len(fresh):
+        added = kline_archive.write(symbol, interval.value, fresh, now_ms)
+        logger.debug(f"{symbol} {interval.value}: fetched {len(fresh)} candles in {len(missing)} ranges, archived {added}")
+    archived = np.asarray(kline_archive.read(symbol, interval.value, start_ms, end_ms))
+    return concat_klines([archived, fresh])
+
+
 def fetch_binance_candles(
     symbol: str,
     interval: Union[str, BinanceInterval],
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    limit: int = 1000
+    limit: Optional[int] = 1000,
+    workers: int = 1,
+    use_archive: bool = True,
+    raise_errors: bool = False,
 ) -> Optional[pd.DataFrame]:
     """
     Fetch candlestick data from Binance API with flexible parameters.
+    Pages go through the shared `binance_client` (pooled session, weight-aware limiter, retries).
+
+    `limit=None` fetches the whole [start_time, end_time] range. With `workers > 1` and
+    both bounds given, the range is split into 1000-candle windows fetched concurrently
+    (fixed-length intervals only) instead of paging one response after another.
+    Bounded requests are served through the local kline archive (KLINE_ARCHIVE_ENABLED):
+    only candles it does not hold yet are downloaded.
+    `raise_errors=True` re-raises request failures instead of returning None, so
+    callers can tell "no candles" from "fetch failed".
     """
-    import requests
-    
-    base_url = 'https://api.binance.com/api/v3/klines'
     formatted_symbol = f"{symbol.upper()}USDT"
     
     # Validate interval
@@ -64,79 +188,50 @@ def fetch_binance_candles(
     params = {
         'symbol': formatted_symbol,
         'interval': interval.value,
-        'limit': min(limit, 1000),  # Binance maximum is 1000
+        'limit': min(limit or 1000, 1000),  # Binance maximum is 1000
         'timeZone' : 3
     }
     
     # Add timestamps if provided
-    if start_time:
-        params['startTime'] = int(start_time.timestamp() * 1000)
-    if end_time:
-        params['endTime'] = int(end_time.timestamp() * 1000)
+    start_ms = int(start_time.timestamp() * 1000) if start_time else None
+    end_ms = int(end_time.timestamp() * 1000) if end_time else None
+    if start_ms is not None:
+        params['startTime'] = start_ms
+    if end_ms is not None:
+        params['endTime'] = end_ms
 
-    all_data = []
-    retry_count = 0
-    max_retries = 3
+    bounded = start_ms is not None and end_ms is not None and interval in INTERVAL_MS
 
-    while retry_count < max_retries:
-        try:
-            while True:
-                response = requests.get(base_url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-
-                if not data:
-                    break
-
-                all_data.extend(data)
-                
-                # Update start time to fetch next batch
-                last_close_time = data[-1][6]  # Close time from last candle
-                params['startTime'] = last_close_time + 1
-
-                # Stop if we've reached the end time or limit
-                if end_time and params['startTime'] >= int(end_time.timestamp() * 1000):
-                    break
-                if len(all_data) >= limit:
-                    all_data = all_data[:limit]
-                    break
-
-            if not all_data:
-                logger.warning(f"No data returned for {symbol}")
-                return None
-
-            # Create DataFrame with proper column names
-            df = pd.DataFrame(all_data, columns=[
-                'open_time', 'open_price', 'high_price', 'low_price', 'close_price', 
-                'volume', 'close_time', 'quote_volume', 'num_trades',
-                'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
-
-            # Convert timestamps to datetime - simple naive datetime as Binance provides
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-            
-            # Convert numeric columns to float before any processing
-            numeric_columns = [
-                'open_price', 'high_price', 'low_price', 'close_price', 'volume',
-                'quote_volume', 'num_trades', 'taker_buy_base', 'taker_buy_quote'
-            ]
-            df[numeric_columns] = df[numeric_columns].astype(float)
+    try:
+        if bounded and use_archive and settings.KLINE_ARCHIVE_ENABLED:
+            buf = _fetch_klines_via_archive(symbol, params, start_ms, end_ms, interval, workers)
+            if limit:
+                buf = buf[:limit]
+        elif bounded and workers > 1:
+            buf = _fetch_kline_shards(params, start_ms, end_ms, INTERVAL_MS[interval], workers)
+            if limit:
+                buf = buf[:limit]
+        else:
+            buf = decode_klines(_fetch_kline_pages(params, end_ms, limit))
 
-            # Drop the 'ignore' column as it's not needed
-            df = df.drop('ignore', axis=1)
+        if not len(buf):
+            logger.warning(f"No data returned for {symbol}")
+            return None
 
-            return df
+        # Typed columns straight from the payload: epoch-ms -> naive datetimes as Binance provides,
+        # float64 prices/volumes, int32 trades (no string DataFrame / astype pass)
+        return klines_to_frame(buf)
 
-        except requests.exceptions.RequestException as e:
-            retry_count += 1
-            logger.warning(f"Retry {retry_count} for {symbol}: {str(e)}")
-            if retry_count == max_retries:
-                logger.error(f"Max retries reached for {symbol}: {str(e)}")
-                return None
-        except Exception as e:
-            logger.error(f"Error fetching candles for {symbol}: {str(e)}")
-            return None
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Binance request failed for {symbol} after retries: {str(e)}")
+        if raise_errors:
+            raise
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching candles for {symbol}: {str(e)}")
+        if raise_errors:
+            raise
+        return None
 
 def fetch_historical_data_from_binance(symbol: str) -> Optional[pd.DataFrame]:
     """Fetch 12-hour candles from the last saved record up to now for the given symbol.
@@ -219,66 +314,23 @@ def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce").astype(float)
 
-    # RSI
-    try:
-        df["RSI"] = ta.momentum.RSIIndicator(close=df["close_price"], window=14).rsi()
-    except Exception:
-        df["RSI"] = np.nan
-
-    # MACD
-    try:
-        # EWMA ישיר: בלי חוסרים בתחילת הסדרה
-        ema_fast = df["close_price"].ewm(span=12, adjust=False, min_periods=1).mean()
-        ema_slow = df["close_price"].ewm(span=26, adjust=False, min_periods=1).mean()
-        df["MACD"] = ema_fast - ema_slow
-        df["MACD_Signal"] = df["MACD"].ewm(span=9, adjust=False, min_periods=1).mean()
-        df["MACD_Hist"] = df["MACD"] - df["MACD_Signal"]
-    except Exception:
-        df["MACD"] = np.nan
-        df["MACD_Signal"] = np.nan
-        df["MACD_Hist"] = np.nan
-
-
-    # Bollinger Bands
-    try:
-        bb = ta.volatility.BollingerBands(close=df["close_price"], window=20, window_dev=2)
-        df["BB_Upper"]  = bb.bollinger_hband()
-        df["BB_Middle"] = bb.bollinger_mavg()
-        df["BB_Lower"]  = bb.bollinger_lband()
-    except Exception:
-        df["BB_Upper"] = df["BB_Middle"] = df["BB_Lower"] = np.nan
-
-    # ATR
-    try:
-        df["ATR"] = ta.volatility.AverageTrueRange(
-            high=df["high_price"], low=df["low_price"], close=df["close_price"], window=14
-        ).average_true_range()
-    except Exception:
-        df["ATR"] = np.nan
-
-    # Williams %R
-    try:
-        df["Williams_R"] = ta.momentum.WilliamsRIndicator(
-            high=df["high_price"], low=df["low_price"], close=df["close_price"], lbp=14
-        ).williams_r()
-    except Exception:
-        df["Williams_R"] = np.nan
-
-    # אחוז שינוי 24 שעות (בקנדלים 12h -> shift(2))
-    prev_close_24h = df["close_price"].shift(2)
-    with np.errstate(invalid="ignore", divide="ignore"):
-        df["price_change_percent_24h"] = (
-            (df["close_price"] - prev_close_24h) / prev_close_24h * 100.0
-        ).replace([np.inf, -np.inf], np.nan)
+    # RSI / MACD / Bollinger / ATR / Williams %R / שינוי 24h - kernel וקטורי (ערכים זהים ל-ta)
+    values = compute_indicators(
+        df["high_price"].to_numpy(), df["low_price"].to_numpy(), df["close_price"].to_numpy()
+    )
+    for col in INDICATOR_COLUMNS:
+        df[col] = values[col]
 
     return df
 
 
 
 
-def process_and_save_data(symbol: str, df: pd.DataFrame) -> bool:
+def process_and_save_data(symbol: str, df: pd.DataFrame, conflict: str = "ignore") -> bool:
     """
     שומר נתוני שוק ל-DB ב-bulk. מניח שהאינדיקטורים כבר חושבו ב-df.
+    conflict: "ignore" (ברירת מחדל, רק נרות חדשים) / "update" (upsert - מתקן גם שורות קיימות)
+    / "indicators" (עדכון עמודות האינדיקטורים בלבד), ראו analytics/bulk_loader.py.
     """
     if df is None or df.empty:
         logger.info(f"No rows to save for {symbol}")
@@ -291,71 +343,24 @@ def process_and_save_data(symbol: str, df: pd.DataFrame) -> bool:
             logger.error(f"Coin {symbol} not found in database")
             return False
 
-        df = df.copy().sort_values("close_time").reset_index(drop=True)
-
-        # טיפוסים נומריים
-        numeric_columns = [
-            "open_price", "high_price", "low_price", "close_price", "volume",
-            "quote_volume", "num_trades", "taker_buy_base", "taker_buy_quote",
-            "price_change_percent_24h", "rsi", "macd", "macd_signal", "macd_hist",
-            "bb_upper", "bb_middle", "bb_lower", "atr", "williams_r",
-        ]
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        def fsafe(x):
-            return float(x) if pd.notna(x) else None
+        # COPY לטבלת staging + INSERT ... ON CONFLICT אחד (בלי אובייקטי ORM לכל שורה ובלי COUNT)
+        result = copy_market_data(coin.id, df.sort_values("close_time"), conflict=conflict)
+        logger.info(
+            f"Saved {symbol}: {result['inserted']} inserted, {result['updated']} updated, "
+            f"{result['skipped']} already stored (of {result['staged']})"
+        )
 
-        def isafe(x):
-            try:
-                return int(x) if pd.notna(x) else 0
-            except Exception:
-                return 0
-
-        bulk = []
-        for row in df.itertuples(index=False):
-            market_data = MarketData(
-                symbol=coin,
-                open_time=getattr(row, "open_time", None),
-                close_time=getattr(row, "close_time", None),
-                open_price=fsafe(getattr(row, "open_price", None)),
-                high_price=fsafe(getattr(row, "high_price", None)),
-                low_price=fsafe(getattr(row, "low_price", None)),
-                close_price=fsafe(getattr(row, "close_price", None)),
-                volume=fsafe(getattr(row, "volume", None)),
-                quote_volume=fsafe(getattr(row, "quote_volume", None)),
-                num_trades=isafe(getattr(row, "num_trades", None)),
-                taker_buy_base_volume=fsafe(getattr(row, "taker_buy_base", None)),
-                taker_buy_quote_volume=fsafe(getattr(row, "taker_buy_quote", None)),
-                price_change_percent_24h=(
-                    round(fsafe(getattr(row, "price_change_percent_24h", None)), 2)
-                    if pd.notna(getattr(row, "price_change_percent_24h", np.nan)) else None
-                ),
-                rsi=(
-                    round(fsafe(getattr(row, "RSI", None)), 2)
-                    if pd.notna(getattr(row, "RSI", np.nan)) else None
-                ),
-                macd=fsafe(getattr(row, "MACD", None)) if pd.notna(getattr(row, "MACD", np.nan)) else None,
-                macd_signal=fsafe(getattr(row, "MACD_Signal", None)) if pd.notna(getattr(row, "MACD_Signal", np.nan)) else None,
-                macd_hist=fsafe(getattr(row, "MACD_Hist", None)) if pd.notna(getattr(row, "MACD_Hist", np.nan)) else None,
-                bb_upper=fsafe(getattr(row, "BB_Upper", None)) if pd.notna(getattr(row, "BB_Upper", np.nan)) else None,
-                bb_middle=fsafe(getattr(row, "BB_Middle", None)) if pd.notna(getattr(row, "BB_Middle", np.nan)) else None,
-                bb_lower=fsafe(getattr(row, "BB_Lower", None)) if pd.notna(getattr(row, "BB_Lower", np.nan)) else None,
-                atr=fsafe(getattr(row, "ATR", None)) if pd.notna(getattr(row, "ATR", np.nan)) else None,
-                williams_r=fsafe(getattr(row, "Williams_R", None)) if pd.notna(getattr(row, "Williams_R", np.nan)) else None,
+        # אירוע "נרות נסגרו" - מפעיל חישוב פיצ'רים אינקרמנטלי ברקע (analysis/signals.py)
+        if result['inserted'] or result['updated']:
+            close_times = pd.to_datetime(df["close_time"], utc=True)
+            event = dict(
+                symbol=coin.symbol,
+                first_close_time=close_times.min().to_pydatetime(),
+                last_close_time=close_times.max().to_pydatetime(),
+                inserted=result['inserted'],
+                updated=result['updated'],
             )
-            bulk.append(market_data)
-
-        if bulk:
-            with transaction.atomic():
-                MarketData.objects.bulk_create(
-                    bulk, batch_size=100, ignore_conflicts=True
-                )
-            logger.info(f"Saved {len(bulk)} records for {symbol}")
-
-        total = MarketData.objects.filter(symbol=coin).count()
-        logger.info(f"Total records for {symbol}: {total}")
+            transaction.on_commit(lambda: candles_closed.send(sender=process_and_save_data, **event))
         return True
 
     except Exception as e:
@@ -364,15 +369,123 @@ def process_and_save_data(symbol: str, df: pd.DataFrame) -> bool:
 
     
 
+@shared_task
+def recompute_market_indicators(symbols: Optional[Union[str, List[str]]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    מחשב מחדש את האינדיקטורים על כל ההיסטוריה השמורה (למשל אחרי שינוי במנוע האינדיקטורים)
+    ומעדכן אותם במקום: kernel אחד על כל המטבעות יחד + UPDATE ... FROM staging לכל מטבע,
+    בלי מחיקות ובלי save() לכל שורה. מתקן גם ערכי NaN של ה-warm-up שנשמרו ב-ignore_conflicts.
+    symbols: סימבול אחד, רשימה, או None לכל המטבעות.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    coins = (
+        Coin.objects.filter(symbol__in=[s.upper() for s in symbols])
+        if symbols else Coin.objects.exclude(symbol__in=["USD", "USDC"])
+    )
+    coins_by_symbol = {c.symbol: c for c in coins}
+    frames = {}
+    for sym, coin in coins_by_symbol.items():
+        rows = list(
+            MarketData.objects.filter(symbol=coin).order_by("close_time")
+            .values_list("close_time", "high_price", "low_price", "close_price")
+        )
+        if rows:
+            frames[sym] = pd.DataFrame(rows, columns=["close_time", "high_price", "low_price", "close_price"])
+
+    results: Dict[str, Dict[str, int]] = {}
+    for sym, df in compute_indicators_for_frames(frames).items():
+        results[sym] = copy_market_data(coins_by_symbol[sym].id, df, conflict="indicators")
+        logger.info(f"Recomputed indicators for {sym}: {results[sym]['updated']} rows updated")
+    return results
+
+
+def _to_epoch_ms(ts) -> int:
+    return int(pd.Timestamp(ts).timestamp() * 1000)
+
+
+def load_indicator_state(coin: Coin, before: Optional[datetime] = None) -> IndicatorState:
+    """
+    Incremental indicator state for the coin, in sync with its newest MarketData row.
+    Rebuilt once by replaying the stored history when Redis has none (or a stale one).
+    `before`: the state after the last stored candle closing before it (replayed,
+    not cached) - seeds a repair/backfill from that point with full-history values.
+    """
+    if before is not None:
+        rows = (
+            MarketData.objects.filter(symbol=coin, close_time__lt=before).order_by('close_time')
+            .values_list('high_price', 'low_price', 'close_price', 'close_time')
+        )
+        return IndicatorState.from_history(
+            (float(h), float(l), float(c), _to_epoch_ms(t)) for h, l, c, t in rows.iterator(chunk_size=2000)
+        )
+
+    latest_close = (
+        MarketData.objects.filter(symbol=coin)
+        .order_by('-close_time').values_list('close_time', flat=True).first()
+    )
+    state = IndicatorStateCache.get_state(coin.symbol)
+    if latest_close is None:
+        return IndicatorState()
+    if state is not None and state.last_close_time == _to_epoch_ms(latest_close):
+        return state
+
+    logger.info(f"Rebuilding indicator state for {coin.symbol} from stored history")
+    rows = (
+        MarketData.objects.filter(symbol=coin).order_by('close_time')
+        .values_list('high_price', 'low_price', 'close_price', 'close_time')
+    )
+    return IndicatorState.from_history(
+        (float(h), float(l), float(c), _to_epoch_ms(t)) for h, l, c, t in rows.iterator(chunk_size=2000)
+    )
+
+
+def recompute_indicators_since(coin: Coin, since: datetime) -> Dict[str, int]:
+    """
+    Recompute the stored indicators of the coin's candles closing at/after
+    `since`, continuing the exact state of the history before it (e.g. after a
+    hole was filled), and store the final state as the live one.
+    """
+    state = load_indicator_state(coin, before=since)
+    rows = list(
+        MarketData.objects.filter(symbol=coin, close_time__gte=since).order_by('close_time')
+        .values_list('close_time', 'high_price', 'low_price', 'close_price')
+    )
+    if not rows:
+        return {'staged': 0, 'inserted': 0, 'updated': 0, 'skipped': 0}
+    df = pd.DataFrame(rows, columns=['close_time', 'high_price', 'low_price', 'close_price'])
+    df[['high_price', 'low_price', 'close_price']] = df[['high_price', 'low_price', 'close_price']].astype(float)
+    result = copy_market_data(coin.id, apply_indicator_state(state, df), conflict="indicators")
+    IndicatorStateCache.set_state(coin.symbol, state)
+    return result
+
+
+def apply_indicator_state(state: IndicatorState, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Advance `state` candle by candle over new rows (oldest first) and attach the
+    indicator columns; rows the state has already seen are dropped.
+    """
+    df = df.sort_values("close_time").reset_index(drop=True)
+    close_ms = [_to_epoch_ms(t) for t in df["close_time"]]
+    if state.last_close_time is not None:
+        keep = [ms > state.last_close_time for ms in close_ms]
+        df = df[keep].reset_index(drop=True)
+        close_ms = [ms for ms, k in zip(close_ms, keep) if k]
+    values = [
+        state.update(h, l, c, ms)
+        for h, l, c, ms in zip(df["high_price"], df["low_price"], df["close_price"], close_ms)
+    ]
+    return pd.concat([df, pd.DataFrame(values, index=df.index)], axis=1)
+
+
 @shared_task
 def fetch_missing_klines(symbol: Optional[str] = None) -> None:
     """
     Fetch and save missing 12-hour klines:
-      1) משיכה מבינאנס של נרות חסרים
-      2) משיכה מה-DB של 30 רשומות אחרונות (לחימום אינדיקטורים)
-      3) איחוד (30 עבר + חדשות)
-      4) חישוב אינדיקטורים על המסגרת המלאה
-      5) שמירה ל-DB רק של הרשומות החדשות
+      1) משיכה מבינאנס של נרות חסרים (סגורים בלבד)
+      2) טעינת מצב האינדיקטורים של המטבע (Redis; נבנה מחדש מההיסטוריה אם חסר)
+      3) עדכון המצב נר אחר נר - O(1) לנר, ערכים זהים ל-backfill מלא
+      4) שמירה ל-DB ושמירת המצב המעודכן
     """
     coins = (
         Coin.objects.filter(symbol=symbol.upper())
@@ -398,29 +511,22 @@ def fetch_missing_klines(symbol: Optional[str] = None) -> None:
                 logger.error(f"Missing required columns for {coin.symbol}: {missing}")
                 continue
 
-            # (2) 30 רשומות היסטוריות אחרונות מה-DB (כבר עם אינדיקטורים)
-            history_df = get_history_for_indicators(coin)
-            # לא נוגעים ב-tz כאן לפי בקשתך
-
-            # (3) איחוד: 30 עבר + חדשות
-            full_df = pd.concat([history_df, df_new], ignore_index=True, sort=False)
-            full_df = full_df.sort_values("close_time").reset_index(drop=True)
-
-            # (4) חישוב אינדיקטורים (וגם price_change_percent_24h) על כל המסגרת,
-            # כדי שהשורה/ות החדשות יקבלו ערכים נכונים בעזרת ההיסטוריה
-            full_df = calculate_technical_indicators(full_df)
+            # נר פתוח ישתנה עד סגירתו - לא נכנס למצב ולא נשמר
+            df_new = df_new[df_new["close_time"] < timezone.now()]
 
-            # (5) שמירה: רק שורות חדשות (מאז המינימום של open_time החדשות)
-            min_new_open = df_new["open_time"].min()
-            new_df_to_save = full_df[full_df["open_time"] >= min_new_open].copy()
+            # (2)+(3) מצב אינדיקטורים מתמשך
+            state = load_indicator_state(coin)
+            new_df_to_save = apply_indicator_state(state, df_new)
 
             logger.info(f"New data to save for {coin.symbol}: {len(new_df_to_save)}")
             if new_df_to_save.empty:
                 logger.info(f"No new data to save for {coin.symbol}")
                 continue
 
+            # (4) שמירה
             success = process_and_save_data(coin.symbol, new_df_to_save)
             if success:
+                IndicatorStateCache.set_state(coin.symbol, state)
                 logger.info(f"Updated {coin.symbol} with {len(new_df_to_save)} new records")
             else:
                 logger.error(f"Failed to save data for {coin.symbol}")
@@ -429,6 +535,184 @@ def fetch_missing_klines(symbol: Optional[str] = None) -> None:
             logger.error(f"Error processing {coin.symbol}: {e}", exc_info=True)
 
 
+MARKET_DATA_GAPS_SQL = """
+    SELECT symbol_id, prev_close_time, close_time
+    FROM (
+        SELECT symbol_id, close_time,
+               LAG(close_time) OVER (PARTITION BY symbol_id ORDER BY close_time) AS prev_close_time
+        FROM analytics_marketdata
+        WHERE symbol_id = ANY(%s)
+    ) AS slots
+    WHERE close_time - prev_close_time > %s
+    ORDER BY symbol_id, close_time
+"""
+
+
+def find_market_data_gaps(coin_ids, interval: BinanceInterval = BinanceInterval.HOUR_12):
+    """
+    Holes in stored candles, found in one window-function pass inside Postgres:
+    [(symbol_id, prev_close_time, next_close_time), ...] where consecutive
+    close_times are further apart than one interval.
+    """
+    step = timedelta(milliseconds=INTERVAL_MS[interval])
+    with connection.cursor() as cursor:
+        cursor.execute(MARKET_DATA_GAPS_SQL, [list(coin_ids), step + timedelta(minutes=1)])
+        return cursor.fetchall()
+
+
+@shared_task
+def fix_missing_coin_data(symbol: Optional[str] = None, max_gaps: int = 50) -> Dict[str, int]:
+    """
+    Repair holes in the middle of the 12h history (fetch_missing_klines only moves forward):
+      1) איתור חורים ב-SQL (LAG על close_time) בלי לטעון היסטוריה ל-pandas
+      2) משיכה מבינאנס רק של הטווח החסר בכל חור; חור שבינאנס החזיר עליו כלום
+         נרשם (UnfillableGapCache) ולא נמשך שוב ולא תופס מקום ב-max_gaps
+      3) אינדיקטורים מה-IndicatorState של כל ההיסטוריה שלפני החור, ושמירה של הנרות החסרים
+      4) חישוב מחדש של האינדיקטורים מהחור הראשון שתוקן והלאה (גם הנרות שאחריו חושבו מעל החור)
+    """
+    coins = (
+        Coin.objects.filter(symbol=symbol.upper())
+        if symbol else Coin.objects.exclude(symbol__in=["USD", "USDC"])
+    )
+    coins_by_id = {c.id: c for c in coins}
+    if not coins_by_id:
+        return {}
+
+    step = timedelta(milliseconds=INTERVAL_MS[BinanceInterval.HOUR_12])
+    unfillable = {coin_id: UnfillableGapCache.get_gaps(c.symbol) for coin_id, c in coins_by_id.items()}
+    gaps = [
+        gap for gap in find_market_data_gaps(coins_by_id.keys())
+        if (_to_epoch_ms(gap[1]), _to_epoch_ms(gap[2])) not in unfillable[gap[0]]
+    ]
+    if len(gaps) > max_gaps:
+        logger.warning(f"Found {len(gaps)} gaps; repairing the first {max_gaps} this run")
+    repaired: Dict[str, int] = {}
+    recompute_from: Dict[int, datetime] = {}
+
+    for symbol_id, prev_close, next_close in gaps[:max_gaps]:
+        coin = coins_by_id[symbol_id]
+        start_time = prev_close + timedelta(milliseconds=1)
+        end_time = next_close - step  # close of the last missing candle is before the next open
+        try:
+            df_gap = fetch_binance_candles(coin.symbol, BinanceInterval.HOUR_12, start_time, end_time,
+                                           limit=None, raise_errors=True)
+            if df_gap is not None and not df_gap.empty:
+                for time_col in ["open_time", "close_time"]:
+                    df_gap[time_col] = pd.to_datetime(df_gap[time_col], utc=True)
+                df_gap = df_gap[(df_gap["close_time"] > prev_close) & (df_gap["close_time"] < next_close)]
+            if df_gap is None or df_gap.empty:
+                logger.info(f"Gap {prev_close} -> {next_close} for {coin.symbol}: nothing on Binance, skipped from now on")
+                UnfillableGapCache.add_gap(coin.symbol, _to_epoch_ms(prev_close), _to_epoch_ms(next_close))
+                continue
+
+            to_save = apply_indicator_state(load_indicator_state(coin, before=start_time), df_gap)
+            if process_and_save_data(coin.symbol, to_save):
+                repaired[coin.symbol] = repaired.get(coin.symbol, 0) + len(to_save)
+                recompute_from[symbol_id] = min(recompute_from.get(symbol_id, start_time), start_time)
+                logger.info(f"Repaired {len(to_save)} candles for {coin.symbol} between {prev_close} and {next_close}")
+        except Exception as e:
+            logger.error(f"Error repairing gap for {coin.symbol} ({prev_close} -> {next_close}): {e}", exc_info=True)
+
+    for symbol_id, since in recompute_from.items():
+        coin = coins_by_id[symbol_id]
+        try:
+            result = recompute_indicators_since(coin, since)
+            logger.info(f"Recomputed indicators of {result['updated']} {coin.symbol} candles from {since}")
+        except Exception as e:
+            logger.error(f"Error recomputing indicators for {coin.symbol} after gap repair: {e}", exc_info=True)
+
+    logger.info(f"Gap repair finished: {repaired or 'no gaps repaired'}")
+    return repaired
+
+
+# Timeframes derived locally from the base candle stream (no extra Binance calls)
+RESAMPLE_TARGETS = (
+    BinanceInterval.HOUR_4, BinanceInterval.HOUR_12, BinanceInterval.DAY_1, BinanceInterval.WEEK_1,
+)
+
+CANDLE_VALUE_FIELDS = [
+    "close_time", "open_price", "high_price", "low_price", "close_price", "volume",
+    "quote_volume", "num_trades", "taker_buy_base_volume", "taker_buy_quote_volume",
+]
+
+
+def save_candles(coin: Coin, interval: str, buf: np.ndarray) -> int:
+    """Upsert decoded candles into Candle for one interval; returns rows written."""
+    if not len(buf):
+        return 0
+    utc = dt_timezone.utc
+    rows = [
+        Candle(
+            symbol=coin,
+            interval=interval,
+            open_time=datetime.fromtimestamp(int(r['open_time']) / 1000, tz=utc),
+            close_time=datetime.fromtimestamp(int(r['close_time']) / 1000, tz=utc),
+            open_price=float(r['open_price']),
+            high_price=float(r['high_price']),
+            low_price=float(r['low_price']),
+            close_price=float(r['close_price']),
+            volume=float(r['volume']),
+            quote_volume=float(r['quote_volume']),
+            num_trades=int(r['num_trades']),
+            taker_buy_base_volume=float(r['taker_buy_base']),
+            taker_buy_quote_volume=float(r['taker_buy_quote']),
+        )
+        for r in buf
+    ]
+    with transaction.atomic():
+        Candle.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True,
+            unique_fields=["symbol", "interval", "open_time"], update_fields=CANDLE_VALUE_FIELDS,
+        )
+    return len(rows)
+
+
+@shared_task
+def ingest_interval_candles(symbol: Optional[str] = None, base_interval: str = BinanceInterval.HOUR_1.value,
+                            days: int = 7) -> Dict[str, Dict[str, int]]:
+    """
+    Ingest one base candle stream (1h by default) per coin and derive every
+    RESAMPLE_TARGETS timeframe from it locally.
+
+    Starts one week (the longest target) before the newest stored base candle so
+    re-aggregated buckets are complete; the kline archive keeps that overlap off the network.
+    """
+    base = BinanceInterval(base_interval)
+    base_ms = INTERVAL_MS[base]
+    lookback = timedelta(milliseconds=max(INTERVAL_MS[t] for t in RESAMPLE_TARGETS))
+    coins = (
+        Coin.objects.filter(symbol=symbol.upper())
+        if symbol else Coin.objects.exclude(symbol__in=["USD", "USDC"])
+    )
+    now = timezone.now()
+    now_ms = int(now.timestamp() * 1000)
+    summary = {}
+
+    for coin in coins:
+        try:
+            latest = (
+                Candle.objects.filter(symbol=coin, interval=base.value)
+                .order_by("-open_time").values_list("open_time", flat=True).first()
+            )
+            start_time = (latest - lookback) if latest else now - timedelta(days=days)
+            df = fetch_binance_candles(coin.symbol, base, start_time, now, limit=None)
+            if df is None or df.empty:
+                logger.info(f"No {base.value} candles for {coin.symbol}")
+                continue
+
+            buf = frame_to_klines(df)
+            buf = buf[buf["close_time"] < now_ms]  # closed candles only
+            counts = {base.value: save_candles(coin, base.value, buf)}
+            for target in RESAMPLE_TARGETS:
+                resampled = resample_klines(buf, base_ms, INTERVAL_MS[target])
+                counts[target.value] = save_candles(coin, target.value, resampled)
+            summary[coin.symbol] = counts
+            logger.info(f"Candles for {coin.symbol}: {counts}")
+        except Exception as e:
+            logger.error(f"Error ingesting interval candles for {coin.symbol}: {e}", exc_info=True)
+
+    return summary
+
 
 #-----------------------------------------------------------------------------------------------------------------------------
 
@@ -662,15 +946,30 @@ def fetch_news_sentiment_data(ticker_symbol=None):
             continue
 
 
+@shared_task
+def aggregate_daily_sentiment(symbols: Optional[List[str]] = None, since: Optional[str] = None,
+                              until: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rebuild DailySentimentData (12h buckets, same windows as MarketData) from
+    the stored NewsSentimentData in one SQL statement; see sentiment_aggregate.py.
+    since/until are ISO datetimes; omitted = the whole history.
+    """
+    from .sentiment_aggregate import aggregate_sentiment
+
+    start = datetime.fromisoformat(since) if since else None
+    end = datetime.fromisoformat(until) if until else None
+    return aggregate_sentiment(symbols, start, end)
+
+
 @shared_task
 def initialize_all_coins_historical_data():
     """
     Celery task to initialize historical klines data for all coins.
     This is intended to be called on application startup.
+    הטווח החסר עובר ב-pipeline בזרימה (chunk אחר chunk) עם מצב אינדיקטורים מתמשך,
+    כך שהזיכרון חסום ללא תלות באורך הטווח.
     """
     try:
-        from django.db import connection
-
         logger.info("Starting historical klines initialization task")
         
         now = timezone.now()
@@ -682,18 +981,8 @@ def initialize_all_coins_historical_data():
                     symbol=coin
                 ).order_by('-close_time').first()
 
-                start_time = None
                 if latest_record:
-                    last_close = latest_record.close_time
-                    # Ensure last_close is timezone aware
-                    if last_close.tzinfo is None:
-                        last_close = timezone.make_aware(last_close, timezone=timezone.utc)
-                    
-                    if last_close.time() < time(12, 0):
-                        start_time = last_close.replace(hour=12, minute=0, second=0, microsecond=0)
-                    else:
-                        start_time = (last_close + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-                    
+                    start_time = latest_record.close_time + timedelta(milliseconds=1)
                     if start_time > now:
                         logger.info(f"Data for {coin.symbol} is up to date. No new klines to fetch.")
                         continue
@@ -705,39 +994,34 @@ def initialize_all_coins_historical_data():
                         start_time = start_time.replace(hour=12, minute=0, second=0, microsecond=0)
 
                 logger.info(f"Fetching historical klines for {coin.symbol} from {start_time} to {now}")
-                
-                df = fetch_binance_candles(coin.symbol, BinanceInterval.HOUR_12, start_time, now)
-                
-                if df is not None and not df.empty:
-                    # Ensure timestamps are UTC aware
-                    df['open_time'] = pd.to_datetime(df['open_time'], utc=True)
-                    df['close_time'] = pd.to_datetime(df['close_time'], utc=True)
-                    
-                    # Validate that we have the required columns
-                    required_columns = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
-                    missing_columns = [col for col in required_columns if col not in df.columns]
-                    if missing_columns:
-                        logger.error(f"Missing required columns for {coin.symbol}: {missing_columns}")
-                        continue
-                    
-                    full_df = get_history_for_indicators(coin, df, window=60)
-                    
-                    if full_df.empty:
-                        logger.warning(f"No valid data for indicators calculation for {coin.symbol}")
-                        continue
-                    
-                    full_df_with_indicators = calculate_technical_indicators(full_df)
-                    full_df_with_indicators['price_change_percent_24h'] = (full_df_with_indicators['close_price'].pct_change(periods=2) * 100)
-                    new_df_to_save = full_df_with_indicators[full_df_with_indicators['open_time'] >= df['open_time'].min()].copy()
-                    
-                    if not new_df_to_save.empty:
-                        success = process_and_save_data(coin.symbol, new_df_to_save)
-                        if success:
-                            logger.info(f"Successfully processed historical data for {coin.symbol}")
-                        else:
-                            logger.error(f"Failed to save historical data for {coin.symbol}")
-                    else:
-                        logger.info(f"No new data to save for {coin.symbol}")
+
+                # מצב האינדיקטורים מסונכרן לרשומה האחרונה, כך שהנרות החדשים ממשיכים את ההיסטוריה
+                state = load_indicator_state(coin)
+
+                # ה-DB הוא נקודת ההמשך (start_time מהרשומה האחרונה); ה-checkpoint משמש להתקדמות,
+                # והמצב נשמר אחרי כל chunk כדי שהמשך אחרי נפילה לא יבנה אותו מחדש מההיסטוריה
+                checkpoint = BackfillCheckpoint(
+                    "initialize", coin, BinanceInterval.HOUR_12, start_time, now, resume=False
+                )
+
+                def on_chunk(df, result, chunk_state, checkpoint=checkpoint, symbol=coin.symbol):
+                    IndicatorStateCache.set_state(symbol, chunk_state)
+                    checkpoint.on_chunk(df, result, chunk_state)
+
+                try:
+                    totals = run_backfill_pipeline(
+                        coin, BinanceInterval.HOUR_12, start_time, now, state=state,
+                        conflict="ignore", on_chunk=on_chunk,
+                    )
+                except Exception as e:
+                    checkpoint.finish("failed", str(e))
+                    raise
+                checkpoint.finish("done")
+                if totals['rows']:
+                    logger.info(
+                        f"Successfully processed historical data for {coin.symbol}: "
+                        f"{totals['rows']} candles in {totals['chunks']} chunks"
+                    )
                 else:
                     logger.warning(f"No historical data available for {coin.symbol}")
             
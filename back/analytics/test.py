@@ -3,7 +3,6 @@ import sys
 import django
 import pandas as pd
 import numpy as np
-import ta
 import logging
 from django.db import transaction
 from django.utils import timezone
@@ -24,6 +23,8 @@ django.setup()
 
 # 4) Now that Django is set up, you can safely import your models
 from analytics.models import Coin, MarketData
+from analytics.binance_client import binance_client
+from analytics.indicators import compute_indicators
 
 logger = logging.getLogger(__name__)
 
@@ -55,10 +56,8 @@ def fetch_binance_candles(
 ) -> Optional[pd.DataFrame]:
     """
     Fetch candlestick data from Binance API with flexible parameters.
+    Uses the shared `binance_client` (pooled session, weight-aware limiter, retries).
     """
-    import requests
-    
-    base_url = 'https://api.binance.com/api/v3/klines'
     formatted_symbol = f"{symbol.upper()}USDT"
     
     # Validate interval
@@ -84,68 +83,58 @@ def fetch_binance_candles(
         params['endTime'] = int(end_time.timestamp() * 1000)
 
     all_data = []
-    retry_count = 0
-    max_retries = 3
 
-    while retry_count < max_retries:
-        try:
-            while True:
-                response = requests.get(base_url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+    try:
+        while True:
+            data = binance_client.get_klines(params)
 
-                if not data:
-                    break
+            if not data:
+                break
 
-                all_data.extend(data)
-                
-                # Update start time to fetch next batch
-                last_close_time = data[-1][6]  # Close time from last candle
-                params['startTime'] = last_close_time + 1
+            all_data.extend(data)
+            
+            # Update start time to fetch next batch
+            last_close_time = data[-1][6]  # Close time from last candle
+            params['startTime'] = last_close_time + 1
 
-                # Stop if we've reached the end time or limit
-                if end_time and params['startTime'] >= int(end_time.timestamp() * 1000):
-                    break
-                if len(all_data) >= limit:
-                    all_data = all_data[:limit]
-                    break
+            # Stop if we've reached the end time or limit
+            if end_time and params['startTime'] >= int(end_time.timestamp() * 1000):
+                break
+            if len(all_data) >= limit:
+                all_data = all_data[:limit]
+                break
 
-            if not all_data:
-                logger.warning(f"No data returned for {symbol}")
-                return None
+        if not all_data:
+            logger.warning(f"No data returned for {symbol}")
+            return None
 
-            # Create DataFrame with proper column names
-            df = pd.DataFrame(all_data, columns=[
-                'open_time', 'open_price', 'high_price', 'low_price', 'close_price', 
-                'volume', 'close_time', 'quote_volume', 'num_trades',
-                'taker_buy_base', 'taker_buy_quote', 'ignore'
-            ])
+        # Create DataFrame with proper column names
+        df = pd.DataFrame(all_data, columns=[
+            'open_time', 'open_price', 'high_price', 'low_price', 'close_price', 
+            'volume', 'close_time', 'quote_volume', 'num_trades',
+            'taker_buy_base', 'taker_buy_quote', 'ignore'
+        ])
 
-            # Convert timestamps to datetime - simple naive datetime as Binance provides
-            df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-            df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-            
-            # Convert numeric columns to float before any processing
-            numeric_columns = [
-                'open_price', 'high_price', 'low_price', 'close_price', 'volume',
-                'quote_volume', 'num_trades', 'taker_buy_base', 'taker_buy_quote'
-            ]
-            df[numeric_columns] = df[numeric_columns].astype(float)
+        # Convert timestamps to datetime - simple naive datetime as Binance provides
+        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+        
+        # Convert numeric columns to float before any processing
+        numeric_columns = [
+            'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+            'quote_volume', 'num_trades', 'taker_buy_base', 'taker_buy_quote'
+        ]
+        df[numeric_columns] = df[numeric_columns].astype(float)
 
-            # Drop the 'ignore' column as it's not needed
-            df = df.drop('ignore', axis=1)
+        # Drop the 'ignore' column as it's not needed
+        df = df.drop('ignore', axis=1)
 
-            return df
+        return df
 
-        except requests.exceptions.RequestException as e:
-            retry_count += 1
-            logger.warning(f"Retry {retry_count} for {symbol}: {str(e)}")
-            if retry_count == max_retries:
-                logger.error(f"Max retries reached for {symbol}: {str(e)}")
-                return None
-        except Exception as e:
-            logger.error(f"Error fetching candles for {symbol}: {str(e)}")
-            return None
+    except Exception as e:
+        # binance_client כבר ניסה שוב (retries) לפני שזרק
+        logger.error(f"Error fetching candles for {symbol}: {str(e)}")
+        return None
 
 def fetch_historical_data_from_binance(symbol: str, start_time: datetime, end_time: datetime) -> Optional[pd.DataFrame]:
     """
@@ -178,40 +167,14 @@ def calculate_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     try:
         df = df.sort_values('close_time')
         
-        # Calculate RSI
-        rsi = ta.momentum.RSIIndicator(df['close_price'], window=14).rsi()
-        
-        # Calculate MACD
-        macd = ta.trend.MACD(df['close_price'], window_fast=12, window_slow=26, window_sign=9)
-        df['MACD'] = macd.macd()
-        df['MACD_Signal'] = macd.macd_signal()
-        df['MACD_Hist'] = macd.macd_diff()
-        
-        # Calculate Bollinger Bands
-        bb = ta.volatility.BollingerBands(df['close_price'], window=20, window_dev=2)
-        df['BB_Upper'] = bb.bollinger_hband()
-        df['BB_Middle'] = bb.bollinger_mavg()
-        df['BB_Lower'] = bb.bollinger_lband()
-        
-        # Calculate ATR (Average True Range)
-        atr = ta.volatility.AverageTrueRange(
-            high=df['high_price'], 
-            low=df['low_price'], 
-            close=df['close_price'], 
-            window=14
-        ).average_true_range()
-        
-        # Calculate Williams %R
-        williams_r = ta.momentum.WilliamsRIndicator(
-            high=df['high_price'],
-            low=df['low_price'],
-            close=df['close_price'],
-            lbp=14
-        ).williams_r()
-        
-        df['RSI'] = rsi
-        df['ATR'] = atr
-        df['Williams_R'] = williams_r
+        # RSI / MACD / Bollinger / ATR / Williams %R via the vectorized kernel
+        values = compute_indicators(
+            df['high_price'].to_numpy(dtype=float),
+            df['low_price'].to_numpy(dtype=float),
+            df['close_price'].to_numpy(dtype=float),
+        )
+        for col in ('RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_Upper', 'BB_Middle', 'BB_Lower', 'ATR', 'Williams_R'):
+            df[col] = values[col]
         
         return df
 
@@ -0,0 +1,133 @@
+import tempfile
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from .indicators import (
+    INDICATOR_COLUMNS, PARITY_ATOL, PARITY_RTOL, _ta_reference, compute_indicators, compute_indicators_for_frames,
+)
+from .kline_archive import EMPTY_RANGE_TTL_MS, KlineArchive
+from .kline_decoder import (
+    _legacy_decode, concat_klines, decode_klines, frame_to_klines, klines_to_frame, synthetic_payload,
+)
+
+
+class KlineDecoderTests(SimpleTestCase):
+    """The typed decoder must give the frame the old string-DataFrame path gave."""
+
+    def setUp(self):
+        self.rows = synthetic_payload(500)
+
+    def test_frame_matches_legacy_dataframe(self):
+        ours = klines_to_frame(decode_klines(self.rows))
+        legacy = _legacy_decode(self.rows)
+        self.assertEqual(list(ours.columns), list(legacy.columns))
+        for col in legacy.columns:
+            if col in ('open_time', 'close_time'):
+                np.testing.assert_array_equal(ours[col].to_numpy(), legacy[col].to_numpy(dtype='datetime64[ms]'))
+            else:
+                np.testing.assert_array_equal(ours[col].to_numpy(dtype=float), legacy[col].to_numpy(dtype=float))
+
+    def test_frame_round_trip(self):
+        buf = decode_klines(self.rows)
+        np.testing.assert_array_equal(frame_to_klines(klines_to_frame(buf)), buf)
+
+        aware = klines_to_frame(buf)
+        aware['open_time'] = aware['open_time'].dt.tz_localize('UTC').dt.tz_convert('Asia/Jerusalem')
+        np.testing.assert_array_equal(frame_to_klines(aware)['open_time'], buf['open_time'])
+
+    def test_concat_sorts_and_drops_duplicate_candles(self):
+        buf = decode_klines(self.rows)
+        merged = concat_klines([buf[300:], buf[:350], np.empty(0, dtype=buf.dtype)])
+        np.testing.assert_array_equal(merged, buf)
+        self.assertEqual(len(concat_klines([])), 0)
+
+
+class KlineArchiveEmptyRangeTests(SimpleTestCase):
+    """Ranges recorded as empty are skipped only until their record expires."""
+
+    H = 12 * 3600 * 1000
+
+    def setUp(self):
+        self.archive = KlineArchive(tempfile.mkdtemp())
+        self.now = 1_700_000_000_000
+
+    def test_recorded_range_is_not_missing_until_it_expires(self):
+        self.archive.mark_empty('TSTX', '12h', [(0, 10 * self.H - 1)], now_ms=self.now)
+        self.assertEqual(self.archive.load_empty('TSTX', '12h', now_ms=self.now).tolist(), [[0, 10 * self.H - 1]])
+        self.assertEqual(self.archive.missing_ranges('TSTX', '12h', 0, 20 * self.H - 1, self.H, now_ms=self.now),
+                         [(10 * self.H, 20 * self.H - 1)])
+
+        expired = self.now + EMPTY_RANGE_TTL_MS
+        self.assertEqual(len(self.archive.load_empty('TSTX', '12h', now_ms=expired)), 0)
+
+    def test_merged_ranges_expire_with_their_oldest_part(self):
+        self.archive.mark_empty('TSTX', '12h', [(0, 5 * self.H - 1)], now_ms=self.now)
+        self.archive.mark_empty('TSTX', '12h', [(5 * self.H, 10 * self.H - 1)], now_ms=self.now + 1000)
+        self.assertEqual(self.archive.load_empty('TSTX', '12h', now_ms=self.now + 1000).tolist(),
+                         [[0, 10 * self.H - 1]])
+        self.assertEqual(len(self.archive.load_empty('TSTX', '12h', now_ms=self.now + EMPTY_RANGE_TTL_MS)), 0)
+
+    def test_records_without_a_time_are_ignored(self):
+        path = self.archive.empty_path('TSTX', '12h')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, np.asarray([[0, self.H - 1]], dtype=np.int64))
+        self.assertEqual(len(self.archive.load_empty('TSTX', '12h', now_ms=self.now)), 0)
+
+
+def _price_frame(rng, n: int) -> pd.DataFrame:
+    close = 100.0 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'high_price': close + rng.uniform(0, 1, n), 'low_price': close - rng.uniform(0, 1, n), 'close_price': close,
+    })
+
+
+class IndicatorKernelTests(SimpleTestCase):
+    """The NumPy kernel against `ta`, and the multi-symbol call against symbols computed alone."""
+
+    def assertIndicatorsClose(self, actual, expected, label=''):
+        for col in INDICATOR_COLUMNS:
+            np.testing.assert_allclose(np.asarray(actual[col], dtype=float), np.asarray(expected[col], dtype=float),
+                                       rtol=PARITY_RTOL, atol=PARITY_ATOL, err_msg=f"{label} {col}")
+
+    def test_matches_ta(self):
+        df = _price_frame(np.random.default_rng(0), 1000)
+        ours = compute_indicators(df['high_price'].values, df['low_price'].values, df['close_price'].values)
+        self.assertIndicatorsClose(ours, _ta_reference(df))
+
+    def test_short_series_match_ta(self):
+        # shorter than the MACD/Bollinger warm-up: what the reference leaves NaN stays NaN
+        for n in (14, 20, 27):
+            df = _price_frame(np.random.default_rng(n), n)
+            ours = compute_indicators(df['high_price'].values, df['low_price'].values, df['close_price'].values)
+            self.assertIndicatorsClose(ours, _ta_reference(df), label=f"n={n}")
+
+    def test_2d_call_matches_per_symbol_calls(self):
+        rng = np.random.default_rng(1)
+        frames = [_price_frame(rng, 600) for _ in range(5)]
+        stacked = {c: np.column_stack([f[c].values for f in frames]) for c in ('high_price', 'low_price', 'close_price')}
+        together = compute_indicators(stacked['high_price'], stacked['low_price'], stacked['close_price'])
+        for j, df in enumerate(frames):
+            alone = compute_indicators(df['high_price'].values, df['low_price'].values, df['close_price'].values)
+            self.assertIndicatorsClose({c: together[c][:, j] for c in INDICATOR_COLUMNS}, alone, label=f"symbol {j}")
+
+    def test_frames_with_different_lengths_and_holes_match_single(self):
+        rng = np.random.default_rng(3)
+        base = pd.Timestamp('2024-01-01', tz='UTC')
+        n_rows, frames = 500, {}
+        for j in range(4):
+            n = n_rows - 37 * j
+            close = 100.0 + np.cumsum(rng.normal(0, 1, n))
+            times = base + pd.to_timedelta(np.arange(n_rows)[-n:] * 12, unit='h')
+            keep = rng.random(n) > 0.05 * j  # symbol j misses ~5*j% of its candles
+            frames[f'S{j}'] = pd.DataFrame({
+                'close_time': times[keep], 'high_price': close[keep] + 1.0,
+                'low_price': close[keep] - 1.0, 'close_price': close[keep],
+            })
+        result = compute_indicators_for_frames(frames)
+        self.assertEqual(set(result), set(frames))
+        for symbol, df in result.items():
+            self.assertEqual(len(df), len(frames[symbol]))
+            alone = compute_indicators(df['high_price'].values, df['low_price'].values, df['close_price'].values)
+            self.assertIndicatorsClose({c: df[c] for c in INDICATOR_COLUMNS}, alone, label=symbol)
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import market_overview, coin_details, compare_coins
+from .views import market_overview, coin_details, compare_coins, backfill_status
 
 urlpatterns = [
     path('market_overview/', market_overview, name='market-overview'),
     path('coin_details/<str:pk>/', coin_details, name='coin-details'),
     path('compare_coins/', compare_coins, name='compare-coins'),
+    path('backfill_status/', backfill_status, name='backfill-status'),
 ] 
\ No newline at end of file
@@ -6,6 +6,7 @@ from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from .models import Coin, MarketData
 from redis_cache.cache_utils.market import MarketDataCache as MarketCache
+from redis_cache.cache_utils.backfill import BackfillCheckpointCache
 import json
 import logging
 from rest_framework.response import Response
@@ -250,3 +251,29 @@ def compare_coins(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def backfill_status(request):
+    """
+    Progress of all backfill runs (Redis checkpoints), optionally filtered by ?job= / ?symbol=.
+    Each entry: job, symbol, interval, status (running/failed/done), chunk_index, rows,
+    last_close_time (epoch ms), range_start/range_end, started_at/updated_at, error.
+    """
+    try:
+        checkpoints = BackfillCheckpointCache.list_checkpoints()
+        job = request.query_params.get('job')
+        symbol = request.query_params.get('symbol')
+        if job:
+            checkpoints = [cp for cp in checkpoints if cp.get('job') == job]
+        if symbol:
+            checkpoints = [cp for cp in checkpoints if cp.get('symbol', '').upper() == symbol.upper()]
+        return Response({"data": checkpoints})
+
+    except Exception as e:
+        logger.error(f"Error in backfill_status view: {str(e)}")
+        return Response(
+            {"error": f"Failed to fetch backfill status: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
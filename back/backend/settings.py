@@ -185,6 +185,31 @@ REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
 REDIS_DB = int(os.environ.get('REDIS_DB', 0))
 
+# Binance REST (shared client in analytics.binance_client) and ticker WebSocket.
+# BINANCE_STANDIN_URL (e.g. http://localhost:9100) points both at the local
+# stand-in server (python -m analytics.binance_standin) for offline benchmarks.
+BINANCE_STANDIN_URL = os.environ.get('BINANCE_STANDIN_URL', '').rstrip('/')
+BINANCE_REST_BASE_URL = os.environ.get('BINANCE_REST_BASE_URL', BINANCE_STANDIN_URL or 'https://api.binance.com')
+BINANCE_WS_URL = os.environ.get(
+    'BINANCE_WS_URL',
+    f"{BINANCE_STANDIN_URL.replace('http', 'ws', 1)}/stream" if BINANCE_STANDIN_URL else 'wss://fstream.binance.com/stream',
+)
+BINANCE_REQUEST_WEIGHT_LIMIT = int(os.environ.get('BINANCE_REQUEST_WEIGHT_LIMIT', 6000))  # per minute
+
+# Local archive of closed klines (read-through cache for fetch_binance_candles).
+# Stand-in candles are synthetic, so they get their own directory and never mix
+# with (or get served in place of) real Binance history.
+KLINE_ARCHIVE_ENABLED = os.environ.get('KLINE_ARCHIVE_ENABLED', 'True') == 'True'
+KLINE_ARCHIVE_DIR = os.environ.get(
+    'KLINE_ARCHIVE_DIR',
+    str(BASE_DIR / ('kline_archive_standin' if BINANCE_STANDIN_URL else 'kline_archive')),
+)
+
+# Load + warm up the prediction model when a server process starts (analysis/model_server.py)
+ML_MODEL_PRELOAD = os.environ.get('ML_MODEL_PRELOAD', 'True') == 'True'
+# Score small batches with the array-compiled trees (analysis/tree_engine.py) instead of xgboost
+ML_COMPILED_TREES = os.environ.get('ML_COMPILED_TREES', 'True') == 'True'
+
 # Logging config
 LOGGING = {
     'version': 1,
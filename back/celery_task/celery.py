@@ -46,6 +46,10 @@ app.conf.beat_schedule = {
         'task': 'analytics.tasks.fetch_missing_klines',
         'schedule': crontab(minute='*/30'),  # Run every 30 minutes to fetch new candles
     },
+    'ingest_interval_candles': {
+        'task': 'analytics.tasks.ingest_interval_candles',
+        'schedule': crontab(minute=5),  # Hourly, after the 1h candle closes
+    },
     'fix_missing_coin_data': {
         'task': 'analytics.tasks.fix_missing_coin_data',
         'schedule': crontab(hour='0,12', minute=0),  # Run at midnight and noon
@@ -4,6 +4,8 @@ import sys
 import django
 import logging
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
 from django.utils import timezone
 from django.core.management import call_command
@@ -17,27 +19,31 @@ django.setup()
 
 from analytics.models import Coin, MarketData
 from django.contrib.auth import get_user_model
+from django.db import connection
 
 # Analytics tasks/helpers (נשתמש בפונקציות הקיימות כדי לא לכפול קוד)
 from analytics.tasks import (
-    fetch_binance_candles,
     BinanceInterval,
-    calculate_technical_indicators,
-    process_and_save_data,
+    recompute_market_indicators,
     update_all_coin_details,
     fetch_news_sentiment_data,
 )
+from analytics.sentiment_aggregate import aggregate_sentiment
+
+from analytics.pipeline import run_backfill_pipeline, stored_history_state, BackfillCheckpoint, DEFAULT_CHUNK_CANDLES
+from redis_cache.cache_utils.indicators import IndicatorStateCache
+from redis_cache.cache_utils.backfill import BackfillCheckpointCache
 
 # Analysis tasks (חישוב פיצ'רים טכניים וסנטימנט)
-from analysis.tasks import (
-    update_all_technical_features_for_symbol,
-    update_all_sentiment_features_for_symbol,
-)
+from analysis.materialize import materialize_features
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 DEFAULT_COINS = ['BTC', 'ETH', 'SOL', 'XRP', 'LTC']
+DEFAULT_BACKFILL_JOBS = 4
+DEFAULT_FETCH_WORKERS = 4
+BACKFILL_JOB = "deep_backfill"
 
 
 def apply_migrations():
@@ -151,45 +157,131 @@ def ensure_superuser(username: str | None = None, email: str | None = None, pass
         logger.info("Superuser already exists; skipping.")
 
 
-def deep_backfill_market_data(coins, days=456):
+def _backfill_symbol(symbol, start_time, end_time, fetch_workers=DEFAULT_FETCH_WORKERS,
+                     chunk_candles=DEFAULT_CHUNK_CANDLES, resume=True):
+    """
+    Backfill של מטבע יחיד דרך ה-pipeline בזרימה: הורדה, אינדיקטורים ושמירה chunk אחר chunk
+    (זיכרון חסום, הורדה ושמירה חופפות). כל chunk שנשמר נרשם כ-checkpoint ב-Redis,
+    כך שהרצה שנפלה ממשיכה מה-chunk האחרון (resume=False מתחיל מחדש).
+    רץ בתוך worker של ה-pool, ולכן סוגר את חיבור ה-DB של ה-thread בסיום.
+    """
+    started = time.monotonic()
+    result = {"symbol": symbol, "status": "error", "rows": 0, "seconds": 0.0}
+    checkpoint = None
+    try:
+        coin = Coin.objects.get(symbol=symbol.upper())
+        checkpoint = BackfillCheckpoint(
+            BACKFILL_JOB, coin, BinanceInterval.HOUR_12, start_time, end_time, resume=resume
+        )
+        # ממשיכים את הנרות השמורים לפני start_time ולא מצב ריק: backfill קצר יותר לא דורס
+        # אינדיקטורים בערכי warm-up, והמצב שנשמר בסוף הוא של כל ההיסטוריה
+        state = checkpoint.state or stored_history_state(coin, BinanceInterval.HOUR_12, checkpoint.start_time)
+        logger.info(
+            f"[{symbol}] streaming candles from {checkpoint.start_time} "
+            f"(continuing {state.count} earlier candles) ..."
+        )
+        # upsert, כך שהרצה חוזרת מתקנת גם שורות קיימות
+        totals = run_backfill_pipeline(
+            coin, BinanceInterval.HOUR_12, checkpoint.start_time, end_time, state=state,
+            conflict="update", chunk_candles=chunk_candles, fetch_workers=fetch_workers,
+            on_chunk=checkpoint.on_chunk,
+        )
+        checkpoint.finish("done")
+        rows = checkpoint.data["rows"]
+        if not rows:
+            logger.warning(f"[{symbol}] no data returned; skipping.")
+            result["status"] = "empty"
+            return result
+
+        # הטווח מסתיים עכשיו והמצב ממשיך את כל ההיסטוריה, כך שהוא מסונכרן לנר האחרון שנשמר
+        if totals["rows"]:
+            IndicatorStateCache.set_state(symbol, totals["state"])
+        result.update(status="ok", rows=rows)
+    except Coin.DoesNotExist:
+        logger.error(f"[{symbol}] coin not found in database; seed coins first.")
+    except Exception as e:
+        logger.error(f"[{symbol}] deep backfill error: {e}", exc_info=True)
+        if checkpoint:
+            checkpoint.finish("failed", str(e))
+    finally:
+        connection.close()
+        result["seconds"] = time.monotonic() - started
+    return result
+
+
+def deep_backfill_market_data(coins, days=456, jobs=DEFAULT_BACKFILL_JOBS, fetch_workers=DEFAULT_FETCH_WORKERS,
+                              chunk_candles=DEFAULT_CHUNK_CANDLES, resume=True):
     """
     Backfill היסטוריה ברמת 12h ל ~1.25 שנים (ברירת מחדל), כולל חישוב אינדיקטורים ושמירה ל-DB.
     דומה ל-back/analytics/test.py אבל משתמש ב-helpers מתוך analytics.tasks.
+    המטבעות מעובדים במקביל ב-pool חסום של `jobs` workers (הורדה, אינדיקטורים ושמירה לכל מטבע),
+    וטווח כל מטבע עובר בזרימה ב-chunks של `chunk_candles` נרות, שכל אחד מהם מפוצל לחלונות
+    שמורדים במקביל (`fetch_workers`).
     """
     end_time = timezone.now()
     start_time = end_time - timedelta(days=days)
-    logger.info(f"Deep backfill {days}d (12h candles) from {start_time} to {end_time}")
+    jobs = max(1, min(jobs, len(coins) or 1))
+    logger.info(f"Deep backfill {days}d (12h candles) from {start_time} to {end_time} "
+                f"for {len(coins)} coins with {jobs} workers")
+
+    started = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="backfill") as pool:
+        futures = [pool.submit(_backfill_symbol, symbol, start_time, end_time, fetch_workers, chunk_candles, resume) for symbol in coins]
+        for done, future in enumerate(as_completed(futures), start=1):
+            res = future.result()
+            results.append(res)
+            logger.info(
+                f"[{res['symbol']}] {res['status']}: {res['rows']} rows in {res['seconds']:.1f}s "
+                f"({done}/{len(coins)} done, {time.monotonic() - started:.1f}s elapsed)"
+            )
+
+    ok = [r['symbol'] for r in results if r['status'] == 'ok']
+    failed = [r['symbol'] for r in results if r['status'] != 'ok']
+    logger.info(
+        f"Deep backfill finished in {time.monotonic() - started:.1f}s: "
+        f"{sum(r['rows'] for r in results)} rows, ok={ok}, failed/empty={failed}"
+    )
+    return results
+
+
+def recompute_indicators_for_all(coins):
+    """
+    חישוב מחדש של האינדיקטורים על כל ההיסטוריה השמורה ועדכון במקום (בלי הורדה מבינאנס).
+    """
+    logger.info("Recomputing stored indicators for all coins...")
+    try:
+        # קריאה אחת: ה-kernel מחשב את כל המטבעות יחד
+        for symbol, res in recompute_market_indicators(coins).items():
+            logger.info(f"[{symbol}] indicators recomputed: {res}")
+    except Exception as e:
+        logger.error(f"Indicator recompute error: {e}", exc_info=True)
 
-    for symbol in coins:
-        try:
-            logger.info(f"[{symbol}] downloading candles ...")
-            df = fetch_binance_candles(symbol, BinanceInterval.HOUR_12, start_time, end_time)
-            if df is None or df.empty:
-                logger.warning(f"[{symbol}] no data returned; skipping.")
-                continue
-
-            # חישובי אינדיקטורים
-            df = calculate_technical_indicators(df)
-
-            # 24h change על בסיס נרות 12h (2 תקופות אחורה)
-            import pandas as pd
-            df['price_change_percent_24h'] = (df['close_price'].pct_change(periods=2) * 100)
-
-            # שמירה ל-DB (כולל אינדיקטורים)
-            ok = process_and_save_data(symbol, df)
-            if ok:
-                logger.info(f"[{symbol}] saved {len(df)} rows (includes indicators).")
-        except Exception as e:
-            logger.error(f"[{symbol}] deep backfill error: {e}", exc_info=True)
+
+def show_backfill_status():
+    """
+    מציג את ה-checkpoints של כל ה-backfills (רצים, שנפלו וגמורים) מתוך Redis.
+    """
+    checkpoints = BackfillCheckpointCache.list_checkpoints()
+    if not checkpoints:
+        logger.info("No backfill checkpoints stored.")
+    for cp in checkpoints:
+        logger.info(
+            f"[{cp['symbol']}] {cp['job']} {cp['interval']}: {cp['status']} - chunk {cp['chunk_index']}, "
+            f"{cp['rows']} rows, last close {cp['last_close_time']}, updated {cp.get('updated_at')}"
+            + (f", error: {cp['error']}" if cp.get('error') else "")
+        )
+    return checkpoints
 
 
 def compute_technical_features_for_all(coins):
+    """TechnicalFeatures for the full history of each coin (one vectorized pass + bulk upsert per coin)."""
     logger.info("Computing technical features for all coins...")
     total = 0
     for symbol in coins:
         try:
-            res = update_all_technical_features_for_symbol(symbol)
-            logger.info(f"[{symbol}] technical features: {res}")
+            res = materialize_features(symbol, sentiment=False)
+            logger.info(f"[{symbol}] technical features: {res['technical']} rows in {res['seconds']}s")
             total += 1
         except Exception as e:
             logger.error(f"[{symbol}] technical features error: {e}", exc_info=True)
@@ -204,14 +296,24 @@ def compute_sentiment_features_for_all(coins):
     total = 0
     for symbol in coins:
         try:
-            res = update_all_sentiment_features_for_symbol(symbol)
-            logger.info(f"[{symbol}] sentiment features: {res}")
+            res = materialize_features(symbol, technical=False)
+            logger.info(f"[{symbol}] sentiment features: {res['sentiment']} rows in {res['seconds']}s")
             total += 1
         except Exception as e:
             logger.error(f"[{symbol}] sentiment features error: {e}", exc_info=True)
     logger.info(f"Finished sentiment features for {total} coins.")
 
 
+def aggregate_sentiment_for_all(coins):
+    """DailySentimentData מחדש מכל NewsSentimentData השמורים (שאילתת SQL אחת)."""
+    logger.info("Aggregating news sentiment into 12h buckets...")
+    try:
+        res = aggregate_sentiment(coins)
+        logger.info(f"Sentiment buckets: {res['inserted']} inserted, {res['updated']} updated.")
+    except Exception as e:
+        logger.error(f"Sentiment aggregation error: {e}", exc_info=True)
+
+
 def warm_all_caches(coins):
     logger.info("Warming chart/volume caches for all coins...")
     try:
@@ -244,7 +346,14 @@ def main():
     parser.add_argument("--use-given-ids", action="store_true")
     parser.add_argument("--superuser", action="store_true", help="Create default admin/admin")
     parser.add_argument("--deep-backfill-days", type=int, default=0, help="If >0, run deep backfill for N days (12h candles)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_BACKFILL_JOBS, help="Parallel workers for deep backfill (symbols processed concurrently)")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS, help="Concurrent time-shard requests per symbol during deep backfill")
+    parser.add_argument("--restart-backfill", action="store_true", help="Ignore stored backfill checkpoints and start from scratch")
+    parser.add_argument("--backfill-status", action="store_true", help="Show progress of running/stopped backfills (Redis checkpoints)")
+    parser.add_argument("--chunk-candles", type=int, default=DEFAULT_CHUNK_CANDLES, help="Candles per streamed backfill chunk (bounds memory)")
+    parser.add_argument("--recompute-indicators", action="store_true", help="Recompute indicators over the stored history and update them in place")
     parser.add_argument("--compute-tech", action="store_true")
+    parser.add_argument("--aggregate-sentiment", action="store_true", help="Rebuild DailySentimentData from stored news (12h buckets)")
     parser.add_argument("--compute-sent", action="store_true")
     parser.add_argument("--warm-caches", action="store_true")
     parser.add_argument("--fetch-sentiment-n8n", action="store_true", help="Trigger n8n sentiment webhook (requires n8n up)")
@@ -258,7 +367,8 @@ def main():
         seed_coins()
         ensure_superuser()
         days = args.deep_backfill_days if args.deep_backfill_days > 0 else 456
-        deep_backfill_market_data(coins, days=days)
+        deep_backfill_market_data(coins, days=days, jobs=args.jobs, fetch_workers=args.fetch_workers,
+                                  chunk_candles=args.chunk_candles, resume=not args.restart_backfill)
         compute_technical_features_for_all(coins)
         warm_all_caches(coins)
         # שלב סנטימנט אופציונלי, כי תלוי ב-n8n/DB:
@@ -266,6 +376,9 @@ def main():
         # compute_sentiment_features_for_all(coins)
         return
 
+    if args.backfill_status:
+        show_backfill_status()
+
     if args.migrate:
         apply_migrations()
     if args.seed_coins:
@@ -276,7 +389,11 @@ def main():
         ensure_superuser()
 
     if args.deep_backfill_days and args.deep_backfill_days > 0:
-        deep_backfill_market_data(coins, days=args.deep_backfill_days)
+        deep_backfill_market_data(coins, days=args.deep_backfill_days, jobs=args.jobs, fetch_workers=args.fetch_workers,
+                                  chunk_candles=args.chunk_candles, resume=not args.restart_backfill)
+
+    if args.recompute_indicators:
+        recompute_indicators_for_all(coins)
 
     if args.compute_tech:
         compute_technical_features_for_all(coins)
@@ -284,6 +401,9 @@ def main():
     if args.fetch_sentiment_n8n:
         trigger_n8n_sentiment(coins)
 
+    if args.aggregate_sentiment:
+        aggregate_sentiment_for_all(coins)
+
     if args.compute_sent:
         compute_sentiment_features_for_all(coins)
 
@@ -0,0 +1,58 @@
+import logging
+from typing import Dict, List, Optional
+from redis_cache.client import redis_client
+from redis_cache.constants import CacheKeys, CacheTimeout
+
+logger = logging.getLogger(__name__)
+
+class BackfillCheckpointCache:
+    """Per job/symbol backfill checkpoints (progress + indicator warm-up state) for resumable runs"""
+
+    @classmethod
+    def _key(cls, job: str, symbol: str) -> str:
+        return CacheKeys.format_key(CacheKeys.BACKFILL_CHECKPOINT, job, symbol.lower())
+
+    @classmethod
+    def set_checkpoint(cls, job: str, symbol: str, data: Dict) -> bool:
+        """Store the checkpoint of a backfill job for a given symbol."""
+        try:
+            return redis_client.set_json(cls._key(job, symbol), data, timeout=CacheTimeout.MONTH)
+        except Exception as e:
+            logger.error(f"Cache set error for backfill checkpoint ({job}, {symbol}): {e}")
+            return False
+
+    @classmethod
+    def get_checkpoint(cls, job: str, symbol: str) -> Optional[Dict]:
+        """Get the checkpoint of a backfill job for a given symbol."""
+        try:
+            return redis_client.get_json(cls._key(job, symbol))
+        except Exception as e:
+            logger.error(f"Cache get error for backfill checkpoint ({job}, {symbol}): {e}")
+            return None
+
+    @classmethod
+    def delete_checkpoint(cls, job: str, symbol: str) -> bool:
+        """Forget a checkpoint so the next run starts from scratch."""
+        try:
+            return bool(redis_client.redis_client.delete(cls._key(job, symbol)))
+        except Exception as e:
+            logger.error(f"Cache delete error for backfill checkpoint ({job}, {symbol}): {e}")
+            return False
+
+    @classmethod
+    def list_checkpoints(cls, include_state: bool = False) -> List[Dict]:
+        """All stored checkpoints (every job and symbol), without the state blob unless asked."""
+        try:
+            pattern = CacheKeys.format_key(CacheKeys.BACKFILL_CHECKPOINT, '*', '*')
+            checkpoints = []
+            for key in sorted(redis_client.redis_client.scan_iter(match=pattern, count=100)):
+                data = redis_client.get_json(key)
+                if not data:
+                    continue
+                if not include_state:
+                    data = {k: v for k, v in data.items() if k != 'state'}
+                checkpoints.append(data)
+            return checkpoints
+        except Exception as e:
+            logger.error(f"Cache list error for backfill checkpoints: {e}")
+            return []
@@ -0,0 +1,77 @@
+import json
+import logging
+from typing import Dict, List, Optional
+from django.utils import timezone
+from redis_cache.client import redis_client
+from redis_cache.constants import CacheKeys
+
+logger = logging.getLogger(__name__)
+
+class FeatureWatermarkCache:
+    """Per-coin freshness watermark of materialized features: latest candle each feature store covers (no expiry)"""
+
+    STORES = ('technical', 'sentiment')
+
+    # compare-and-set in one round trip: concurrent materializations of one store
+    # can't move its watermark backwards (KEYS[1] store key, ARGV[1] close_time_ms, ARGV[2] JSON mark)
+    _ADVANCE_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if current and tonumber(cjson.decode(current)['close_time_ms']) > tonumber(ARGV[1]) then
+        return 0
+    end
+    redis.call('SET', KEYS[1], ARGV[2])
+    return 1
+    """
+
+    @classmethod
+    def _key(cls, symbol: str, store: str) -> str:
+        return CacheKeys.format_key(CacheKeys.FEATURE_WATERMARK, symbol.lower(), store)
+
+    @classmethod
+    def advance(cls, symbol: str, store: str, close_time, market_data_id: int) -> bool:
+        """Move `store` ('technical' / 'sentiment') of a symbol forward to the given candle; never backwards."""
+        try:
+            close_time_ms = int(close_time.timestamp() * 1000)
+            mark = {
+                'close_time': close_time.isoformat(),
+                'close_time_ms': close_time_ms,
+                'market_data_id': int(market_data_id),
+                'updated_at': timezone.now().isoformat(),
+            }
+            redis_client.redis_client.eval(
+                cls._ADVANCE_SCRIPT, 1, cls._key(symbol, store), close_time_ms, json.dumps(mark)
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Cache set error for feature watermark ({symbol}, {store}): {e}")
+            return False
+
+    @classmethod
+    def get_watermark(cls, symbol: str) -> Optional[Dict]:
+        """Watermark of a symbol: {'symbol', 'technical': {...}, 'sentiment': {...}} or None."""
+        try:
+            values = redis_client.redis_client.mget([cls._key(symbol, store) for store in cls.STORES])
+            marks = {store: json.loads(value) for store, value in zip(cls.STORES, values) if value}
+            return {'symbol': symbol.upper(), **marks} if marks else None
+        except Exception as e:
+            logger.error(f"Cache get error for feature watermark ({symbol}): {e}")
+            return None
+
+    @classmethod
+    def delete_watermark(cls, symbol: str) -> bool:
+        try:
+            return bool(redis_client.redis_client.delete(*(cls._key(symbol, store) for store in cls.STORES)))
+        except Exception as e:
+            logger.error(f"Cache delete error for feature watermark ({symbol}): {e}")
+            return False
+
+    @classmethod
+    def list_watermarks(cls) -> List[Dict]:
+        """Watermarks of every symbol."""
+        try:
+            pattern = CacheKeys.format_key(CacheKeys.FEATURE_WATERMARK, '*', '*')
+            symbols = sorted({key.split(':')[-2] for key in redis_client.redis_client.scan_iter(match=pattern, count=100)})
+            return [data for data in (cls.get_watermark(symbol) for symbol in symbols) if data]
+        except Exception as e:
+            logger.error(f"Cache list error for feature watermarks: {e}")
+            return []
@@ -0,0 +1,41 @@
+import logging
+from typing import Optional
+from redis_cache.client import redis_client
+from redis_cache.constants import CacheKeys
+
+logger = logging.getLogger(__name__)
+
+class IndicatorStateCache:
+    """Persistent per-coin incremental indicator state (no expiry)"""
+
+    @classmethod
+    def set_state(cls, symbol: str, state) -> bool:
+        """Store an IndicatorState snapshot for a given symbol."""
+        try:
+            key = CacheKeys.format_key(CacheKeys.INDICATOR_STATE, symbol.lower())
+            return redis_client.set_json(key, state.to_dict())
+        except Exception as e:
+            logger.error(f"Cache set error for indicator state (symbol: {symbol}): {e}")
+            return False
+
+    @classmethod
+    def get_state(cls, symbol: str):
+        """Get the IndicatorState for a given symbol, or None if missing/corrupt."""
+        from analytics.indicator_state import IndicatorState
+        try:
+            key = CacheKeys.format_key(CacheKeys.INDICATOR_STATE, symbol.lower())
+            data = redis_client.get_json(key)
+            return IndicatorState.from_dict(data) if data else None
+        except Exception as e:
+            logger.error(f"Cache get error for indicator state (symbol: {symbol}): {e}")
+            return None
+
+    @classmethod
+    def delete_state(cls, symbol: str) -> bool:
+        """Drop the state so it is rebuilt from MarketData on next use."""
+        try:
+            key = CacheKeys.format_key(CacheKeys.INDICATOR_STATE, symbol.lower())
+            return bool(redis_client.redis_client.delete(key))
+        except Exception as e:
+            logger.error(f"Cache delete error for indicator state (symbol: {symbol}): {e}")
+            return False
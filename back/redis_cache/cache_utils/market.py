@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import Dict, Optional
+from typing import Dict, Optional, Set, Tuple
 from redis_cache.client import redis_client
 from redis_cache.constants import CacheKeys, CacheTimeout
 
@@ -99,4 +99,36 @@ class MarketDataCache:
         except Exception as e:
             logger.error(f"Cache delete error for volume data {symbol}: {e}")
 
- 
\ No newline at end of file
+ 
+
+
+class UnfillableGapCache:
+    """
+    Per-coin MarketData holes Binance had no candles for (delistings, exchange
+    outages), as (prev_close_ms, next_close_ms) pairs. Kept for a month, so
+    they are retried eventually but don't block other repairs in the meantime.
+    """
+
+    @classmethod
+    def _key(cls, symbol: str) -> str:
+        return CacheKeys.format_key(CacheKeys.UNFILLABLE_GAPS, symbol.lower())
+
+    @classmethod
+    def add_gap(cls, symbol: str, prev_close_ms: int, next_close_ms: int) -> bool:
+        try:
+            key = cls._key(symbol)
+            client = redis_client.redis_client
+            client.sadd(key, f"{int(prev_close_ms)}:{int(next_close_ms)}")
+            return bool(client.expire(key, CacheTimeout.MONTH))
+        except Exception as e:
+            logger.error(f"Cache set error for unfillable gaps ({symbol}): {e}")
+            return False
+
+    @classmethod
+    def get_gaps(cls, symbol: str) -> Set[Tuple[int, int]]:
+        try:
+            members = redis_client.redis_client.smembers(cls._key(symbol))
+            return {tuple(int(x) for x in m.split(':')) for m in members}
+        except Exception as e:
+            logger.error(f"Cache get error for unfillable gaps ({symbol}): {e}")
+            return set()
@@ -0,0 +1,72 @@
+import logging
+from typing import Dict, Optional
+from django.utils import timezone
+from redis_cache.client import redis_client
+from redis_cache.constants import CacheKeys
+
+logger = logging.getLogger(__name__)
+
+# A candle's prediction is only asked for until the next 12h candle closes
+PREDICTION_TIMEOUT = 12 * 3600
+
+
+class PredictionCache:
+    """
+    Model output per (symbol, candle, sentiment input, model artifact hash).
+    The key changes with a new candle, a new or rewritten DailySentimentData
+    row feeding it (`sentiment_version`, also for writes that bypass the ORM
+    such as the n8n flow) or a new model, so an entry can never be served for
+    any of them; the invalidations below only drop entries that can no longer be hit.
+    """
+
+    @classmethod
+    def _key(cls, symbol: str, market_data_id, sentiment_version: str, model_hash: str) -> str:
+        return CacheKeys.format_key(CacheKeys.PREDICTION, symbol.lower(), int(market_data_id), sentiment_version,
+                                    model_hash)
+
+    @classmethod
+    def get_prediction(cls, symbol: str, market_data_id: int, sentiment_version: str,
+                       model_hash: str) -> Optional[Dict]:
+        try:
+            return redis_client.get_json(cls._key(symbol, market_data_id, sentiment_version, model_hash))
+        except Exception as e:
+            logger.error(f"Cache get error for prediction ({symbol}, {market_data_id}): {e}")
+            return None
+
+    @classmethod
+    def set_prediction(cls, symbol: str, market_data_id: int, sentiment_version: str, model_hash: str,
+                       data: Dict) -> bool:
+        try:
+            data = dict(data, model_hash=model_hash, cached_at=timezone.now().isoformat())
+            return redis_client.set_json(cls._key(symbol, market_data_id, sentiment_version, model_hash), data,
+                                         timeout=PREDICTION_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Cache set error for prediction ({symbol}, {market_data_id}): {e}")
+            return False
+
+    @classmethod
+    def invalidate_symbol(cls, symbol: str) -> int:
+        """Drop every cached prediction of a symbol (its candles/sentiment changed)."""
+        try:
+            deleted = redis_client.delete_pattern(CacheKeys.format_key(CacheKeys.PREDICTION, symbol.lower(), '*', '*', '*'))
+            if deleted:
+                logger.info(f"Invalidated {deleted} cached predictions of {symbol}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Cache delete error for predictions of {symbol}: {e}")
+            return 0
+
+    @classmethod
+    def invalidate_other_models(cls, model_hash: str) -> int:
+        """Drop predictions made by any model other than `model_hash` (a new model was loaded)."""
+        try:
+            pattern = CacheKeys.format_key(CacheKeys.PREDICTION, '*', '*', '*', '*')
+            stale = [key for key in redis_client.redis_client.scan_iter(match=pattern, count=500)
+                     if not key.endswith(f":{model_hash}")]
+            deleted = redis_client.redis_client.delete(*stale) if stale else 0
+            if deleted:
+                logger.info(f"Invalidated {deleted} cached predictions of previous models")
+            return deleted
+        except Exception as e:
+            logger.error(f"Cache delete error for predictions of previous models: {e}")
+            return 0
@@ -30,17 +30,22 @@ class CacheKeys:
     MARKET_DATA = f"{CachePrefix.MARKET}data:{{}}"
     MARKET_CHART = f"{CachePrefix.MARKET}chart:{{}}"
     MARKET_VOLUME = f"{CachePrefix.MARKET}volume:{{}}"
+    INDICATOR_STATE = f"{CachePrefix.MARKET}indicator_state:{{}}"
+    UNFILLABLE_GAPS = f"{CachePrefix.MARKET}unfillable_gaps:{{}}"  # symbol
     
     # Analytics related keys
     ANALYSIS_DATA = f"{CachePrefix.ANALYTICS}analysis_data:{{}}"
     ANALYTICS_DAILY = f"{CachePrefix.ANALYTICS}daily:{{}}"
     ANALYTICS_WEEKLY = f"{CachePrefix.ANALYTICS}weekly:{{}}"
     ANALYTICS_MONTHLY = f"{CachePrefix.ANALYTICS}monthly:{{}}"
+    FEATURE_WATERMARK = f"{CachePrefix.ANALYTICS}feature_watermark:{{}}:{{}}"  # symbol, store
+    PREDICTION = f"{CachePrefix.ANALYTICS}prediction:{{}}:{{}}:{{}}:{{}}"  # symbol, market_data_id, sentiment version, model artifact hash
     
     # Task related keys
     TASK_STATUS = f"{CachePrefix.TASK}status:{{}}"
     TASK_RESULT = f"{CachePrefix.TASK}result:{{}}"
     TASK_LOCK = f"{CachePrefix.LOCK}task:{{}}"
+    BACKFILL_CHECKPOINT = f"{CachePrefix.TASK}backfill:{{}}:{{}}"  # job, symbol
 
     @staticmethod
     def format_key(pattern: str, *args) -> str: